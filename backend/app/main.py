@@ -11,8 +11,18 @@ import logging
 import time
 import asyncio
 import importlib
+import multiprocessing
 import traceback
 
+# PyInstaller バイナリでは、プロセスプール（集約読み込み・計算）のワーカーもこのスクリプトから起動される。
+# ワーカーはここで処理を引き継いで終了するため、ログ設定・事前ロードなどの初期化より先に呼び出す
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+# spawn で起動されたワーカープロセスかどうか（非バイナリ時は __mp_main__ としてこのモジュールが読み込まれる）
+# ワーカーではログファイル・ログ書き込みスレッドを開かない（ローテーションが競合するため）
+is_worker_process = multiprocessing.parent_process() is not None
+
 # パフォーマンス計測
 startup_time = time.time()
 performance_metrics = {
@@ -49,38 +59,40 @@ current_dir = Path(__file__).parent
 if str(current_dir.parent) not in sys.path:
     sys.path.insert(0, str(current_dir.parent))
 
-# 最小限のアプリ初期化情報をログ出力
-print(f"バックエンドサーバー初期化中...")
-
-# Python環境情報を出力
-print(f"Python バージョン: {sys.version}")
-print(f"実行パス: {sys.executable}")
-print(f"作業ディレクトリ: {os.getcwd()}")
-print(f"バイナリモード: {is_binary}")
-
-# カスタムロギング設定をインポート
-try:
-    from app.services.logging_utils import setup_logging
-    
-    # ロギングレベルを設定
-    log_level = logging.DEBUG if debug_mode else logging.WARNING if is_optimized else logging.INFO
-    
-    # カスタムロギング設定を適用
-    setup_logging(
-        log_level=log_level,
-        log_to_file=True,  # ファイルへのログ出力を有効化
-        app_name="project_dashboard_backend"
-    )
+# 初期化情報の出力とロギング設定（ワーカープロセスでは行わない）
+if not is_worker_process:
+    # 最小限のアプリ初期化情報をログ出力
+    print(f"バックエンドサーバー初期化中...")
     
-    record_stage('logging_setup_complete')
-except ImportError:
-    # ロギングユーティリティが見つからない場合は標準設定を使用
-    logging.basicConfig(
-        level=log_level,
-        format="%(levelname)s: %(message)s" if streamlined_logging else "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
-    print("カスタムロギング設定の読み込みに失敗しました。標準設定を使用します。")
+    # Python環境情報を出力
+    print(f"Python バージョン: {sys.version}")
+    print(f"実行パス: {sys.executable}")
+    print(f"作業ディレクトリ: {os.getcwd()}")
+    print(f"バイナリモード: {is_binary}")
+    
+    # カスタムロギング設定をインポート
+    try:
+        from app.services.logging_utils import setup_logging
+    
+        # ロギングレベルを設定
+        log_level = logging.DEBUG if debug_mode else logging.WARNING if is_optimized else logging.INFO
+    
+        # カスタムロギング設定を適用
+        setup_logging(
+            log_level=log_level,
+            log_to_file=True,  # ファイルへのログ出力を有効化
+            app_name="project_dashboard_backend"
+        )
+    
+        record_stage('logging_setup_complete')
+    except ImportError:
+        # ロギングユーティリティが見つからない場合は標準設定を使用
+        logging.basicConfig(
+            level=log_level,
+            format="%(levelname)s: %(message)s" if streamlined_logging else "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        print("カスタムロギング設定の読み込みに失敗しました。標準設定を使用します。")
 
 # ロガーの取得
 logger = logging.getLogger("api.startup")
@@ -121,7 +133,7 @@ def preload_modules():
         return False
 
 # 最適化環境変数をチェックしてモジュールをプリロード
-if is_optimized:
+if is_optimized and not is_worker_process:
     preload_modules()
 
 # より強力なポート確認と割り当てロジック - 改善版
@@ -242,11 +254,17 @@ async def lifespan(app: FastAPI):
                     logger.warning("システムルーターをインポートできません")
         
         # 残りのルーターを直接登録
-        from app.routers import projects, metrics, files
+        from app.routers import projects, metrics, files, datasets, events, dashboard, tasks, diagnostics, observability
         
         app.include_router(projects.router, prefix="/api", tags=["projects"])
         app.include_router(metrics.router, prefix="/api", tags=["metrics"])
         app.include_router(files.router, prefix="/api", tags=["files"])
+        app.include_router(datasets.router, prefix="/api", tags=["datasets"])
+        app.include_router(events.router, prefix="/api", tags=["events"])
+        app.include_router(dashboard.router, prefix="/api", tags=["dashboard"])
+        app.include_router(tasks.router, prefix="/api", tags=["tasks"])
+        app.include_router(diagnostics.router, prefix="/api", tags=["diagnostics"])
+        app.include_router(observability.router, prefix="/api", tags=["observability"])
         
         # マイルストーンルーターを登録（追加部分）
         try:
@@ -261,6 +279,10 @@ async def lifespan(app: FastAPI):
         logger.error(f"ルーターのインポートに失敗しました: {e}")
         logger.error(traceback.format_exc())
     
+    # イベントループの遅延監視を開始（ルートの特定のため登録後に開始）
+    from app.services.loop_monitor import start_loop_monitor, stop_loop_monitor
+    start_loop_monitor(app)
+    
     # 起動時の処理
     logger.info("=== APIサーバーを起動しました ===")
     
@@ -292,6 +314,24 @@ async def lifespan(app: FastAPI):
     # 終了時の処理
     logger.info("APIサーバーを終了します")
     
+    # イベントループの遅延監視を終了
+    stop_loop_monitor()
+    
+    # I/O・CPU 用のスレッドプールを終了
+    from app.services.executors import shutdown_executors
+    shutdown_executors()
+    
+    # 計算用のプロセスプールを終了
+    from app.services.process_compute import shutdown_process_pool as shutdown_compute_pool
+    shutdown_compute_pool()
+    
+    # 集約読み込み用のプロセスプールを終了
+    try:
+        from app.services.multi_site import shutdown_process_pool
+        shutdown_process_pool()
+    except ImportError:
+        pass
+    
     # バックグラウンドタスクが完了してない場合はキャンセル
     if not background_task.done():
         background_task.cancel()
@@ -319,6 +359,13 @@ def create_app(port=8000):
     # ポート情報をアプリケーションの状態に保存
     app.state.port = port
     
+    # プールの飽和・期限切れ・切断は流入制御の有無やルートに関わらず 503 / 504 / 499 として返す
+    from app.services.executors import ExecutorSaturatedError
+    from app.services.deadlines import OperationCancelledError
+    from app.services.admission import executor_saturated_handler, operation_cancelled_handler
+    app.add_exception_handler(ExecutorSaturatedError, executor_saturated_handler)
+    app.add_exception_handler(OperationCancelledError, operation_cancelled_handler)
+    
     # CORS設定
     app.add_middleware(
         CORSMiddleware,
@@ -329,6 +376,34 @@ def create_app(port=8000):
         expose_headers=["*"]
     )
     
+    # リクエストの期限とクライアントの切断を処理に伝える
+    from app.middleware.deadline_middleware import DeadlineMiddleware
+    app.add_middleware(DeadlineMiddleware)
+    
+    # X-Debug-Trace ヘッダーでリクエスト単位の診断ログを有効にする（開発時・明示的に許可した場合のみ）
+    from app.services.debug_trace import debug_trace_allowed
+    if debug_trace_allowed():
+        from app.middleware.debug_trace_middleware import DebugTraceMiddleware
+        app.add_middleware(DebugTraceMiddleware)
+    
+    # データ処理の段階ごとの所要時間をトレースし、Server-Timing ヘッダーで返す
+    from app.services.tracing import tracing_enabled
+    if tracing_enabled():
+        from app.middleware.tracing_middleware import TracingMiddleware
+        app.add_middleware(TracingMiddleware)
+    
+    # ルートごとの処理時間・リクエスト数を記録（期限・流入制御の待ち時間を含めるため後に追加）
+    from app.services.runtime_metrics import runtime_metrics_enabled
+    if runtime_metrics_enabled():
+        from app.middleware.metrics_middleware import RuntimeMetricsMiddleware
+        app.add_middleware(RuntimeMetricsMiddleware)
+    
+    # X-Profile ヘッダーでリクエスト単位のプロファイルを取得する（明示的に許可した場合のみ）
+    from app.services.profiling import profiling_enabled
+    if profiling_enabled():
+        from app.middleware.profiling_middleware import ProfilingMiddleware
+        app.add_middleware(ProfilingMiddleware)
+    
     # 最適化モード時はミドルウェアを減らして起動を高速化
     if not is_optimized:
         # ロギングミドルウェア - 開発時のみ
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.deadlines import deadline_from_headers, deadline_scope
+
+# ロガー設定
+logger = logging.getLogger("api.deadline")
+
+# 切断を監視するメソッド（ボディを持たないリクエストのみ）
+WATCHED_METHODS = {"GET", "HEAD"}
+
+
+class DeadlineMiddleware:
+    """
+    リクエストの期限を設定し、クライアントの切断を検知するミドルウェア
+
+    期限は X-Request-Timeout-Ms ヘッダー（ミリ秒）または REQUEST_DEADLINE_SECONDS で設定する。
+    GET リクエストは受信チャネルを監視し、処理中にクライアントが切断した場合は期限を取り消して
+    データ処理を段階の境目で打ち切らせる。
+    レスポンスの送信を開始した後（SSE・エクスポートなどのストリーミング）は期限を解除し、
+    切断による取り消しのみを有効にする（ヘッダー送信後に期限切れでボディが途切れないようにするため）。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/api"):
+            await self.app(scope, receive, send)
+            return
+
+        deadline = deadline_from_headers(Headers(scope=scope))
+        if scope["method"] not in WATCHED_METHODS:
+            async def started_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    deadline.clear_expiry()
+                await send(message)
+
+            with deadline_scope(deadline):
+                await self.app(scope, receive, started_send)
+            return
+
+        # 受信メッセージは監視タスクが読み取り、アプリケーションにはキュー経由で渡す
+        messages: asyncio.Queue = asyncio.Queue()
+        response_complete = False
+
+        async def watch_disconnect() -> None:
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    # レスポンス送信後の切断は取り消しとして扱わない
+                    if not response_complete:
+                        deadline.cancel()
+                        logger.info(f"クライアントが切断しました: {scope['method']} {scope['path']}")
+                    return
+
+        async def queued_receive() -> Message:
+            return await messages.get()
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.start":
+                deadline.clear_expiry()
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            with deadline_scope(deadline):
+                await self.app(scope, queued_receive, tracking_send)
+        finally:
+            watcher.cancel()
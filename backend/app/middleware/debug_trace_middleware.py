@@ -0,0 +1,23 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.services.debug_trace import debug_trace_from_headers, debug_trace_scope
+
+
+class DebugTraceMiddleware:
+    """
+    X-Debug-Trace ヘッダーが付いたリクエストでデバッグトレースを有効にするミドルウェア
+
+    DEBUG=1 または DEBUG_TRACE_ENABLED=1 の場合のみ追加する。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not debug_trace_from_headers(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        with debug_trace_scope(True):
+            await self.app(scope, receive, send)
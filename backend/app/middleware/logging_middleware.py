@@ -5,19 +5,10 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
-# ロガー設定
+# ロガー設定（出力はルートロガーのハンドラーに任せる）
 logger = logging.getLogger("api")
 logger.setLevel(logging.INFO)
 
-# コンソールハンドラー
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_format = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-console_handler.setFormatter(console_format)
-logger.addHandler(console_handler)
-
 class LoggingMiddleware(BaseHTTPMiddleware):
     """
     リクエストとレスポンスをログに記録するミドルウェア
@@ -0,0 +1,62 @@
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.route_table import RouteTable
+from app.services.runtime_metrics import get_runtime_metrics
+
+
+class RuntimeMetricsMiddleware:
+    """
+    ルートごとの処理時間・ステータス・処理中のリクエスト数を記録するミドルウェア
+
+    ラベルにはパスではなくルートのテンプレート（/api/projects/{project_id} など）を使用する。
+    処理時間はレスポンスのボディを送信し終えるまで（ストリーミングを含む）を計測する。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.metrics = get_runtime_metrics()
+        self._routes: Optional[RouteTable] = None
+
+    def _resolve_route(self, scope: Scope) -> str:
+        """リクエストに一致するルートのテンプレート"""
+        if self._routes is None:
+            # ルーターはライフスパンの開始時に登録されるため、最初のリクエストで作成する
+            self._routes = RouteTable(scope["app"].routes)
+        return self._routes.resolve(scope["method"], scope["path"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._resolve_route(scope)
+        status = 500
+        finished = False
+        start = time.perf_counter()
+        self.metrics.request_started(method, route)
+
+        async def metrics_send(message: Message) -> None:
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # バックグラウンドタスクの実行時間は含めない
+                try:
+                    await send(message)
+                finally:
+                    if not finished:
+                        finished = True
+                        self.metrics.request_finished(method, route, status, time.perf_counter() - start)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, metrics_send)
+        finally:
+            if not finished:
+                finished = True
+                self.metrics.request_finished(method, route, status, time.perf_counter() - start)
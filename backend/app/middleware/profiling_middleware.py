@@ -0,0 +1,47 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.profiling import profile_requested, profile_scope
+
+# プロファイルIDを返すレスポンスヘッダー
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# プロファイルしなかった理由を返すレスポンスヘッダー
+PROFILE_STATUS_HEADER = "X-Profile-Status"
+
+
+class ProfilingMiddleware:
+    """
+    X-Profile: 1 ヘッダーが付いた API リクエストをプロファイルするミドルウェア
+
+    PROFILING_ENABLED=1 の場合のみ追加する。結果は X-Profile-Id ヘッダーの ID で
+    /api/system/profiles/{id} から取得できる。他のリクエストをプロファイル中の場合は
+    プロファイルせずに X-Profile-Status: busy を返す。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith("/api")
+            or not profile_requested(Headers(scope=scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        query = scope.get("query_string", b"").decode("latin-1")
+        with profile_scope(scope["method"], scope["path"], query) as profile:
+
+            async def profiling_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    if profile is not None:
+                        profile.status = message["status"]
+                        headers.append(PROFILE_ID_HEADER, profile.profile_id)
+                    else:
+                        headers.append(PROFILE_STATUS_HEADER, "busy")
+                await send(message)
+
+            await self.app(scope, receive, profiling_send)
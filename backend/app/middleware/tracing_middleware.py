@@ -0,0 +1,45 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.tracing import Trace, record_trace, server_timing_enabled, trace_scope
+
+# トレースIDを返すレスポンスヘッダー
+TRACE_ID_HEADER = "X-Trace-Id"
+
+
+class TracingMiddleware:
+    """
+    API リクエストごとにトレースを作成し、段階ごとの所要時間を Server-Timing ヘッダーで返すミドルウェア
+
+    ヘッダーはレスポンスの開始時点までに終了したスパンから作成する。
+    処理時間が TRACE_SLOW_MS を超えたトレースは /api/system/traces で参照できる。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.server_timing = server_timing_enabled()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/api"):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        status = None
+
+        async def tracing_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(TRACE_ID_HEADER, trace.trace_id)
+                if self.server_timing:
+                    headers.append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            with trace_scope(trace):
+                await self.app(scope, receive, tracing_send)
+        finally:
+            trace.finish(status if status is not None else 500)
+            record_trace(trace)
@@ -58,6 +58,23 @@ class Project(BaseModel):
     milestones: Optional[List[Milestone]] = None
 
 
+# 指定バージョン以降のプロジェクト差分
+class ProjectDelta(BaseModel):
+    version: int
+    since: int
+    added: List[Project]
+    changed: List[Project]
+    removed: List[str]
+
+
+# 絞り込み・並べ替え済みプロジェクト一覧の1ページ
+class ProjectPage(BaseModel):
+    version: int
+    total: int
+    items: List[Project]
+    next_cursor: Optional[str] = None
+
+
 class ProjectSummary(BaseModel):
     total_projects: int
     active_projects: int
@@ -80,6 +97,24 @@ class FileResponse(BaseModel):
     path: Optional[str] = None
 
 
+# ダッシュボードファイル探索結果
+class DashboardCandidate(BaseModel):
+    path: str
+    exists: Optional[bool] = None  # タイムアウトした候補は不明（None）
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    timed_out: bool = False
+    priority: int
+
+
+class DashboardDiscoveryResponse(BaseModel):
+    path: str
+    found: bool
+    candidates: List[DashboardCandidate]
+    discovered_at: float
+    elapsed: float
+
+
 class RecentTasks(BaseModel):
     delayed: Optional[Dict[str, Any]] = None
     in_progress: Optional[Dict[str, Any]] = None
@@ -87,6 +122,73 @@ class RecentTasks(BaseModel):
     next_next_task: Optional[Dict[str, Any]] = None
 
 
+# ダッシュボード一括取得用レスポンススキーマ（同一スナップショットから計算）
+class DashboardResponse(BaseModel):
+    version: int
+    metrics: DashboardMetrics
+    projects: List[Project]
+    recent_tasks: Optional[Dict[str, RecentTasks]] = None
+
+
+# データセット診断用レスポンススキーマ（スナップショットと基準日ごとに計算）
+class DatasetDiagnostics(BaseModel):
+    version: int
+    reference_date: str
+    rows: int
+    columns: List[str]
+    milestone_values: List[Optional[str]] = []
+    milestone_tasks: int = 0
+    future_tasks: int = 0
+    delayed_tasks: int = 0
+    delayed_projects: int = 0
+    delayed_project_ids: List[str] = []
+    finish_date_sample: List[Optional[str]] = []
+    delayed_task_sample: List[Dict[str, str]] = []
+
+
 # タイムライン取得用レスポンススキーマ
 class MilestoneTimelineResponse(BaseModel):
-    projects: List[Project]
\ No newline at end of file
+    projects: List[Project]
+
+# データセットレジストリ情報
+class DatasetInfo(BaseModel):
+    key: str
+    version: int
+    size_bytes: int
+    rows: int
+    load_time: float
+    loaded_at: float
+    last_access: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    loads: int
+    derived_entries: int
+    loaded_groups: List[str]
+    is_error: bool
+
+
+# スレッドプールの統計
+class ExecutorInfo(BaseModel):
+    workers: int
+    queue_size: int
+    active: int
+    queued: int
+    submitted: int
+    completed: int
+    failed: int
+    rejected: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class DatasetListResponse(BaseModel):
+    memory_budget_bytes: int
+    total_bytes: int
+    evictions: int
+    loading: List[str] = []
+    datasets: List[DatasetInfo]
+    executors: Dict[str, ExecutorInfo] = {}
+    process_compute: Dict[str, Any] = {}
+    admission: Dict[str, Dict[str, Any]] = {}
+    event_loop: Dict[str, Any] = {}
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+import logging
+
+from app.models.schemas import DashboardResponse, RecentTasks
+from app.services.data_processing import get_recent_tasks, PROGRESS_COLUMNS
+from app.services.executors import run_in_cpu_executor
+from app.services.admission import admission_controlled, DASHBOARD
+from app.services.http_cache import open_cached_request
+from app.routers.projects import load_projects
+from app.routers.metrics import build_metrics
+
+router = APIRouter()
+logger = logging.getLogger("api.dashboard")
+
+@router.get("/dashboard", response_model=DashboardResponse)
+@admission_controlled(DASHBOARD, cached=True)
+async def get_dashboard(request: Request,
+                        file_path: str = Query(None), sources: Optional[str] = Query(None),
+                        include_recent_tasks: bool = Query(False)):
+    """
+    ダッシュボード画面のデータを一括で取得する
+    
+    メトリクス・プロジェクト一覧・（オプションで）全プロジェクトの直近タスクを
+    同じスナップショットから計算して1回のレスポンスで返す。
+    
+    Args:
+        file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
+        include_recent_tasks: 全プロジェクトの直近タスク情報を含めるかどうか
+        
+    Returns:
+        ダッシュボードデータ（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
+    """
+    try:
+        # データセットに変更がなければ 304、エンコード済みのボディがあればそれを返す
+        cache = await open_cached_request(request, file_path, sources)
+        if cache.cached_response is not None:
+            return cache.cached_response
+        
+        # 全ての計算を同じスナップショットのフレームから行う
+        snapshot = cache.snapshot
+        df = await cache.frame(PROGRESS_COLUMNS)
+        
+        metrics = await build_metrics(df, snapshot.loaded_at)
+        projects = await load_projects(df=df)
+        
+        recent_tasks = None
+        if include_recent_tasks:
+            project_ids = [project.project_id for project in projects]
+            
+            def collect_recent_tasks():
+                core_df = snapshot.frame()
+                return {pid: RecentTasks(**get_recent_tasks(core_df, pid)) for pid in project_ids}
+            
+            recent_tasks = await run_in_cpu_executor(collect_recent_tasks)
+        
+        logger.info(
+            f"ダッシュボードデータ取得: {len(projects)}件のプロジェクト "
+            f"(version={cache.version}, recent_tasks={include_recent_tasks})"
+        )
+        
+        return cache.respond(DashboardResponse(
+            version=cache.version,
+            metrics=metrics,
+            projects=projects,
+            recent_tasks=recent_tasks
+        ))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"ダッシュボードデータの取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"ダッシュボードデータの取得に失敗しました: {str(e)}")
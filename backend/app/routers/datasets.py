@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+import logging
+
+from app.models.schemas import DatasetListResponse
+from app.services.data_processing import get_registry_info
+
+router = APIRouter()
+logger = logging.getLogger("api.datasets")
+
+@router.get("/datasets", response_model=DatasetListResponse)
+async def list_datasets():
+    """
+    ロード済みデータセットの一覧を取得する
+    
+    Returns:
+        データセットごとのサイズ・ロード時間・ヒット率とメモリ予算
+    """
+    try:
+        return get_registry_info()
+    except Exception as e:
+        logger.error(f"データセット一覧の取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"データセット一覧の取得に失敗しました: {str(e)}")
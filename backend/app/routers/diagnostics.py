@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+import datetime
+import logging
+
+from app.models.schemas import DatasetDiagnostics
+from app.services.data_processing import get_dataset_diagnostics
+from app.services.executors import run_in_cpu_executor
+from app.services.admission import admission_controlled, DASHBOARD
+from app.services.http_cache import open_cached_request
+
+router = APIRouter()
+logger = logging.getLogger("api.diagnostics")
+
+@router.get("/diagnostics/dataset", response_model=DatasetDiagnostics)
+@admission_controlled(DASHBOARD, cached=True)
+async def get_dataset_diagnostics_endpoint(request: Request,
+                                           file_path: str = Query(None), sources: Optional[str] = Query(None)):
+    """
+    データセットの診断情報を取得する
+    
+    マイルストーン列のユニーク値・'○' の件数・未来の日付の件数・遅延タスクの集計とサンプルを返す。
+    スナップショットと基準日ごとに1回だけ計算し、派生キャッシュに保存する。
+    
+    Args:
+        file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
+        
+    Returns:
+        診断情報（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
+    """
+    try:
+        cache = await open_cached_request(request, file_path, sources)
+        if cache.cached_response is not None:
+            return cache.cached_response
+        
+        snapshot = cache.snapshot
+        reference_date = datetime.date.today().isoformat()
+        
+        def compute():
+            return get_dataset_diagnostics(snapshot.frame(), reference_date)
+        
+        diagnostics = await run_in_cpu_executor(compute)
+        logger.info(f"データセット診断を取得しました (version={cache.version}, rows={diagnostics['rows']})")
+        
+        return cache.respond(DatasetDiagnostics(version=cache.version, **diagnostics))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"データセット診断の取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"データセット診断の取得に失敗しました: {str(e)}")
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import time
+
+from app.services.data_processing import async_get_dataset, get_event_broker
+from app.services.deadlines import deadline_scope
+
+router = APIRouter()
+logger = logging.getLogger("api.events")
+
+# データソースの更新確認間隔（秒）
+DEFAULT_CHECK_INTERVAL = 2.0
+# 接続維持用コメントの送信間隔（秒）
+KEEPALIVE_INTERVAL = 15.0
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """SSE形式のメッセージを作成する"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/events")
+async def dataset_events(request: Request, file_path: str = Query(None), sources: Optional[str] = Query(None)):
+    """
+    データセットの変更通知をサーバー送信イベント（SSE）で配信する
+
+    接続直後に現在のバージョンを 'dataset' イベント（type=current）で送信し、
+    以降はスナップショットが差し替えられるたびに変更されたプロジェクトIDを送信する（type=changed）。
+
+    Args:
+        file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
+
+    Returns:
+        text/event-stream のストリーミングレスポンス
+    """
+    try:
+        entry = await async_get_dataset(file_path, sources)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"データセット変更通知の開始に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"データセット変更通知の開始に失敗しました: {str(e)}")
+
+    broker = get_event_broker()
+    subscription = broker.subscribe(entry.key)
+    check_interval = float(os.environ.get('EVENTS_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+
+    async def stream():
+        last_sent = time.time()
+        try:
+            yield format_event('dataset', {
+                'type': 'current',
+                'dataset': entry.key,
+                'version': entry.version,
+            }, entry.version)
+
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=check_interval)
+                    yield format_event('dataset', message, message['version'])
+                    last_sent = time.time()
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+                # ソースの更新を確認（変更があればレジストリが再ロードして通知する）
+                # 接続は長時間続くため、リクエストの期限は適用しない
+                try:
+                    with deadline_scope(None):
+                        await async_get_dataset(file_path, sources)
+                except Exception as e:
+                    logger.warning(f"データセットの更新確認に失敗しました: {e}")
+
+                if time.time() - last_sent >= KEEPALIVE_INTERVAL:
+                    yield ": keepalive\n\n"
+                    last_sent = time.time()
+        finally:
+            broker.unsubscribe(subscription)
+            logger.info(f"データセット変更通知の購読を終了しました: {entry.key}")
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -9,9 +9,11 @@ import tempfile
 import shutil
 import importlib
 
-from app.models.schemas import FilePath, FileResponse
+from app.models.schemas import FilePath, FileResponse, DashboardDiscoveryResponse
 from app.services.file_utils import validate_file_path, open_file_or_folder
-from app.services.data_processing import resolve_dashboard_path
+from app.services.data_processing import async_resolve_dashboard_path, schedule_prefetch
+from app.services.path_discovery import get_discovery
+from app.services.executors import run_in_io_executor
 
 router = APIRouter()
 logger = logging.getLogger("api.files")
@@ -46,9 +48,10 @@ async def get_default_path():
         デフォルトパス
     """
     try:
-        # デフォルトパスの解決ロジック - 最適化版
-        path = resolve_dashboard_path()
-        if os.path.exists(path):
+        # デフォルトパスの解決ロジック - 候補の並列確認と結果のキャッシュはスレッドプールで実行
+        discovery = await run_in_io_executor(get_discovery)
+        path = discovery['path']
+        if discovery['found']:
             return FileResponse(
                 success=True,
                 message="デフォルトファイルが見つかりました",
@@ -60,9 +63,29 @@ async def get_default_path():
                 message="データファイルが見つかりません。ファイルを選択してください。",
                 path=path
             )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"デフォルトパスの取得に失敗しました: {str(e)}")
 
+@router.get("/files/candidates", response_model=DashboardDiscoveryResponse)
+async def get_dashboard_candidates(refresh: bool = Query(False)):
+    """
+    ダッシュボードファイルの探索結果を取得する
+    
+    Args:
+        refresh: キャッシュを使わずに再探索するかどうか
+        
+    Returns:
+        選択されたパスと、確認した全候補のサイズ・更新日時
+    """
+    try:
+        return await run_in_io_executor(get_discovery, None, refresh)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"データファイルの探索に失敗しました: {str(e)}")
+
 @router.get("/files/select", response_model=FileResponse)
 async def select_file(initial_path: str = None):
     """
@@ -80,7 +103,8 @@ async def select_file(initial_path: str = None):
     if use_electron:
         # Electron環境を検出した場合、デフォルトパスのみ返す（Electron側でダイアログを表示する）
         logger.info("Electron環境検出: デフォルトパスのみ返します")
-        default_path = resolve_dashboard_path()
+        default_path = await async_resolve_dashboard_path()
+        schedule_prefetch(default_path)
         
         return FileResponse(
             success=True,
@@ -125,8 +149,9 @@ async def select_file(initial_path: str = None):
                     path=None
                 )
             
-            # 選択されたファイルパスを返す
+            # 選択されたファイルパスを返す（データセットの読み込みは先に開始しておく）
             logger.info(f"ファイルが選択されました: {file_path}")
+            schedule_prefetch(file_path)
             return FileResponse(
                 success=True,
                 message=f"ファイルが選択されました: {file_path}",
@@ -138,7 +163,8 @@ async def select_file(initial_path: str = None):
             logger.error(f"tkinterのインポートエラー: {str(ie)}")
             
             # tkinterが使用できない場合はデフォルトパスを使用
-            default_path = resolve_dashboard_path()
+            default_path = await async_resolve_dashboard_path()
+            schedule_prefetch(default_path)
             
             logger.info(f"デフォルトパスを使用: {default_path}")
             return FileResponse(
@@ -152,7 +178,8 @@ async def select_file(initial_path: str = None):
             logger.error(f"tkinterの使用中に例外が発生: {str(e)}", exc_info=True)
             
             # 例外が発生した場合でもデフォルトパスで回復を試みる
-            default_path = resolve_dashboard_path()
+            default_path = await async_resolve_dashboard_path()
+            schedule_prefetch(default_path)
             
             return FileResponse(
                 success=True,
@@ -160,6 +187,8 @@ async def select_file(initial_path: str = None):
                 path=default_path
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"ファイル選択中にエラーが発生: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"ファイル選択中にエラーが発生しました: {str(e)}")
@@ -209,6 +238,7 @@ if _has_multipart:
                 shutil.copyfileobj(file.file, buffer)
             
             logger.info(f"ファイルを保存しました: {file_path}")
+            schedule_prefetch(str(file_path))
             
             return FileResponse(
                 success=True,
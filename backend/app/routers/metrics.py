@@ -1,62 +1,108 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
 import logging
 
 from app.models.schemas import DashboardMetrics, ProjectSummary
 from app.services.data_processing import (
-    async_load_and_process_data, async_calculate_progress,
-    get_delayed_projects_count
+    async_calculate_progress, get_delayed_projects_count, PROGRESS_COLUMNS
 )
 from app.services.async_loader import lazy_import
+from app.services.http_cache import open_cached_request
+from app.services.executors import run_in_cpu_executor
+from app.services.admission import admission_controlled, DASHBOARD
 
 router = APIRouter()
 logger = logging.getLogger("api.metrics")
 
 @router.get("/metrics", response_model=DashboardMetrics)
-async def get_metrics(file_path: str = Query(None)):
+@admission_controlled(DASHBOARD, cached=True)
+async def get_metrics(request: Request,
+                      file_path: str = Query(None), sources: Optional[str] = Query(None)):
     """
     ダッシュボードのメトリクスを取得する
     
     Args:
         file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
         
     Returns:
-        ダッシュボードメトリクス
+        ダッシュボードメトリクス（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
     """
     try:
-        # datetime と pandas を遅延インポート
-        datetime = lazy_import("datetime")
-        
-        # データの読み込みと処理 - 非同期版
-        df = await async_load_and_process_data(file_path)
-        
-        # プロジェクト進捗の計算 - 非同期版
-        progress_data = await async_calculate_progress(df)
-        
-        # 統計の計算
-        total_projects = len(progress_data)
-        active_projects = len(progress_data[progress_data['progress'] < 100])
-        delayed_projects = get_delayed_projects_count(df)
+        # データセットに変更がなければ 304、エンコード済みのボディがあればそれを返す
+        cache = await open_cached_request(request, file_path, sources)
+        if cache.cached_response is not None:
+            return cache.cached_response
         
-        # 当月のマイルストーンプロジェクト数を計算
-        current_month = datetime.datetime.now().month
-        milestone_projects = len(df[
-            (df['task_milestone'] == '○') & 
-            (df['task_finish_date'].dt.month == current_month)
-        ]['project_id'].unique())
+        # ETag・バージョンと同じスナップショットから計算する
+        # 進捗計算の結果はプロジェクト一覧と共有するため同じ列構成で読み込む
+        df = await cache.frame(PROGRESS_COLUMNS)
         
-        # レスポンスの構築 - チャート関連のデータを削除
-        metrics = DashboardMetrics(
-            summary=ProjectSummary(
-                total_projects=total_projects,
-                active_projects=active_projects,
-                delayed_projects=delayed_projects,
-                milestone_projects=milestone_projects
-            ),
-            last_updated=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        )
-        
-        return metrics
+        metrics = await build_metrics(df, cache.snapshot.loaded_at)
+        return cache.respond(metrics)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"メトリクス取得エラー: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"メトリクスの取得に失敗しました: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"メトリクスの取得に失敗しました: {str(e)}")
+
+async def build_metrics(df, loaded_at: Optional[float] = None) -> DashboardMetrics:
+    """
+    データフレームからダッシュボードメトリクスを計算する（ダッシュボード一括取得からも利用）
+    
+    Args:
+        df: PROGRESS_COLUMNS を含むデータフレーム
+        loaded_at: スナップショットの読み込み時刻（last_updated に使用）
+        
+    Returns:
+        ダッシュボードメトリクス
+    """
+    # プロジェクト進捗の計算 - 非同期版
+    progress_data = await async_calculate_progress(df)
+    
+    # 統計の計算はイベントループを塞がないよう CPU プールで行う
+    return await run_in_cpu_executor(summarize_metrics, df, progress_data, loaded_at)
+
+def summarize_metrics(df, progress_data, loaded_at: Optional[float] = None) -> DashboardMetrics:
+    """
+    進捗データからメトリクスを集計する（CPU プールで実行する）
+    
+    Args:
+        df: PROGRESS_COLUMNS を含むデータフレーム
+        progress_data: calculate_progress() の結果
+        loaded_at: スナップショットの読み込み時刻（None の場合は現在時刻）
+        
+    Returns:
+        ダッシュボードメトリクス
+    """
+    # datetime を遅延インポート
+    datetime = lazy_import("datetime")
+    
+    # 統計の計算
+    total_projects = len(progress_data)
+    active_projects = len(progress_data[progress_data['progress'] < 100])
+    delayed_projects = get_delayed_projects_count(df)
+    
+    # 当月のマイルストーンプロジェクト数を計算
+    current_month = datetime.datetime.now().month
+    milestone_projects = len(df[
+        (df['task_milestone'] == '○') & 
+        (df['task_finish_date'].dt.month == current_month)
+    ]['project_id'].unique())
+    
+    # レスポンスの構築 - チャート関連のデータを削除
+    metrics = DashboardMetrics(
+        summary=ProjectSummary(
+            total_projects=total_projects,
+            active_projects=active_projects,
+            delayed_projects=delayed_projects,
+            milestone_projects=milestone_projects
+        ),
+        # レスポンスはスナップショットごとにキャッシュ・再検証されるため、計算時刻ではなく読み込み時刻を返す
+        last_updated=(
+            datetime.datetime.fromtimestamp(loaded_at) if loaded_at is not None else datetime.datetime.now()
+        ).strftime('%Y-%m-%d %H:%M:%S')
+    )
+    
+    return metrics
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from typing import List, Optional
 import logging
 from enum import Enum
@@ -9,25 +9,45 @@ from app.services.data_processing import (
     async_load_and_process_data, get_project_milestones,
     update_milestone, create_milestone, delete_milestone
 )
+from app.services.http_cache import open_cached_request
+from app.services.admission import admission_controlled, MILESTONES, TIMELINE
+from app.services.columnar import to_columnar, FORMAT_JSON, FORMAT_COLUMNAR, FORMAT_PATTERN
+from app.services.field_selection import parse_fields, wants, include_for, include_within
 
 router = APIRouter()
 logger = logging.getLogger("api.milestones")
 
 @router.get("/milestones", response_model=List[Milestone])
-async def get_milestones(file_path: str = Query(None), project_id: Optional[str] = None):
+@admission_controlled(MILESTONES, cached=True)
+async def get_milestones(request: Request,
+                         file_path: str = Query(None), project_id: Optional[str] = None,
+                         fields: Optional[str] = Query(None),
+                         format: str = Query(FORMAT_JSON, pattern=FORMAT_PATTERN)):
     """
     マイルストーン一覧を取得する
     
     Args:
         file_path: データファイルのパス（指定がない場合はデフォルト）
         project_id: 絞り込み用プロジェクトID（オプション）
+        fields: レスポンスに含めるフィールド（カンマ区切り。id は常に含む）
+        format: columnar の場合、列指向形式（ヘッダー + 列ごとの配列）で返す
         
     Returns:
-        マイルストーン一覧
+        マイルストーン一覧（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
     """
     try:
-        # データの読み込みと処理
-        df = await async_load_and_process_data(file_path)
+        try:
+            selected = parse_fields(fields, Milestone)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # データセットに変更がなければ 304、エンコード済みのボディがあればそれを返す
+        cache = await open_cached_request(request, file_path)
+        if cache.cached_response is not None:
+            return cache.cached_response
+        
+        # ETag・バージョンと同じスナップショットから作成する
+        df = await cache.frame()
         
         # マイルストーン情報を取得（非同期で）
         from app.services.data_processing import async_get_project_milestones
@@ -36,44 +56,70 @@ async def get_milestones(file_path: str = Query(None), project_id: Optional[str]
         # ログ出力
         logger.info(f"マイルストーン取得: {len(milestones)}件 (project_id: {project_id})")
         
-        return milestones
+        if format == FORMAT_COLUMNAR:
+            return cache.respond(to_columnar(milestones, Milestone, selected))
+        return cache.respond(milestones, include_for(selected))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"マイルストーン取得エラー: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"マイルストーンの取得に失敗しました: {str(e)}")
 
 @router.get("/milestones/timeline", response_model=MilestoneTimelineResponse)
-async def get_milestone_timeline(file_path: str = Query(None)):
+@admission_controlled(TIMELINE, cached=True)
+async def get_milestone_timeline(request: Request,
+                                 file_path: str = Query(None), sources: Optional[str] = Query(None),
+                                 fields: Optional[str] = Query(None)):
     """
     タイムライン表示用のマイルストーン一覧を取得する
     
     Args:
         file_path: データファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
+        fields: 各プロジェクトに含めるフィールド（カンマ区切り。project_id は常に含む。
+                milestones を含めない場合はマイルストーンの取得を省略）
         
     Returns:
-        プロジェクトとそれに関連するマイルストーンの一覧
+        プロジェクトとそれに関連するマイルストーンの一覧（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
     """
     try:
-        # データの読み込みと処理
-        df = await async_load_and_process_data(file_path)
+        try:
+            selected = parse_fields(fields, Project)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # データセットに変更がなければ 304、エンコード済みのボディがあればそれを返す
+        cache = await open_cached_request(request, file_path, sources)
+        if cache.cached_response is not None:
+            return cache.cached_response
         
-        # プロジェクトデータ取得（既存の関数を利用）
-        from app.routers.projects import get_projects
-        projects = await get_projects(file_path)
+        # プロジェクトデータ取得（既存の関数を利用、ETag・バージョンと同じスナップショットから作成する）
+        from app.routers.projects import load_projects, columns_for
+        projects = await load_projects(df=await cache.frame(columns_for(selected)), fields=selected)
         
         # 各プロジェクトにマイルストーン情報を追加
-        for project in projects:
-            project_id = project.project_id
-            # 非同期でマイルストーン情報を取得
-            from app.services.data_processing import async_get_project_milestones
-            milestones = await async_get_project_milestones(df, project_id)
-            project.milestones = milestones
+        if wants(selected, 'milestones'):
+            # データの読み込みと処理
+            df = await cache.frame()
+            
+            for project in projects:
+                project_id = project.project_id
+                # 非同期でマイルストーン情報を取得
+                from app.services.data_processing import async_get_project_milestones
+                milestones = await async_get_project_milestones(df, project_id)
+                project.milestones = milestones
         
         # ログ出力
         logger.info(f"タイムラインデータ取得: {len(projects)}件のプロジェクトと関連マイルストーン")
         
-        return MilestoneTimelineResponse(projects=projects)
+        return cache.respond(
+            MilestoneTimelineResponse(projects=projects),
+            include_within(selected, MilestoneTimelineResponse, 'projects')
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"タイムラインデータ取得エラー: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"タイムラインデータの取得に失敗しました: {str(e)}")
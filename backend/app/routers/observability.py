@@ -0,0 +1,129 @@
+"""
+ランタイムの計測情報のAPIエンドポイント
+- ルートごとの処理時間・リクエスト数・キャッシュのヒット率などのメトリクスを提供
+- 処理時間が閾値を超えたリクエストのトレース（段階ごとの所要時間）を提供
+- X-Profile ヘッダーで取得したリクエストのプロファイル（pstats・collapsed 形式）を提供
+- SYSTEM_HEALTH_ENABLED の設定に関わらず常に登録する
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+import logging
+
+from app.services.runtime_metrics import get_runtime_metrics
+from app.services.tracing import slow_traces, get_slow_trace, slow_trace_threshold
+from app.services.profiling import get_profile, list_profiles, profiling_enabled
+
+router = APIRouter()
+logger = logging.getLogger("api.observability")
+
+# Prometheus のテキスト形式のメディアタイプ
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/system/runtime-metrics")
+async def get_runtime_metrics_endpoint(format: str = Query("json", pattern="^(json|prometheus)$")):
+    """
+    ランタイムメトリクスを取得する
+    
+    Args:
+        format: 出力形式（json または Prometheus のテキスト形式の prometheus）
+        
+    Returns:
+        ルートごとの処理時間のヒストグラム・リクエスト数・エラー数・処理中のリクエスト数、
+        キャッシュのヒット・ミス数、データセットのロード回数と所要時間
+    """
+    try:
+        metrics = get_runtime_metrics()
+        if format == "prometheus":
+            return PlainTextResponse(metrics.to_prometheus(), media_type=PROMETHEUS_MEDIA_TYPE)
+        return metrics.to_dict()
+    except Exception as e:
+        logger.error(f"ランタイムメトリクスの取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"ランタイムメトリクスの取得に失敗しました: {str(e)}")
+
+@router.get("/system/traces")
+async def list_slow_traces():
+    """
+    処理時間が閾値（TRACE_SLOW_MS）を超えたリクエストのトレースの一覧を取得する
+    
+    Returns:
+        閾値と、保持しているトレースの概要（新しい順）
+    """
+    try:
+        return {
+            'threshold_ms': slow_trace_threshold() * 1000,
+            'traces': slow_traces(),
+        }
+    except Exception as e:
+        logger.error(f"トレース一覧の取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"トレース一覧の取得に失敗しました: {str(e)}")
+
+@router.get("/system/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """
+    保持しているトレースの詳細を取得する
+    
+    Args:
+        trace_id: トレースID（レスポンスの X-Trace-Id ヘッダー）
+        
+    Returns:
+        スパン（段階名・開始位置・所要時間・スレッド・行数などの属性）を含むトレース
+    """
+    trace = get_slow_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"トレースが見つかりません: {trace_id}")
+    return trace
+
+@router.get("/system/profiles")
+async def list_request_profiles():
+    """
+    X-Profile ヘッダーで取得したリクエストのプロファイルの一覧を取得する
+    
+    Returns:
+        プロファイリングが有効かどうか（PROFILING_ENABLED）と、保持しているプロファイルの概要（新しい順）
+    """
+    try:
+        return {
+            'enabled': profiling_enabled(),
+            'profiles': list_profiles(),
+        }
+    except Exception as e:
+        logger.error(f"プロファイル一覧の取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"プロファイル一覧の取得に失敗しました: {str(e)}")
+
+@router.get("/system/profiles/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|pstats|collapsed)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    保持しているプロファイルを取得する
+    
+    Args:
+        profile_id: プロファイルID（レスポンスの X-Profile-Id ヘッダー）
+        format: 出力形式（text: print_stats の出力、pstats: pstats.Stats で読み込めるバイナリ、
+                collapsed: flamegraph.pl / speedscope 用のスタック集計）
+        sort: text 形式の並び順
+        limit: text 形式で出力する関数の件数
+        
+    Returns:
+        指定した形式のプロファイル
+    """
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"プロファイルが見つかりません: {profile_id}")
+    try:
+        if format == "pstats":
+            return Response(
+                profile.to_pstats(),
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+            )
+        if format == "collapsed":
+            return PlainTextResponse(profile.to_collapsed())
+        return PlainTextResponse(profile.to_text(sort=sort, limit=limit))
+    except Exception as e:
+        logger.error(f"プロファイルの取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"プロファイルの取得に失敗しました: {str(e)}")
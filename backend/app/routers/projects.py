@@ -1,207 +1,341 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import FrozenSet, List, Optional, Union
+import datetime
 import logging
 
-from app.models.schemas import Project, RecentTasks
+from app.models.schemas import Project, ProjectDelta, ProjectPage, RecentTasks
 from app.services.data_processing import (
     async_load_and_process_data, async_calculate_progress, async_get_recent_tasks,
-    get_next_milestone, next_milestone_format, check_delays
+    get_next_milestone, next_milestone_format, check_delays, PROGRESS_COLUMNS,
+    get_event_broker, get_dataset_registry, get_dataset_diagnostics
+)
+from app.services.executors import run_in_cpu_executor
+from app.services.debug_trace import debug_trace_enabled
+from app.services.admission import admission_controlled, PROJECTS
+from app.services.http_cache import open_cached_request, CachedRequest
+from app.services.dataset_snapshot import CORE_COLUMNS
+from app.services.columnar import to_columnar, FORMAT_JSON, FORMAT_COLUMNAR, FORMAT_PATTERN
+from app.services.field_selection import parse_fields, wants, include_for, include_within
+from app.services.project_index import (
+    ProjectIndex, ProjectQuery, CursorError, StaleCursorError, project_attributes
 )
 
 router = APIRouter()
 logger = logging.getLogger("api.projects")
 
-@router.get("/projects", response_model=List[Project])
-async def get_projects(file_path: str = Query(None)):
+# 派生キャッシュ上のプロジェクトインデックスのキー
+PROJECT_INDEX_PREFIX = 'project_index'
+
+@router.get("/projects", response_model=Union[List[Project], ProjectDelta, ProjectPage])
+@admission_controlled(PROJECTS, cached=True)
+async def get_projects(request: Request,
+                       file_path: str = Query(None), sources: Optional[str] = Query(None),
+                       since: Optional[int] = Query(None),
+                       status: Optional[str] = Query(None), has_delay: Optional[bool] = Query(None),
+                       process: Optional[str] = Query(None), line: Optional[str] = Query(None),
+                       division: Optional[str] = Query(None), factory: Optional[str] = Query(None),
+                       progress_min: Optional[float] = Query(None), progress_max: Optional[float] = Query(None),
+                       sort: Optional[str] = Query(None), order: str = Query("asc", pattern="^(asc|desc)$"),
+                       limit: Optional[int] = Query(None), cursor: Optional[str] = Query(None),
+                       fields: Optional[str] = Query(None),
+                       format: str = Query(FORMAT_JSON, pattern=FORMAT_PATTERN)):
     """
     プロジェクト一覧を取得する
     
+    絞り込み・並べ替え・ページングはスナップショットごとに作成したインデックスで評価する。
+    status / process / line / division / factory はカンマ区切りで複数の値を指定できる（いずれかに一致）。
+    
     Args:
         file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
+        since: 指定した場合、このスナップショットバージョン以降に追加・変更・削除されたプロジェクトのみを返す
+        status: プロジェクトのステータス
+        has_delay: 遅延の有無
+        process: 工程
+        line: ライン
+        division: 事業部
+        factory: 工場
+        progress_min: 進捗率の下限（含む）
+        progress_max: 進捗率の上限（含む）
+        sort: 並べ替えフィールド
+        order: 並べ替え順（asc / desc）
+        limit: ページサイズ（指定時は items / total / next_cursor を含むページを返す）
+        cursor: 前のページの next_cursor
+        fields: レスポンスに含めるフィールド（カンマ区切り。project_id は常に含む）
+        format: columnar の場合、一覧を列指向形式（ヘッダー + 列ごとの配列）で返す
         
     Returns:
-        プロジェクト一覧
+        プロジェクト一覧・ページまたは差分（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
+        since のバージョンが履歴に残っていない場合、カーソル作成後にデータが更新された場合は 410
     """
     try:
-        # データの読み込みと処理 - 非同期版
-        df = await async_load_and_process_data(file_path)
-        
-        # データフレームの基本情報をログ出力
-        logger.info(f"データフレーム行数: {df.shape[0]}, 列数: {df.shape[1]}")
-        logger.info(f"列名: {df.columns.tolist()}")
-        
-        # 遅延タスクの検出 - 修正: 明示的に日付のみで比較
-        delayed_tasks_df = check_delays(df)
-        # 文字列型に統一して比較するために明示的に変換
-        delayed_project_ids = set(delayed_tasks_df['project_id'].astype(str).unique())
-        logger.info(f"遅延プロジェクト数: {len(delayed_project_ids)}")
-        logger.info(f"遅延プロジェクトID: {delayed_project_ids}")
-        
-        # 遅延タスクのサンプルログ
-        if not delayed_tasks_df.empty:
-            sample = delayed_tasks_df.head(3)
-            logger.info(f"遅延タスクサンプル:\n{sample[['project_id', 'task_id', 'task_name', 'task_finish_date', 'task_status']]}")
-        
-        # マイルストーン列の値をログ出力
-        if 'task_milestone' in df.columns:
-            unique_values = df['task_milestone'].unique()
-            logger.info(f"task_milestone列のユニーク値: {unique_values}")
-            milestone_count = df[df['task_milestone'] == '○'].shape[0]
-            logger.info(f"'○'マークのあるタスク数: {milestone_count}")
-        
-        # 日付列の状態をログ出力
-        if 'task_finish_date' in df.columns:
-            date_sample = df['task_finish_date'].head(3).tolist()
-            logger.info(f"task_finish_date列のサンプル: {date_sample}")
-            
-            # 現在日付との比較
-            import datetime as dt
-            current_date = dt.datetime.now()
-            logger.info(f"現在日付: {current_date}")
-            
-            # 現在日付から時刻情報を除外して比較するために修正
-            current_date_only = current_date.replace(hour=0, minute=0, second=0, microsecond=0).date()
-            future_dates = df[df['task_finish_date'].dt.date > current_date_only].shape[0]
-            logger.info(f"現在日付より未来の日付を持つタスク数: {future_dates}")
+        try:
+            query = ProjectQuery.from_params(
+                status=status, process=process, line=line, division=division, factory=factory,
+                has_delay=has_delay, progress_min=progress_min, progress_max=progress_max,
+                sort=sort, descending=(order == "desc"), limit=limit, cursor=cursor
+            )
+            selected = parse_fields(fields, Project)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if since is not None and not query.is_empty:
+            raise HTTPException(status_code=400, detail="since は絞り込み・並べ替え・ページングと併用できません")
+        if since is not None and format == FORMAT_COLUMNAR:
+            raise HTTPException(status_code=400, detail="since は format=columnar と併用できません")
+        
+        # データセットに変更がなければ 304、エンコード済みのボディがあればそれを返す
+        cache = await open_cached_request(request, file_path, sources)
+        if cache.cached_response is not None:
+            return cache.cached_response
+        
+        if since is None and query.is_empty:
+            # ETag・バージョンと同じスナップショットから作成する
+            df = await cache.frame(columns_for(selected))
+            projects = await load_projects(df=df, fields=selected)
+            if format == FORMAT_COLUMNAR:
+                return cache.respond(to_columnar(projects, Project, selected))
+            return cache.respond(projects, include_for(selected))
+        
+        if since is None:
+            index = await get_project_index(cache)
+            try:
+                page = index.page(query)
+            except StaleCursorError as e:
+                raise HTTPException(status_code=410, detail=f"{str(e)}。最初のページから再取得してください")
+            except CursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             
-            # 遅延タスク数のチェック - 修正: 日付部分のみで比較
-            delayed_tasks_count = len(df[(df['task_finish_date'].dt.date < current_date_only) & (df['task_status'] != '完了')])
-            logger.info(f"遅延タスク数（期限切れで未完了）: {delayed_tasks_count}")
-        
-        # プロジェクト進捗の計算 - 非同期版
-        progress_data = await async_calculate_progress(df)
+            logger.info(f"プロジェクト一覧を絞り込みました: {len(page['items'])}/{page['total']}件 (全{len(index)}件)")
+            if format == FORMAT_COLUMNAR:
+                columnar = to_columnar(page['items'], Project, selected)
+                if not query.is_paged:
+                    return cache.respond(columnar)
+                return cache.respond({**page, 'version': index.version, 'items': columnar})
+            if not query.is_paged:
+                return cache.respond(page['items'], include_for(selected))
+            return cache.respond(
+                ProjectPage(version=index.version, **page),
+                include_within(selected, ProjectPage, 'items')
+            )
+        
+        # バージョン履歴から変更されたプロジェクトIDを求める（未計算のフィンガープリントを計算する場合がある）
+        # 途中で再ロードされても、差分・内容・ETag が同じスナップショットを指すようにする
+        changes = await run_in_cpu_executor(
+            get_event_broker().changes_since, cache.entry.key, since, cache.version
+        )
+        if changes is None:
+            raise HTTPException(
+                status_code=410,
+                detail=f"指定されたバージョンは履歴に残っていません。全件を再取得してください: {since}"
+            )
         
-        # 次のマイルストーン情報を取得（過去のマイルストーンも含むオプションを追加）
-        next_milestones = get_next_milestone(df, include_past=True)
-        logger.info(f"取得されたマイルストーン数: {next_milestones.shape[0]}")
+        updated_ids = set(changes['added']) | set(changes['changed'])
+        projects = []
+        if updated_ids:
+            df = await cache.frame(columns_for(selected))
+            projects = await load_projects(df=df, fields=selected)
+        delta = ProjectDelta(
+            version=changes['version'],
+            since=since,
+            added=[p for p in projects if p.project_id in changes['added']],
+            changed=[p for p in projects if p.project_id in changes['changed']],
+            removed=changes['removed']
+        )
+        return cache.respond(delta, include_within(selected, ProjectDelta, 'added', 'changed'))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"データの取得に失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}")
+
+async def get_project_index(cache: CachedRequest) -> ProjectIndex:
+    """
+    スナップショットのプロジェクトインデックスを取得する（なければ作成して派生キャッシュに保存）
+    
+    遅延判定や次のマイルストーンは日付に依存するため、日付ごとに作成する。
+    
+    Args:
+        cache: open_cached_request() の結果
         
-        # デバッグ情報のログ出力
-        logger.debug(f"進捗データの列: {progress_data.columns.tolist()}")
+    Returns:
+        プロジェクトインデックス
+    """
+    registry = get_dataset_registry()
+    key = (PROJECT_INDEX_PREFIX, datetime.date.today().isoformat())
+    index, hit = registry.get_derived(cache.entry, key)
+    if hit and index.version == cache.version:
+        return index
+    
+    snapshot = cache.snapshot
+    df = await cache.frame(PROGRESS_COLUMNS)
+    projects = await load_projects(df=df)
+    index = await run_in_cpu_executor(
+        lambda: ProjectIndex(projects, project_attributes(snapshot), cache.version)
+    )
+    registry.set_derived(cache.entry, key, index, cache.version)
+    logger.info(f"プロジェクトインデックスを作成しました: {len(index)}件 (version={cache.version})")
+    return index
+
+def columns_for(fields: Optional[FrozenSet[str]] = None):
+    """プロジェクト一覧の作成に必要な列（パス列は必要な場合のみ結合する）"""
+    needs_paths = wants(fields, 'project_path') or wants(fields, 'ganttchart_path')
+    return PROGRESS_COLUMNS if needs_paths else CORE_COLUMNS
+
+async def load_projects(file_path: Optional[str] = None, sources: Optional[str] = None,
+                        df=None, fields: Optional[FrozenSet[str]] = None) -> List[Project]:
+    """
+    プロジェクト一覧を作成する（タイムラインなど他のエンドポイントからも利用）
+    
+    Args:
+        file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
+        df: 読み込み済みのデータフレーム（columns_for(fields) の列を含むこと。指定時は読み込みを省略）
+        fields: 必要なフィールド（指定時は遅延判定・次のマイルストーン・パス列の結合のうち不要なものを省略）
         
-        # Pydanticモデルに変換
-        projects = []
+    Returns:
+        プロジェクト一覧（省略したフィールドは既定値）
+    """
+    try:
+        # データの読み込みと処理 - 非同期版（進捗計算に必要な列のみ、パス列は必要な場合のみ結合）
+        if df is None:
+            df = await async_load_and_process_data(file_path, columns_for(fields), sources)
         
-        # pandasのインポート
-        from app.services.async_loader import lazy_import
-        pd = lazy_import("pandas")
+        # プロジェクト進捗の計算 - 非同期版
+        progress_data = await async_calculate_progress(df)
         
-        for _, row in progress_data.iterrows():
-            try:
-                # プロジェクトIDを文字列に変換 - 明示的な変換で一貫性を確保
-                project_id_str = str(row['project_id'])
-                
-                # 遅延状態のチェック - 明示的な変換と比較で一貫性を確保
-                has_delay = project_id_str in delayed_project_ids
-                logger.debug(f"プロジェクト {project_id_str} の遅延状態: {has_delay}")
-                
-                # マイルストーン情報をフォーマット
-                milestone_info = next_milestone_format(next_milestones, project_id_str)
-                logger.debug(f"プロジェクトID {project_id_str} のマイルストーン情報: {milestone_info}")
-                
-                project = Project(
-                    project_id=project_id_str,
-                    project_name=str(row['project_name']),
-                    process=str(row['process']) if not pd.isna(row['process']) else "",
-                    line=str(row['line']) if not pd.isna(row['line']) else "",
-                    total_tasks=int(row['total_tasks']),
-                    completed_tasks=int(row['completed_tasks']),
-                    milestone_count=int(row['milestone_count']),
-                    start_date=row['start_date'],
-                    end_date=row['end_date'],
-                    project_path=str(row['project_path']) if 'project_path' in row and not pd.isna(row['project_path']) else None,
-                    ganttchart_path=str(row['ganttchart_path']) if 'ganttchart_path' in row and not pd.isna(row['ganttchart_path']) else None,
-                    progress=float(row['progress']),
-                    duration=int(row['duration']),
-                    next_milestone=milestone_info,
-                    has_delay=has_delay  # 明示的に遅延フラグを設定
-                )
-                projects.append(project)
-            except Exception as e:
-                logger.error(f"プロジェクトデータの変換エラー: {e}, Row: {row}")
-        
-        logger.info(f"{len(projects)}件のプロジェクトを取得しました")
-        
-        # 遅延フラグ統計を出力
-        delayed_projects_count = sum(1 for p in projects if p.has_delay)
-        logger.info(f"遅延フラグありのプロジェクト: {delayed_projects_count}/{len(projects)}")
+        # 遅延判定・モデルへの変換はイベントループを塞がないよう CPU プールで行う
+        projects = await run_in_cpu_executor(build_projects, df, progress_data, fields)
         
         return projects
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"データの取得に失敗しました: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}")
 
+def build_projects(df, progress_data, fields: Optional[FrozenSet[str]] = None) -> List[Project]:
+    """
+    進捗データからプロジェクト一覧を作成する（CPU プールで実行する）
+    
+    Args:
+        df: PROGRESS_COLUMNS（またはコア列）を含むデータフレーム
+        progress_data: calculate_progress() の結果
+        fields: 必要なフィールド（指定時は遅延判定・次のマイルストーンのうち不要なものを省略）
+        
+    Returns:
+        プロジェクト一覧（省略したフィールドは既定値）
+    """
+    # 遅延タスクの検出 - 修正: 明示的に日付のみで比較
+    delayed_tasks_df = check_delays(df) if wants(fields, 'has_delay') else df.iloc[0:0]
+    # 文字列型に統一して比較するために明示的に変換
+    delayed_project_ids = set(delayed_tasks_df['project_id'].astype(str).unique())
+    logger.info(f"遅延プロジェクト数: {len(delayed_project_ids)}")
+    
+    # 列の状態・件数の集計などの診断情報はデバッグトレースが有効なリクエストのみ出力
+    # （通常は /api/diagnostics/dataset でスナップショットごとに1回だけ計算する）
+    if debug_trace_enabled():
+        diagnostics = get_dataset_diagnostics(df, datetime.date.today().isoformat())
+        logger.info(f"データセット診断: {diagnostics}")
+    
+    # 次のマイルストーン情報を取得（過去のマイルストーンも含むオプションを追加）
+    include_next_milestone = wants(fields, 'next_milestone')
+    if include_next_milestone:
+        next_milestones = get_next_milestone(df, include_past=True)
+        logger.info(f"取得されたマイルストーン数: {next_milestones.shape[0]}")
+    
+    # デバッグ情報のログ出力
+    logger.debug(f"進捗データの列: {progress_data.columns.tolist()}")
+    
+    # Pydanticモデルに変換
+    projects = []
+    
+    # pandasのインポート
+    from app.services.async_loader import lazy_import
+    pd = lazy_import("pandas")
+    
+    for _, row in progress_data.iterrows():
+        try:
+            # プロジェクトIDを文字列に変換 - 明示的な変換で一貫性を確保
+            project_id_str = str(row['project_id'])
+            
+            # 遅延状態のチェック - 明示的な変換と比較で一貫性を確保
+            has_delay = project_id_str in delayed_project_ids
+            logger.debug(f"プロジェクト {project_id_str} の遅延状態: {has_delay}")
+            
+            # マイルストーン情報をフォーマット
+            milestone_info = None
+            if include_next_milestone:
+                milestone_info = next_milestone_format(next_milestones, project_id_str)
+                logger.debug(f"プロジェクトID {project_id_str} のマイルストーン情報: {milestone_info}")
+            
+            project = Project(
+                project_id=project_id_str,
+                project_name=str(row['project_name']),
+                process=str(row['process']) if not pd.isna(row['process']) else "",
+                line=str(row['line']) if not pd.isna(row['line']) else "",
+                total_tasks=int(row['total_tasks']),
+                completed_tasks=int(row['completed_tasks']),
+                milestone_count=int(row['milestone_count']),
+                start_date=row['start_date'],
+                end_date=row['end_date'],
+                project_path=str(row['project_path']) if 'project_path' in row and not pd.isna(row['project_path']) else None,
+                ganttchart_path=str(row['ganttchart_path']) if 'ganttchart_path' in row and not pd.isna(row['ganttchart_path']) else None,
+                progress=float(row['progress']),
+                duration=int(row['duration']),
+                next_milestone=milestone_info,
+                has_delay=has_delay  # 明示的に遅延フラグを設定
+            )
+            projects.append(project)
+        except Exception as e:
+            logger.error(f"プロジェクトデータの変換エラー: {e}, Row: {row}")
+    
+    logger.info(f"{len(projects)}件のプロジェクトを取得しました")
+    
+    # 遅延フラグ統計を出力
+    delayed_projects_count = sum(1 for p in projects if p.has_delay)
+    logger.info(f"遅延フラグありのプロジェクト: {delayed_projects_count}/{len(projects)}")
+    
+    return projects
+
 @router.get("/projects/{project_id}", response_model=Project)
-async def get_project(project_id: str, file_path: str = Query(None)):
+@admission_controlled(PROJECTS, cached=True)
+async def get_project(project_id: str, request: Request,
+                      file_path: str = Query(None), fields: Optional[str] = Query(None)):
     """
     プロジェクト詳細を取得する
     
     Args:
         project_id: プロジェクトID
         file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        fields: レスポンスに含めるフィールド（カンマ区切り。project_id は常に含む）
         
     Returns:
-        プロジェクト詳細
+        プロジェクト詳細（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
     """
     try:
-        # データの読み込みと処理 - 非同期版
-        df = await async_load_and_process_data(file_path)
+        try:
+            selected = parse_fields(fields, Project)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # 遅延タスクの検出 - 修正: 明示的に日付のみで比較
-        delayed_tasks_df = check_delays(df)
-        # 文字列型に統一して比較するために明示的に変換
-        delayed_project_ids = set(delayed_tasks_df['project_id'].astype(str).unique())
-        logger.info(f"遅延プロジェクト数: {len(delayed_project_ids)}")
+        # データセットに変更がなければ 304、エンコード済みのボディがあればそれを返す
+        cache = await open_cached_request(request, file_path)
+        if cache.cached_response is not None:
+            return cache.cached_response
+        
+        # ETag・バージョンと同じスナップショットから作成する（進捗計算に必要な列のみ）
+        df = await cache.frame(PROGRESS_COLUMNS)
         
         # プロジェクト進捗の計算 - 非同期版
         progress_data = await async_calculate_progress(df)
         
-        # 次のマイルストーン情報を取得（過去のマイルストーンも含む）
-        next_milestones = get_next_milestone(df, include_past=True)
-        
-        # project_idを文字列として扱う - 明示的な変換
-        project_id_str = str(project_id)
-        logger.debug(f"リクエストされたプロジェクトID: {project_id}, 変換後: {project_id_str}")
-        
-        # pandasのインポート
-        from app.services.async_loader import lazy_import
-        pd = lazy_import("pandas")
-        
-        # 該当プロジェクトのデータを抽出 - プロジェクトIDを文字列として比較
-        project_data = progress_data[progress_data['project_id'].astype(str) == project_id_str]
-        
-        if len(project_data) == 0:
+        # 遅延判定・モデルへの変換はイベントループを塞がないよう CPU プールで行う
+        project = await run_in_cpu_executor(build_project, df, progress_data, project_id, selected)
+        if project is None:
             raise HTTPException(status_code=404, detail=f"プロジェクトが見つかりません: {project_id}")
         
-        row = project_data.iloc[0]
-        
-        # 遅延状態のチェック - 明示的に文字列変換して厳密に比較
-        has_delay = project_id_str in delayed_project_ids
-        logger.info(f"プロジェクト {project_id_str} の遅延状態: {has_delay}")
-        
-        # マイルストーン情報をフォーマット
-        milestone_info = next_milestone_format(next_milestones, project_id_str)
-        
-        # Pydanticモデルに変換
-        project = Project(
-            project_id=project_id_str,  # 明示的に文字列に変換
-            project_name=str(row['project_name']),
-            process=str(row['process']) if not pd.isna(row['process']) else "",
-            line=str(row['line']) if not pd.isna(row['line']) else "",
-            total_tasks=int(row['total_tasks']),
-            completed_tasks=int(row['completed_tasks']),
-            milestone_count=int(row['milestone_count']),
-            start_date=row['start_date'],
-            end_date=row['end_date'],
-            project_path=str(row['project_path']) if 'project_path' in row and not pd.isna(row['project_path']) else None,
-            ganttchart_path=str(row['ganttchart_path']) if 'ganttchart_path' in row and not pd.isna(row['ganttchart_path']) else None,
-            progress=float(row['progress']),
-            duration=int(row['duration']),
-            next_milestone=milestone_info,
-            has_delay=has_delay  # 明示的に遅延フラグを設定
-        )
-        
-        return project
+        return cache.respond(project, include_for(selected))
         
     except HTTPException:
         raise
@@ -209,8 +343,79 @@ async def get_project(project_id: str, file_path: str = Query(None)):
         logger.error(f"データの取得に失敗しました: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}")
 
+def build_project(df, progress_data, project_id: str,
+                  fields: Optional[FrozenSet[str]] = None) -> Optional[Project]:
+    """
+    進捗データから1件のプロジェクト詳細を作成する（CPU プールで実行する）
+    
+    Args:
+        df: PROGRESS_COLUMNS を含むデータフレーム
+        progress_data: calculate_progress() の結果
+        project_id: プロジェクトID
+        fields: 必要なフィールド（指定時は遅延判定・次のマイルストーンのうち不要なものを省略）
+        
+    Returns:
+        プロジェクト詳細（見つからない場合は None）
+    """
+    # 遅延タスクの検出 - 修正: 明示的に日付のみで比較
+    delayed_project_ids = set()
+    if wants(fields, 'has_delay'):
+        delayed_tasks_df = check_delays(df)
+        # 文字列型に統一して比較するために明示的に変換
+        delayed_project_ids = set(delayed_tasks_df['project_id'].astype(str).unique())
+        logger.info(f"遅延プロジェクト数: {len(delayed_project_ids)}")
+    
+    # project_idを文字列として扱う - 明示的な変換
+    project_id_str = str(project_id)
+    logger.debug(f"リクエストされたプロジェクトID: {project_id}, 変換後: {project_id_str}")
+    
+    # pandasのインポート
+    from app.services.async_loader import lazy_import
+    pd = lazy_import("pandas")
+    
+    # 該当プロジェクトのデータを抽出 - プロジェクトIDを文字列として比較
+    project_data = progress_data[progress_data['project_id'].astype(str) == project_id_str]
+    
+    if len(project_data) == 0:
+        return None
+    
+    row = project_data.iloc[0]
+    
+    # 遅延状態のチェック - 明示的に文字列変換して厳密に比較
+    has_delay = project_id_str in delayed_project_ids
+    logger.info(f"プロジェクト {project_id_str} の遅延状態: {has_delay}")
+    
+    # マイルストーン情報をフォーマット（過去のマイルストーンも含む）
+    milestone_info = None
+    if wants(fields, 'next_milestone'):
+        next_milestones = get_next_milestone(df, include_past=True)
+        milestone_info = next_milestone_format(next_milestones, project_id_str)
+    
+    # Pydanticモデルに変換
+    project = Project(
+        project_id=project_id_str,  # 明示的に文字列に変換
+        project_name=str(row['project_name']),
+        process=str(row['process']) if not pd.isna(row['process']) else "",
+        line=str(row['line']) if not pd.isna(row['line']) else "",
+        total_tasks=int(row['total_tasks']),
+        completed_tasks=int(row['completed_tasks']),
+        milestone_count=int(row['milestone_count']),
+        start_date=row['start_date'],
+        end_date=row['end_date'],
+        project_path=str(row['project_path']) if 'project_path' in row and not pd.isna(row['project_path']) else None,
+        ganttchart_path=str(row['ganttchart_path']) if 'ganttchart_path' in row and not pd.isna(row['ganttchart_path']) else None,
+        progress=float(row['progress']),
+        duration=int(row['duration']),
+        next_milestone=milestone_info,
+        has_delay=has_delay  # 明示的に遅延フラグを設定
+    )
+    
+    return project
+
 @router.get("/projects/{project_id}/recent-tasks", response_model=RecentTasks)
-async def get_project_recent_tasks(project_id: str, file_path: str = Query(None)):
+@admission_controlled(PROJECTS, cached=True)
+async def get_project_recent_tasks(project_id: str, request: Request,
+                                   file_path: str = Query(None)):
     """
     プロジェクトの直近のタスク情報を取得する
     
@@ -219,24 +424,28 @@ async def get_project_recent_tasks(project_id: str, file_path: str = Query(None)
         file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
         
     Returns:
-        直近のタスク情報
+        直近のタスク情報（データセットに変更がなければ 304、キャッシュ済みならエンコード済みのボディ）
     """
     try:
-        # データの読み込みと処理 - 非同期版
-        df = await async_load_and_process_data(file_path)
+        # データセットに変更がなければ 304、エンコード済みのボディがあればそれを返す
+        cache = await open_cached_request(request, file_path)
+        if cache.cached_response is not None:
+            return cache.cached_response
+        
+        # ETag・バージョンと同じスナップショットから作成する
+        df = await cache.frame()
         
         # project_idを文字列として扱う - 明示的な変換
         project_id_str = str(project_id)
         
-        # project_idが数値型の場合に対応 - プロジェクトIDの型変換を明示的に実施
-        df_with_str_id = df.copy()
-        df_with_str_id['project_id'] = df_with_str_id['project_id'].astype(str)
-        
         # プロジェクトの直近のタスク情報を取得 - 非同期版
-        recent_tasks = await async_get_recent_tasks(df_with_str_id, project_id_str)
+        # (get_recent_tasks 内で文字列として比較するため、データセットのフレームをそのまま渡す)
+        recent_tasks = await async_get_recent_tasks(df, project_id_str)
         
-        return RecentTasks(**recent_tasks)
+        return cache.respond(RecentTasks(**recent_tasks))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"直近タスク情報の取得に失敗しました: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"直近タスク情報の取得に失敗しました: {str(e)}")
\ No newline at end of file
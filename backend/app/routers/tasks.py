@@ -0,0 +1,171 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+import asyncio
+import datetime
+import logging
+import os
+
+from app.services.async_loader import import_numpy, import_pandas
+from app.services.executors import run_in_cpu_executor, ExecutorSaturatedError
+from app.services.deadlines import OperationCancelledError
+from app.services.admission import admission_controlled, AdmittedStreamingResponse, EXPORT
+from app.services.data_processing import async_get_dataset
+from app.services.dataset_snapshot import ALL_COLUMNS
+
+router = APIRouter()
+logger = logging.getLogger("api.tasks")
+
+# 1回に書き出す行数
+DEFAULT_CHUNK_ROWS = 5000
+MAX_CHUNK_ROWS = 100000
+
+# 送信開始後に CPU プールが飽和していた場合に再投入するまでの待機時間（秒）
+SATURATED_RETRY_DELAY = 0.05
+
+# 出力形式ごとの Content-Type
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def select_task_rows(df, project_id: Optional[str] = None, status: Optional[str] = None,
+                     date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None):
+    """
+    条件に一致するタスクの行位置を求める
+
+    Args:
+        df: タスクのデータフレーム
+        project_id: プロジェクトID（カンマ区切りで複数指定可）
+        status: タスクのステータス（カンマ区切りで複数指定可）
+        date_from: この日以降に終了するタスク
+        date_to: この日以前に開始するタスク
+
+    Returns:
+        行位置の配列（期間は開始日〜終了日が指定範囲と重なるタスクを対象とする）
+    """
+    np = import_numpy()
+    pd = import_pandas()
+    mask = np.ones(len(df), dtype=bool)
+
+    if project_id:
+        ids = [v.strip() for v in project_id.split(',') if v.strip()]
+        mask &= df['project_id'].astype(str).isin(ids).to_numpy()
+    if status and 'task_status' in df.columns:
+        statuses = [v.strip() for v in status.split(',') if v.strip()]
+        mask &= df['task_status'].isin(statuses).to_numpy()
+    if date_from is not None and 'task_finish_date' in df.columns:
+        mask &= (df['task_finish_date'] >= pd.Timestamp(date_from)).to_numpy()
+    if date_to is not None and 'task_start_date' in df.columns:
+        mask &= (df['task_start_date'] < pd.Timestamp(date_to) + pd.Timedelta(days=1)).to_numpy()
+
+    return np.flatnonzero(mask)
+
+
+def encode_task_chunk(df, positions, format: str, include_header: bool) -> bytes:
+    """
+    行位置のチャンクを出力形式でエンコードする
+
+    Args:
+        df: タスクのデータフレーム
+        positions: チャンクの行位置
+        format: ndjson / csv
+        include_header: CSVのヘッダー行を含めるかどうか（最初のチャンクのみ）
+
+    Returns:
+        エンコード済みのバイト列
+    """
+    chunk = df.take(positions)
+    if format == "csv":
+        text = chunk.to_csv(index=False, header=include_header)
+        # Excel で文字化けしないよう先頭に BOM を付ける（ソースCSVと同じ utf-8-sig）
+        return ("\ufeff" + text if include_header else text).encode("utf-8")
+
+    text = chunk.to_json(orient="records", lines=True, date_format="iso", date_unit="s", force_ascii=False)
+    return (text if text.endswith("\n") else text + "\n").encode("utf-8")
+
+
+@router.get("/tasks/export")
+@admission_controlled(EXPORT, merge=False)
+async def export_tasks(request: Request,
+                       file_path: str = Query(None), sources: Optional[str] = Query(None),
+                       project_id: Optional[str] = Query(None), status: Optional[str] = Query(None),
+                       date_from: Optional[datetime.date] = Query(None), date_to: Optional[datetime.date] = Query(None),
+                       format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                       chunk_size: Optional[int] = Query(None, ge=1, le=MAX_CHUNK_ROWS)):
+    """
+    タスク一覧をストリーミングでエクスポートする
+
+    データセットのスナップショットから条件に一致する行の位置だけを求め、
+    一定行数ごとにエンコードして送信するため、レスポンスの大きさに関わらずメモリ使用量は一定。
+
+    Args:
+        file_path: ダッシュボードCSVファイルのパス（指定がない場合はデフォルト）
+        sources: 集約する拠点のエクスポートディレクトリ（カンマ区切り、glob可）
+        project_id: プロジェクトID（カンマ区切りで複数指定可）
+        status: タスクのステータス（カンマ区切りで複数指定可）
+        date_from: 期間の開始日（この日以降に終了するタスク）
+        date_to: 期間の終了日（この日以前に開始するタスク）
+        format: 出力形式（ndjson / csv）
+        chunk_size: 1回に書き出す行数（指定がない場合は TASK_EXPORT_CHUNK_ROWS または 5000）
+
+    Returns:
+        NDJSON（1行1タスク）またはCSVのストリーミングレスポンス
+    """
+    try:
+        entry = await async_get_dataset(file_path, sources)
+        snapshot = entry.snapshot
+        if snapshot.is_error:
+            raise HTTPException(status_code=500, detail="データセットの読み込みに失敗しているためエクスポートできません")
+
+        df = await run_in_cpu_executor(snapshot.frame, ALL_COLUMNS)
+        positions = await run_in_cpu_executor(select_task_rows, df, project_id, status, date_from, date_to)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"タスクのエクスポートに失敗しました: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"タスクのエクスポートに失敗しました: {str(e)}")
+
+    rows_per_chunk = chunk_size or int(os.environ.get('TASK_EXPORT_CHUNK_ROWS', DEFAULT_CHUNK_ROWS))
+    total = len(positions)
+    logger.info(f"タスクのエクスポートを開始します: {total}/{len(df)}行 (format={format}, version={entry.version})")
+
+    async def stream():
+        sent = 0
+        for start in range(0, max(total, 1), rows_per_chunk):
+            if await request.is_disconnected():
+                logger.info(f"クライアントが切断したためエクスポートを中止しました: {sent}/{total}行")
+                return
+            window = positions[start:start + rows_per_chunk]
+            if len(window) == 0 and format != "csv":
+                break
+            chunk = None
+            while chunk is None:
+                try:
+                    # 送信開始後は期限が解除され、切断による取り消しのみ有効
+                    chunk = await run_in_cpu_executor(encode_task_chunk, df, window, format, start == 0)
+                except ExecutorSaturatedError:
+                    # ヘッダー送信後は 503 を返せないため、待ち行列が空くまで待って再投入する
+                    await asyncio.sleep(SATURATED_RETRY_DELAY)
+                    if await request.is_disconnected():
+                        logger.info(f"クライアントが切断したためエクスポートを中止しました: {sent}/{total}行")
+                        return
+                except OperationCancelledError:
+                    logger.info(f"クライアントが切断したためエクスポートを中止しました: {sent}/{total}行")
+                    return
+            yield chunk
+            sent += len(window)
+        logger.info(f"タスクのエクスポートが完了しました: {sent}行")
+
+    # 流入制御の実行枠は送信が終わるまで保持する（EXPORT の同時実行数はエンコード・送信中も対象）
+    filename = f"tasks.{'csv' if format == 'csv' else 'ndjson'}"
+    return AdmittedStreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Total-Count": str(total),
+            "X-Dataset-Version": str(entry.version),
+            "Cache-Control": "no-cache",
+        }
+    )
@@ -0,0 +1,411 @@
+"""
+重いエンドポイントの流入制御
+- エンドポイントのグループごとに同時実行数と待ち行列の上限を設け、超えたリクエストには
+  計算を行わずに 503（Retry-After 付き）を返す
+- 同じリクエスト（パス・クエリ・条件付きヘッダーが同一）が実行中または待機中の場合は、
+  新たに計算せずにその結果を共有する（共有している全てのリクエストが期限切れ・切断するまで打ち切らない）
+- CPU プールの待ち行列が上限に達した場合（ExecutorSaturatedError）も 503 として返す
+  （流入制御の対象外のルート・流入制御を無効にした場合はアプリの例外ハンドラーで 503 に変換する）
+- レスポンスキャッシュを使うエンドポイントは、304・キャッシュ済みのボディで応答できる場合は
+  実行枠を待たずに返す（計算が必要な場合のみ流入制御の対象とする）
+- AdmittedStreamingResponse を返すエンドポイントは、ボディの送信が終わるまで実行枠を保持する
+  （レスポンスを返した時点で枠を返却すると、送信中のエンコード処理が同時実行数の対象外になるため）
+- 期限切れで打ち切った処理は 504、クライアントの切断で打ち切った処理は 499 として返す
+  （ルートに関わらずアプリの例外ハンドラーで変換する）
+"""
+
+import asyncio
+import functools
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .executors import ExecutorSaturatedError
+from .deadlines import (
+    OperationCancelledError, SharedDeadline,
+    check_deadline, current_deadline, deadline_scope
+)
+
+# ロガー設定
+logger = logging.getLogger("api.admission")
+
+# グループ名
+PROJECTS = 'projects'
+MILESTONES = 'milestones'
+TIMELINE = 'timeline'
+DASHBOARD = 'dashboard'
+EXPORT = 'export'
+
+# Retry-After の範囲（秒）
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+# 処理時間の統計に使う直近の件数
+DURATION_SAMPLE_SIZE = 64
+
+
+def _default_limits(name: str) -> Dict[str, float]:
+    """グループごとの既定の同時実行数・待ち行列の上限・待機のタイムアウト（秒）"""
+    if name == EXPORT:
+        return {'concurrency': 2, 'queue': 4, 'timeout': 10.0}
+    return {'concurrency': 4, 'queue': 16, 'timeout': 10.0}
+
+
+def admission_enabled() -> bool:
+    """流入制御が有効かどうか"""
+    return os.environ.get('ADMISSION_CONTROL_ENABLED', '1') != '0'
+
+
+class AdmissionRejectedError(RuntimeError):
+    """同時実行数と待ち行列が上限に達している、または待機がタイムアウトした場合のエラー"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    ボディの送信が終わるまで（切断・エラーを含む）流入制御の実行枠を保持するストリーミングレスポンス
+
+    admission_controlled(merge=False) のエンドポイントから返すと、枠の返却は送信の完了時に行われる。
+    """
+
+    release: Optional[Callable[[], None]] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.release is not None:
+                release, self.release = self.release, None
+                release()
+
+
+class AdmissionLimiter:
+    """
+    同時実行数と待ち行列の上限を持つリミッター（イベントループ上で使用する）
+
+    実行中が max_concurrent に達している場合は待ち行列で待機し、
+    待ち行列も queue_size に達している場合は即座に AdmissionRejectedError を送出する。
+    """
+
+    def __init__(self, name: str, max_concurrent: int, queue_size: int, queue_timeout: float):
+        """
+        Args:
+            name: グループ名
+            max_concurrent: 同時実行数
+            queue_size: 待ち行列の上限
+            queue_timeout: 待ち行列で待機する最大時間（秒）
+        """
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = max(0.0, queue_timeout)
+        self._active = 0
+        self._waiters: deque = deque()
+        self._inflight: Dict[Hashable, Tuple[asyncio.Future, SharedDeadline]] = {}
+        self._durations = deque(maxlen=DURATION_SAMPLE_SIZE)
+        self.admitted = 0
+        self.queued_total = 0
+        self.merged = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.completed = 0
+
+    def retry_after(self) -> int:
+        """待ち行列が解消するまでの目安（秒）"""
+        average = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        rounds = (len(self._waiters) + self._active) / self.max_concurrent
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(average * max(1.0, rounds))))
+
+    def _wake_next(self) -> None:
+        """待機中のリクエストに実行枠を引き渡す"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+                return
+
+    def _release(self) -> None:
+        """実行枠を返却する"""
+        self._active -= 1
+        self._wake_next()
+
+    def _complete(self, started: float) -> None:
+        """処理時間を記録して実行枠を返却する"""
+        self._durations.append(time.monotonic() - started)
+        self.completed += 1
+        self._release()
+
+    async def _acquire(self) -> None:
+        """実行枠を取得する（上限に達している場合は待機または拒否）"""
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise AdmissionRejectedError(
+                f"{self.name} の同時実行数が上限に達しています "
+                f"(active={self._active}, queued={len(self._waiters)})",
+                self.retry_after()
+            )
+
+        # リクエストの期限が先に来る場合はそれまでしか待たない
+        timeout = self.queue_timeout
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() is not None:
+            timeout = min(timeout, deadline.remaining())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        try:
+            done, _ = await asyncio.wait([waiter], timeout=timeout)
+        except asyncio.CancelledError:
+            # 枠を引き渡された直後に取り消された場合は返却する
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+            raise
+
+        if not done:
+            waiter.cancel()
+            self.timed_out += 1
+            check_deadline('admission')
+            raise AdmissionRejectedError(
+                f"{self.name} の待ち行列で {self.queue_timeout:g} 秒以内に実行されませんでした",
+                self.retry_after()
+            )
+
+    async def run(self, key: Optional[Hashable], func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        実行枠を取得して処理を実行する
+
+        Args:
+            key: 同じリクエストを判定するキー（None の場合は共有しない）
+            func: 実行する処理（コルーチンを返す関数）
+
+        Returns:
+            処理の結果（同じキーの処理が実行中・待機中の場合はその結果）
+
+        Raises:
+            AdmissionRejectedError: 上限に達している、または待機がタイムアウトした場合
+        """
+        while key is not None and key in self._inflight:
+            shared, shared_deadline = self._inflight[key]
+            self.merged += 1
+            deadline = current_deadline()
+            shared_deadline.join(deadline)
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                # 先行リクエストが取り消された場合は自身で実行する（自身の取り消しはそのまま送出）
+                if not shared.cancelled():
+                    raise
+            except OperationCancelledError:
+                # 先行リクエストが打ち切られた直後に参加した場合は自身の期限内で実行する
+                check_deadline('admission')
+            finally:
+                shared_deadline.leave(deadline)
+
+        shared = shared_deadline = None
+        if key is not None:
+            shared = asyncio.get_running_loop().create_future()
+            shared_deadline = SharedDeadline(current_deadline())
+            self._inflight[key] = (shared, shared_deadline)
+        try:
+            await self._acquire()
+            # 待ち行列にいる間に期限切れ・切断した場合は実行しない
+            try:
+                if shared_deadline is not None:
+                    shared_deadline.check('admission')
+                else:
+                    check_deadline('admission')
+            except OperationCancelledError:
+                self._release()
+                raise
+            self.admitted += 1
+            started = time.monotonic()
+            held = False
+            try:
+                if shared_deadline is None:
+                    result = await func()
+                else:
+                    # 結果を共有するリクエストの期限を集約して実行する
+                    with deadline_scope(shared_deadline):
+                        result = await func()
+                if isinstance(result, AdmittedStreamingResponse) and shared is None:
+                    # 送信が終わるまで枠を保持する
+                    result.release = functools.partial(self._complete, started)
+                    held = True
+            finally:
+                if not held:
+                    self._complete(started)
+            if shared is not None:
+                shared.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            if shared is not None:
+                shared.cancel()
+            raise
+        except BaseException as e:
+            if shared is not None and not shared.done():
+                shared.set_exception(e)
+                # 共有しているリクエストがない場合に「未取得の例外」として記録されないようにする
+                shared.exception()
+            raise
+        finally:
+            if key is not None and self._inflight.get(key, (None,))[0] is shared:
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """実行数・待機数などの統計"""
+        durations = list(self._durations)
+        return {
+            'max_concurrent': self.max_concurrent,
+            'queue_size': self.queue_size,
+            'queue_timeout': self.queue_timeout,
+            'active': self._active,
+            'queued': sum(1 for waiter in self._waiters if not waiter.done()),
+            'inflight_keys': len(self._inflight),
+            'admitted': self.admitted,
+            'queued_total': self.queued_total,
+            'merged': self.merged,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'completed': self.completed,
+            'avg_duration_ms': round(sum(durations) / len(durations) * 1000, 3) if durations else 0.0,
+        }
+
+
+# グループごとのリミッター（遅延作成）
+_limiters: Dict[str, AdmissionLimiter] = {}
+
+
+def get_limiter(name: str) -> AdmissionLimiter:
+    """
+    グループのリミッターを取得する（初回は環境変数の設定で作成）
+
+    同時実行数は ADMISSION_<NAME>_CONCURRENCY、待ち行列の上限は ADMISSION_<NAME>_QUEUE、
+    待機のタイムアウト（秒）は ADMISSION_<NAME>_TIMEOUT で設定する。
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        defaults = _default_limits(name)
+        prefix = f"ADMISSION_{name.upper()}"
+        limiter = AdmissionLimiter(
+            name,
+            int(os.environ.get(f"{prefix}_CONCURRENCY", defaults['concurrency'])),
+            int(os.environ.get(f"{prefix}_QUEUE", defaults['queue'])),
+            float(os.environ.get(f"{prefix}_TIMEOUT", defaults['timeout']))
+        )
+        _limiters[name] = limiter
+        logger.info(
+            f"{name} の流入制御を設定しました (concurrency={limiter.max_concurrent}, "
+            f"queue={limiter.queue_size}, timeout={limiter.queue_timeout:g}s)"
+        )
+    return limiter
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    """作成済みのリミッターの統計"""
+    return {name: limiter.stats() for name, limiter in list(_limiters.items())}
+
+
+def request_key(request: Request) -> Hashable:
+    """同じ結果になるリクエストを判定するキー（条件付きGET・圧縮の有無を含む）"""
+    from .http_cache import normalized_query
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    return (
+        request.method, request.url.path, normalized_query(request),
+        request.headers.get("if-none-match"), accepts_gzip
+    )
+
+
+def overloaded(message: str, retry_after: int) -> HTTPException:
+    """503 レスポンスの例外を作成する"""
+    return HTTPException(status_code=503, detail=message, headers={"Retry-After": str(retry_after)})
+
+
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError) -> JSONResponse:
+    """プールの飽和を 503（Retry-After 付き）として返す（アプリの例外ハンドラー）"""
+    return JSONResponse(
+        {"detail": exc.detail}, status_code=503, headers={"Retry-After": str(MIN_RETRY_AFTER)}
+    )
+
+
+async def operation_cancelled_handler(request: Request, exc: OperationCancelledError) -> JSONResponse:
+    """期限切れ・切断で打ち切った処理を 504 / 499 として返す（アプリの例外ハンドラー）"""
+    logger.info(f"リクエストの処理を中止しました: {str(exc)}")
+    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+
+
+async def _cached_response(request: Optional[Request], kwargs: Dict[str, Any]) -> Optional[Any]:
+    """
+    304・キャッシュ済みのボディで応答できる場合はそのレスポンスを返す
+
+    作成したキャッシュ処理のコンテキストはリクエストに保存し、エンドポイントの
+    open_cached_request() で再利用する。データセットの読み込みに失敗した場合は
+    エンドポイント側でエラーを返すため None を返す。
+    """
+    if request is None:
+        return None
+    from .http_cache import open_cached_request
+    try:
+        cache = await open_cached_request(request, kwargs.get('file_path'), kwargs.get('sources'))
+    except OperationCancelledError:
+        raise
+    except Exception as e:
+        logger.debug(f"キャッシュの事前確認に失敗しました: {e}")
+        return None
+    return cache.cached_response
+
+
+def admission_controlled(name: str, merge: bool = True, cached: bool = False) -> Callable:
+    """
+    エンドポイントに流入制御を適用するデコレータ
+
+    エンドポイントは Request を引数に取ること（同じリクエストの判定に使用）。
+    ストリーミングレスポンスなど結果を共有できないエンドポイントには merge=False を指定する。
+    open_cached_request() を使うエンドポイントには cached=True を指定すると、304・キャッシュ済みの
+    ボディは実行枠を待たずに返す（file_path / sources 引数でデータセットを判定する）。
+
+    Args:
+        name: グループ名（同じグループのエンドポイントで実行枠を共有する）
+        merge: 同じリクエストの結果を共有するかどうか
+        cached: 流入制御の前にレスポンスキャッシュを確認するかどうか
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not admission_enabled():
+                return await func(*args, **kwargs)
+
+            limiter = get_limiter(name)
+            request = next((value for value in kwargs.values() if isinstance(value, Request)), None)
+            key = request_key(request) if merge and request is not None else None
+            try:
+                if cached:
+                    response = await _cached_response(request, kwargs)
+                    if response is not None:
+                        return response
+                return await limiter.run(key, lambda: func(*args, **kwargs))
+            except AdmissionRejectedError as e:
+                logger.warning(f"リクエストを拒否しました: {str(e)}")
+                raise overloaded(str(e), e.retry_after)
+            except ExecutorSaturatedError as e:
+                raise overloaded(str(e), limiter.retry_after())
+
+        return wrapper
+    return decorator
@@ -0,0 +1,156 @@
+"""
+列指向（columnar）形式のレスポンス
+- 一覧をヘッダー（列名・型・辞書）と列ごとの配列で表現する
+- 文字列列は重複があれば辞書エンコード（辞書 + インデックス配列、欠損は -1）
+- 日付列は基準日（date_origin）からの日数で表現する
+"""
+
+import datetime
+import enum
+import logging
+import typing
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+# ロガー設定
+logger = logging.getLogger("api.columnar")
+
+# format パラメータの値
+FORMAT_JSON = 'json'
+FORMAT_COLUMNAR = 'columnar'
+FORMAT_PATTERN = f"^({FORMAT_JSON}|{FORMAT_COLUMNAR})$"
+
+# 列の型
+TYPE_STRING = 'string'
+TYPE_DICT = 'dict'
+TYPE_DATE = 'date'
+TYPE_INT = 'int'
+TYPE_FLOAT = 'float'
+TYPE_BOOL = 'bool'
+TYPE_JSON = 'json'
+
+
+def _field_kind(annotation: Any) -> str:
+    """モデルのフィールド型から列の型を決める"""
+    # Optional[X] は X として扱う
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, enum.Enum):
+            return TYPE_DICT
+        if issubclass(annotation, bool):
+            return TYPE_BOOL
+        if issubclass(annotation, int):
+            return TYPE_INT
+        if issubclass(annotation, float):
+            return TYPE_FLOAT
+        if issubclass(annotation, str):
+            return TYPE_STRING
+        if issubclass(annotation, (datetime.datetime, datetime.date)):
+            return TYPE_DATE
+    return TYPE_JSON
+
+
+def _dictionary_encode(values: List[Any]) -> Dict[str, Any]:
+    """
+    文字列列を辞書エンコードする
+
+    Returns:
+        dictionary（出現順の値）/ indices（各行の辞書内の位置、欠損は -1）を含む辞書
+    """
+    dictionary: Dict[Any, int] = {}
+    indices = []
+    for value in values:
+        if value is None:
+            indices.append(-1)
+            continue
+        if isinstance(value, enum.Enum):
+            value = value.value
+        index = dictionary.get(value)
+        if index is None:
+            index = dictionary[value] = len(dictionary)
+        indices.append(index)
+    return {'dictionary': list(dictionary), 'indices': indices}
+
+
+def _to_date(value: Any) -> Optional[datetime.date]:
+    """日時（ISO 8601 文字列を含む）を日付に変換する"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def _column_values(items: Sequence[Any], name: str) -> List[Any]:
+    """モデルまたは辞書の一覧から列の値を取り出す"""
+    return [item.get(name) if isinstance(item, dict) else getattr(item, name) for item in items]
+
+
+def to_columnar(items: Sequence[Any], model_class: Type[BaseModel],
+                fields: Optional[typing.AbstractSet[str]] = None) -> Dict[str, Any]:
+    """
+    モデルの一覧を列指向形式に変換する
+
+    Args:
+        items: モデル（またはモデルと同じキーを持つ辞書）の一覧
+        model_class: モデルクラス（列の型はフィールドの型定義から決める）
+        fields: 含めるフィールド（None の場合は全フィールド）
+
+    Returns:
+        format / count / date_origin / header / columns を含む辞書
+        （columns[i] は header[i] の列の値）
+    """
+    names = [name for name in model_class.model_fields if fields is None or name in fields]
+    raw_columns = {name: _column_values(items, name) for name in names}
+
+    # 日付列の基準日（全日付列の最小値）
+    kinds = {name: _field_kind(model_class.model_fields[name].annotation) for name in names}
+    date_columns = {
+        name: [_to_date(value) for value in raw_columns[name]]
+        for name in names if kinds[name] == TYPE_DATE
+    }
+    dates = [value for values in date_columns.values() for value in values if value is not None]
+    origin = min(dates) if dates else None
+
+    header: List[Dict[str, Any]] = []
+    columns: List[List[Any]] = []
+    for name in names:
+        kind = kinds[name]
+        values = raw_columns[name]
+
+        if kind in (TYPE_STRING, TYPE_DICT):
+            encoded = _dictionary_encode(values)
+            # 全て異なる値（IDなど）の文字列列は辞書エンコードしない
+            if kind == TYPE_DICT or len(encoded['dictionary']) < len(values):
+                header.append({'name': name, 'type': TYPE_DICT, 'dictionary': encoded['dictionary']})
+                columns.append(encoded['indices'])
+                continue
+            header.append({'name': name, 'type': TYPE_STRING})
+            columns.append(values)
+        elif kind == TYPE_DATE:
+            header.append({'name': name, 'type': TYPE_DATE})
+            columns.append([
+                (value - origin).days if value is not None else None for value in date_columns[name]
+            ])
+        elif kind == TYPE_JSON:
+            header.append({'name': name, 'type': TYPE_JSON})
+            columns.append(jsonable_encoder(values))
+        else:
+            header.append({'name': name, 'type': kind})
+            columns.append(values)
+
+    return {
+        'format': FORMAT_COLUMNAR,
+        'count': len(items),
+        'date_origin': origin.isoformat() if origin is not None else None,
+        'header': header,
+        'columns': columns,
+    }
@@ -9,6 +9,8 @@
 """
 
 import os
+import io
+import asyncio
 import logging
 import functools
 import time
@@ -17,17 +19,31 @@ from typing import Optional, Dict, Any, List
 from pathlib import Path
 
 # ロガー設定
+# （出力はルートロガーのハンドラーに任せる）
 logger = logging.getLogger(__name__)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
 # 非同期ローダーをインポート
 from .async_loader import (
     lazy_import, import_pandas, import_numpy, import_datetime,
-    run_in_threadpool, async_cache_result, register_init_task
+    async_cache_result, register_init_task
 )
+from .executors import run_in_io_executor, run_in_cpu_executor, executor_stats
+from .admission import admission_stats
+from .deadlines import OperationCancelledError, check_deadline, deadline_scope
+from .loop_monitor import loop_monitor_stats
+from .debug_trace import debug_trace_enabled
+from .runtime_metrics import record_cache
+from .tracing import span, traced, trace_scope
+from .profiling import detached_profile
+from .process_compute import offload_to_process, read_csv_bytes, get_stats as get_process_compute_stats
+from .dataset_snapshot import (
+    DatasetSnapshot, CORE_COLUMNS, ALL_COLUMNS, convert_date_columns
+)
+from .dataset_registry import DatasetRegistry, DatasetEntry, source_signature
+from .multi_site import AggregateLoader, aggregate_key, is_aggregate_key
+from .path_discovery import get_discovery
+from .dataset_events import DatasetEventBroker
 
 # 暗号化ユーティリティを遅延インポート
 crypto_utils = None
@@ -48,19 +64,62 @@ COLORS = {
     }
 }
 
-# インメモリキャッシュ - TTLと容量制限つき
+# インメモリキャッシュ - TTLと容量制限つき（データセットに紐づかない関数用）
 _data_cache = {}
 _cache_stats = {'hits': 0, 'misses': 0}
 _MAX_CACHE_ENTRIES = 50
 
-# データファイルのデフォルトパスをプリキャッシュ
-_default_dashboard_path = None
+# 集約データセットのローダー（キーごとに拠点別のフレームを保持）
+_aggregate_loaders: Dict[str, AggregateLoader] = {}
+
+# 進捗計算で使用する列（コア列 + projects.csv のパス列）
+PROGRESS_COLUMNS = CORE_COLUMNS + ['project_path', 'ganttchart_path']
+
+# 実行中の先読みタスク（ガベージコレクションで破棄されないよう参照を保持）
+_prefetch_tasks = set()
+
+
+def _get_aggregate_loader(key: str) -> AggregateLoader:
+    """集約データセットのローダーを取得する"""
+    loader = _aggregate_loaders.get(key)
+    if loader is None:
+        loader = _aggregate_loaders.setdefault(key, AggregateLoader(columns=PROGRESS_COLUMNS))
+    return loader
+
+
+def _dataset_signature(key: str):
+    """データセットの更新検知用の署名"""
+    if is_aggregate_key(key):
+        return _get_aggregate_loader(key).signature(key)
+    return source_signature(key)
+
+
+def _load_dataset(key: str) -> DatasetSnapshot:
+    """レジストリのキーに応じてスナップショットを作成する"""
+    if is_aggregate_key(key):
+        return _get_aggregate_loader(key).load(key)
+    return load_dataset_snapshot(key)
+
+
+def _on_dataset_event(event: str, entry: DatasetEntry) -> None:
+    """退避された集約データセットの拠点別フレームを解放する"""
+    if event == 'evicted':
+        _aggregate_loaders.pop(entry.key, None)
+
+
+# データセットレジストリ - 解決済みパスごとにスナップショットと派生キャッシュを保持
+_dataset_registry = DatasetRegistry(loader=_load_dataset, signature_func=_dataset_signature)
+_dataset_registry.add_listener(_on_dataset_event)
+
+# データセット変更通知 - スナップショットの差し替えをプロジェクト単位の差分として配信
+_dataset_events = DatasetEventBroker()
+_dataset_registry.add_listener(_dataset_events.on_dataset_event)
 
 
 @register_init_task
 async def initialize_data_processing():
     """データ処理モジュールの初期化"""
-    global pd, datetime, concurrent, _default_dashboard_path, crypto_utils
+    global pd, datetime, concurrent, crypto_utils
     
     # 必要なモジュールをバックグラウンドでインポート
     pd = import_pandas()
@@ -76,8 +135,8 @@ async def initialize_data_processing():
     except ImportError:
         logger.warning("暗号化ユーティリティをロードできませんでした")
     
-    # デフォルトパスを非同期で解決
-    _default_dashboard_path = await run_in_threadpool(resolve_dashboard_path)
+    # デフォルトパスを非同期で解決（探索結果をキャッシュ）
+    await async_resolve_dashboard_path()
     
     logger.info("データ処理モジュールの初期化が完了しました")
     
@@ -88,6 +147,29 @@ def cache_result(ttl_seconds: int = 300, max_entries: int = _MAX_CACHE_ENTRIES):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            # データセットのフレームを引数に取る関数はデータセットごとの派生キャッシュを使用
+            frames = [arg for arg in args if _is_frame(arg)]
+            if frames:
+                owner = _dataset_registry.owner_of(frames[0])
+                if owner is None:
+                    # 出所が不明なフレームは安全にキャッシュできないため直接実行
+                    return func(*args, **kwargs)
+                
+                entry, projection = owner
+                derived_key = (func.__name__, projection) + tuple(
+                    arg for arg in args if isinstance(arg, (str, int, float, bool))
+                ) + tuple(sorted(
+                    (k, v) for k, v in kwargs.items() if isinstance(v, (str, int, float, bool))
+                ))
+                
+                # 同じ計算が進行中であればその結果を待つ
+                value, hit = _dataset_registry.get_or_compute(
+                    entry, derived_key, ttl_seconds, lambda: func(*args, **kwargs)
+                )
+                _cache_stats['hits' if hit else 'misses'] += 1
+                record_cache('derived', 'hit' if hit else 'miss')
+                return value
+            
             # キャッシュキー作成 - 高速化
             key_parts = [func.__name__]
             for arg in args:
@@ -107,10 +189,12 @@ def cache_result(ttl_seconds: int = 300, max_entries: int = _MAX_CACHE_ENTRIES):
                 age = time.time() - timestamp
                 if age < ttl_seconds:
                     _cache_stats['hits'] += 1
+                    record_cache('function', 'hit')
                     return data
             
             # キャッシュミス時は関数実行
             _cache_stats['misses'] += 1
+            record_cache('function', 'miss')
             result = func(*args, **kwargs)
             
             # キャッシュサイズ管理 - 容量超過時は古いデータを削除
@@ -125,115 +209,68 @@ def cache_result(ttl_seconds: int = 300, max_entries: int = _MAX_CACHE_ENTRIES):
     return decorator
 
 
+def _is_frame(value) -> bool:
+    """値がデータフレームかどうか"""
+    return isinstance(value, import_pandas().DataFrame)
+
+
+def resolve_dataset_key(dashboard_file_path: Optional[str] = None, sources: Optional[str] = None) -> str:
+    """
+    データセットレジストリのキー（解決済みパス）を返す
+    
+    Args:
+        dashboard_file_path: ダッシュボードCSVファイルパス（指定がない場合はデフォルト）
+        sources: 集約するエクスポートディレクトリ（カンマ区切り、glob可）。指定時は集約データセット
+        
+    Returns:
+        解決済みパス（集約データセットの場合は集約キー）
+    """
+    if sources:
+        return aggregate_key(sources)
+    if not dashboard_file_path:
+        dashboard_file_path = resolve_dashboard_path()
+    return str(Path(dashboard_file_path).resolve())
+
+
 def resolve_dashboard_path() -> str:
     """
     環境に応じたダッシュボードデータパスを解決
+    候補は並列に確認し、結果はキャッシュする（ファイルの消失や優先度の高い候補の出現で再探索）
     
     Returns:
         解決されたパス
     """
-    # グローバルにキャッシュされたパスがあれば使用
-    global _default_dashboard_path
-    if _default_dashboard_path is not None:
-        return _default_dashboard_path
-        
-    # 検索するパスのリスト
-    search_paths = []
-    
-    # 2. アプリケーションバンドルパスを試行
-    app_path = os.environ.get('APP_PATH', '')
-    if app_path:
-        bundle_path = Path(app_path) / "data" / "exports" / "dashboard.csv"
-        if bundle_path.exists():
-            path_str = str(bundle_path)
-            _default_dashboard_path = path_str
-            return path_str
-        search_paths.append(str(bundle_path))
-        
-        # 暗号化ファイルを確認 (追加)
-        encrypted_bundle_path = Path(app_path) / "data" / "exports" / "dashboard.csv.enc"
-        if encrypted_bundle_path.exists():
-            path_str = str(encrypted_bundle_path)
-            _default_dashboard_path = path_str
-            return path_str
-        search_paths.append(str(encrypted_bundle_path))
-    
-    # 3. ユーザーディレクトリの特定フォルダを検索（新しい実装）
-    # ユーザーのホームディレクトリ
-    home_dir = Path.home()
-    
-    # 検索対象のフォルダ
-    user_folders = [
-        home_dir / "Documents",  # Windows/macOS
-        home_dir / "Desktop",    # Windows/macOS
-        home_dir / "Downloads",  # Windows/macOS
-        home_dir / "ドキュメント",  # 日本語Windows
-        home_dir / "デスクトップ",  # 日本語Windows
-        home_dir / "ダウンロード",  # 日本語Windows
-        home_dir / "文書",      # 日本語macOS
-    ]
-    
-    # フォルダが存在するか確認し、存在するフォルダのみに絞り込む
-    user_folders = [folder for folder in user_folders if folder.exists()]
-    
-    # 各フォルダ内の "data/exports/dashboard.csv" を検索パスに追加
-    for folder in user_folders:
-        # 通常のCSVファイル
-        target_path = folder / "ProjectSuite" / "ProjectManager" / "data" / "exports" / "dashboard.csv"
-        search_paths.append(str(target_path))
-        
-        # ファイルが存在する場合は即座に返す（最適化）
-        if target_path.exists():
-            path_str = str(target_path)
-            _default_dashboard_path = path_str
-            logger.info(f"データファイルを発見: {path_str}")
-            return path_str
-            
-        # 暗号化ファイル (追加)
-        encrypted_target_path = folder / "ProjectSuite" / "ProjectManager" / "data" / "exports" / "dashboard.csv.enc"
-        search_paths.append(str(encrypted_target_path))
-        
-        # 暗号化ファイルが存在する場合は即座に返す (追加)
-        if encrypted_target_path.exists():
-            path_str = str(encrypted_target_path)
-            _default_dashboard_path = path_str
-            logger.info(f"暗号化データファイルを発見: {path_str}")
-            return path_str
-    
-    # 並列なしで高速にパスを検索
-    for path in search_paths:
-        if os.path.exists(path):
-            _default_dashboard_path = path
-            return path
-    
-    # 最終的には最初のパスを返す（存在しなくても）
-    fallback_path = str(user_folders[0] / "data" / "exports" / "dashboard.csv") if user_folders else str(home_dir / "data" / "exports" / "dashboard.csv")
-    logger.warning(f"データファイルが見つかりません。フォールバックパス: {fallback_path}")
-    _default_dashboard_path = fallback_path
-    return fallback_path
+    return get_discovery()['path']
+
+
+async def async_resolve_dashboard_path() -> str:
+    """ダッシュボードデータパスを解決する - 非同期版"""
+    return await run_in_io_executor(resolve_dashboard_path)
 
 # ファイル拡張子チェック関数 (追加)
 def is_encrypted_file(file_path: str) -> bool:
     """ファイルが暗号化されているかどうかをチェック"""
     return file_path.endswith('.enc')
 
-@cache_result(ttl_seconds=60)  # 60秒キャッシュ
-def load_and_process_data(dashboard_file_path: Optional[str] = None):
+def load_dataset_snapshot(dashboard_file_path: Optional[str] = None) -> DatasetSnapshot:
     """
-    データの読み込みと処理 - 最適化版
-    同期版のロード関数（内部で非同期版を呼び出す）
+    データの読み込みとスナップショットの作成
+    コア列のみを先行パースし、その他の列グループは初回アクセス時にパースする
     
     Args:
         dashboard_file_path: ダッシュボードCSVファイルパス
         
     Returns:
-        処理済みのデータフレーム
+        データセットスナップショット
     """
     # 遅延インポート
     global pd, crypto_utils
     if pd is None:
         pd = import_pandas()
     
+    load_start = time.time()
+    temp_decrypted_path = None
+    
     try:
         # パスが指定されていない場合はデフォルトパスを使用
         if not dashboard_file_path:
@@ -243,8 +280,8 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
         dashboard_path = Path(dashboard_file_path).resolve()
         
         # 暗号化ファイルのチェックと処理 (追加)
+        check_deadline('decrypt')
         is_encrypted = is_encrypted_file(str(dashboard_path))
-        temp_decrypted_path = None
         
         if is_encrypted and crypto_utils:
             try:
@@ -254,7 +291,8 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
                 temp_dir.mkdir(exist_ok=True)
                 temp_decrypted_path = os.path.join(temp_dir, os.path.basename(dashboard_path)[:-4])
                 
-                crypto_utils.decrypt_file(dashboard_path, temp_decrypted_path)
+                with span('decrypt'):
+                    crypto_utils.decrypt_file(dashboard_path, temp_decrypted_path)
                 logger.info(f"ファイルを復号化しました: {temp_decrypted_path}")
                 
                 # 復号化したファイルを使用
@@ -277,7 +315,8 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
                     temp_dir.mkdir(exist_ok=True)
                     temp_decrypted_path = os.path.join(temp_dir, os.path.basename(dashboard_path))
                     
-                    crypto_utils.decrypt_file(encrypted_path, temp_decrypted_path)
+                    with span('decrypt'):
+                        crypto_utils.decrypt_file(encrypted_path, temp_decrypted_path)
                     logger.info(f"ファイルを復号化しました: {temp_decrypted_path}")
                     
                     # 復号化したファイルを使用
@@ -307,7 +346,8 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
                                 temp_dir.mkdir(exist_ok=True)
                                 temp_decrypted_path = os.path.join(temp_dir, os.path.basename(alt_path)[:-4])
                                 
-                                crypto_utils.decrypt_file(alt_path, temp_decrypted_path)
+                                with span('decrypt'):
+                                    crypto_utils.decrypt_file(alt_path, temp_decrypted_path)
                                 logger.info(f"代替ファイルを復号化しました: {temp_decrypted_path}")
                                 
                                 # 復号化したファイルを使用
@@ -331,20 +371,40 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
                         except:
                             pass
                     
-                    return error_df
+                    return DatasetSnapshot.from_frame(error_df, str(dashboard_path))
+        
+        # 生データを一度だけ読み込む（遅延列グループのパースで再利用）
+        check_deadline('read')
+        with span('read', bytes=0) as read_span:
+            with open(dashboard_path, 'rb') as f:
+                raw_data = f.read()
+            read_span.set(bytes=len(raw_data))
         
         # 効率的なエンコーディング検出と読み込み
         df = None
+        header = None
         encoding_errors = []
         encodings = ['utf-8-sig', 'utf-8', 'cp932', 'shift-jis']
         
         # 順次試行（高速化のため並列処理は使わない）
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(dashboard_path, encoding=encoding)
-                break
-            except Exception as e:
-                encoding_errors.append(f"{encoding}: {str(e)}")
+        check_deadline('parse')
+        with span('parse') as parse_span:
+            for encoding in encodings:
+                try:
+                    # エンコーディングの再試行ごとの時間もスパンとして記録
+                    with span('read_csv', encoding=encoding):
+                        header = pd.read_csv(io.BytesIO(raw_data), encoding=encoding, nrows=0).columns.tolist()
+                        # コア列のみを先行パース（コア列が無い未知の形式は全列をパース）
+                        core_columns = [col for col in header if col in CORE_COLUMNS] or None
+                        df = read_csv_bytes(raw_data, encoding, core_columns)
+                    break
+                except Exception as e:
+                    encoding_errors.append(f"{encoding}: {str(e)}")
+            parse_span.set(
+                encoding=encoding if df is not None else None,
+                attempts=len(encoding_errors) + (1 if df is not None else 0),
+                rows=len(df) if df is not None else 0
+            )
         
         if df is None:
             logger.error(f"すべてのエンコーディングで読み込みに失敗: {encoding_errors}")
@@ -356,12 +416,13 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
                 except:
                     pass
             
-            return pd.DataFrame({
+            return DatasetSnapshot.from_frame(pd.DataFrame({
                 "error": ["CSVファイルの読み込みに失敗しました。以下のエンコーディングを試しましたが失敗しました:"],
                 "details": ["\n".join(encoding_errors)]
-            })
+            }), str(dashboard_path))
         
         # 成功したらプロジェクトデータも読み込み
+        check_deadline('merge')
         projects_file_path = str(dashboard_path).replace('dashboard.csv', 'projects.csv')
         encrypted_projects_file_path = projects_file_path + '.enc'
         
@@ -374,7 +435,8 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
                 temp_dir.mkdir(exist_ok=True)
                 temp_projects_path = os.path.join(temp_dir, "projects.csv")
                 
-                crypto_utils.decrypt_file(encrypted_projects_file_path, temp_projects_path)
+                with span('decrypt'):
+                    crypto_utils.decrypt_file(encrypted_projects_file_path, temp_projects_path)
                 logger.info(f"プロジェクトファイルを復号化しました: {temp_projects_path}")
                 
                 # 復号化したファイルを使用
@@ -382,30 +444,20 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
             except Exception as e:
                 logger.error(f"プロジェクトファイルの復号化に失敗しました: {e}")
         
+        # プロジェクトデータは生データのみ保持し、パス列の初回アクセス時に結合する
+        projects_data = None
         if os.path.exists(projects_file_path):
-            # プロジェクトデータの読み込み
             try:
-                # エンコーディングの再利用
-                projects_df = pd.read_csv(projects_file_path, encoding=encoding)
-                
-                # データの結合
-                df = pd.merge(
-                    df,
-                    projects_df[['project_id', 'project_path', 'ganttchart_path']],
-                    on='project_id',
-                    how='left'
-                )
+                with span('read_projects'):
+                    with open(projects_file_path, 'rb') as f:
+                        projects_data = f.read()
             except Exception as e:
                 logger.warning(f"プロジェクトデータの読み込みエラー: {e}")
         
         # 日付列の処理
-        date_columns = ['task_start_date', 'task_finish_date', 'created_at']
-        for col in date_columns:
-            if col in df.columns:
-                try:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-                except Exception as e:
-                    logger.warning(f"{col}列の日付変換エラー: {e}")
+        check_deadline('convert')
+        with span('convert_dates', rows=len(df)):
+            convert_date_columns(df)
         
         # 一時ファイルのクリーンアップ (追加)
         if temp_decrypted_path and os.path.exists(temp_decrypted_path):
@@ -414,10 +466,19 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
             except:
                 pass
         
-        return df
+        return DatasetSnapshot(
+            df,
+            source_path=str(dashboard_path),
+            raw_data=raw_data,
+            encoding=encoding,
+            header=header,
+            projects_data=projects_data,
+            load_time=time.time() - load_start
+        )
         
     except Exception as e:
-        logger.error(f"データ読み込み総合エラー: {e}")
+        if not isinstance(e, OperationCancelledError):
+            logger.error(f"データ読み込み総合エラー: {e}")
         
         # 一時ファイルのクリーンアップ (追加)
         if temp_decrypted_path and os.path.exists(temp_decrypted_path):
@@ -426,23 +487,112 @@ def load_and_process_data(dashboard_file_path: Optional[str] = None):
             except:
                 pass
         
-        return pd.DataFrame({"error": [f"データ読み込み処理中にエラーが発生しました: {str(e)}"]})
+        # 打ち切った場合はエラーのスナップショットを登録せずに送出する
+        if isinstance(e, OperationCancelledError):
+            logger.info(f"データの読み込みを中止しました: {e}")
+            raise
+        
+        return DatasetSnapshot.from_frame(
+            pd.DataFrame({"error": [f"データ読み込み処理中にエラーが発生しました: {str(e)}"]}),
+            dashboard_file_path
+        )
+
+
+def get_dataset(dashboard_file_path: Optional[str] = None, sources: Optional[str] = None) -> DatasetEntry:
+    """
+    データセットを取得する（レジストリ経由、ソース更新時は再ロード）
+    
+    Args:
+        dashboard_file_path: ダッシュボードCSVファイルパス
+        sources: 集約するエクスポートディレクトリ（カンマ区切り、glob可）
+        
+    Returns:
+        データセットエントリ
+    """
+    with span('dataset'):
+        return _dataset_registry.get(resolve_dataset_key(dashboard_file_path, sources))
 
 
-async def async_load_and_process_data(dashboard_file_path: Optional[str] = None):
+async def async_get_dataset(dashboard_file_path: Optional[str] = None, sources: Optional[str] = None) -> DatasetEntry:
+    """データセットを取得する - 非同期版"""
+    return await run_in_io_executor(get_dataset, dashboard_file_path, sources)
+
+
+def load_and_process_data(dashboard_file_path: Optional[str] = None, columns=None,
+                          sources: Optional[str] = None):
+    """
+    データの読み込みと処理 - 最適化版
+    
+    Args:
+        dashboard_file_path: ダッシュボードCSVファイルパス
+        columns: 必要な列（None の場合はコア列のみ、ALL_COLUMNS の場合は全列）
+        sources: 集約するエクスポートディレクトリ（カンマ区切り、glob可）
+        
+    Returns:
+        処理済みのデータフレーム
+    """
+    with span('load_and_process_data') as s:
+        entry = get_dataset(dashboard_file_path, sources)
+        with span('frame'):
+            df = entry.snapshot.frame(columns)
+        s.set(version=entry.version, rows=len(df))
+    return df
+
+
+async def async_load_and_process_data(dashboard_file_path: Optional[str] = None, columns=None,
+                                      sources: Optional[str] = None):
     """
     データの読み込みと処理 - 非同期版
     
     Args:
         dashboard_file_path: ダッシュボードCSVファイルパス
+        columns: 必要な列（None の場合はコア列のみ、ALL_COLUMNS の場合は全列）
+        sources: 集約するエクスポートディレクトリ（カンマ区切り、glob可）
         
     Returns:
         処理済みのデータフレーム
     """
     # スレッドプールで実行
-    return await run_in_threadpool(load_and_process_data, dashboard_file_path)
+    return await run_in_io_executor(load_and_process_data, dashboard_file_path, columns, sources)
+
+
+async def _prefetch_dataset(dashboard_file_path: str) -> None:
+    """データセットのロードと進捗計算を先に済ませておく"""
+    start_time = time.time()
+    try:
+        # 先読みは呼び出し元のリクエストの期限・切断の影響を受けず、そのトレース・プロファイルにも記録しない
+        with deadline_scope(None), trace_scope(None), detached_profile():
+            df = await async_load_and_process_data(dashboard_file_path, PROGRESS_COLUMNS)
+            if 'error' in df.columns or 'error_message' in df.columns:
+                logger.warning(f"先読みしたデータファイルを読み込めませんでした: {dashboard_file_path}")
+                return
+            # 進捗計算の結果はプロジェクト一覧・メトリクスで共有される
+            await async_calculate_progress(df)
+        logger.info(f"データセットを先読みしました: {dashboard_file_path} ({time.time() - start_time:.3f}秒)")
+    except Exception as e:
+        logger.warning(f"データセットの先読みに失敗しました: {dashboard_file_path}: {e}")
+
+
+def schedule_prefetch(dashboard_file_path: Optional[str]) -> None:
+    """
+    選択されたデータファイルの先読みをバックグラウンドで開始する
+    
+    先読み中に同じデータセットへのリクエストが来た場合は、レジストリが
+    進行中のロードの完了を待つため二重に読み込まれることはない。
+    
+    Args:
+        dashboard_file_path: ダッシュボードCSVファイルパス
+    """
+    if not dashboard_file_path:
+        return
+    if os.environ.get('DATASET_PREFETCH_ENABLED', '1') == '0':
+        return
+    task = asyncio.get_running_loop().create_task(_prefetch_dataset(dashboard_file_path))
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
 
 
+@traced()
 def check_delays(df):
     """
     遅延タスクの検出 - 修正版
@@ -458,21 +608,20 @@ def check_delays(df):
     if datetime is None:
         datetime = import_datetime()
     
+    check_deadline('aggregate')
+    
     # 現在日付から時刻情報を削除して日付のみで比較
     current_date = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     
-    # デバッグログ追加
-    logger.info(f"遅延検出: 現在日付 = {current_date.date()}")
-    
     # 明示的に日付部分のみを比較
     delayed_tasks = df[
         (df['task_finish_date'].dt.date < current_date.date()) & 
         (df['task_status'] != '完了')
     ]
     
-    # 検出された遅延タスクの基本情報をログ出力
-    logger.info(f"遅延タスク検出: {len(delayed_tasks)}件")
-    if not delayed_tasks.empty:
+    # 検出された遅延タスクの基本情報をログ出力（プロジェクトIDの集計はデバッグトレース時のみ）
+    logger.info(f"遅延タスク検出: {len(delayed_tasks)}件 (現在日付 = {current_date.date()})")
+    if debug_trace_enabled() and not delayed_tasks.empty:
         logger.info(f"遅延プロジェクトID: {delayed_tasks['project_id'].unique()}")
     
     return delayed_tasks
@@ -495,6 +644,8 @@ def get_delayed_projects_count(df) -> int:
 
 
 @cache_result(ttl_seconds=60)  # 1分キャッシュ
+@traced()
+@offload_to_process
 def calculate_progress(df):
     """
     プロジェクト進捗の計算 - パフォーマンス最適化版
@@ -512,6 +663,8 @@ def calculate_progress(df):
     if datetime is None:
         datetime = import_datetime()
         
+    check_deadline('aggregate')
+    
     try:
         # 空のデータフレームまたはエラーメッセージを含むデータフレームのチェック
         if df.empty:
@@ -567,18 +720,19 @@ def calculate_progress(df):
         # プロジェクト数が少ない場合はpandasの通常処理を使用 - 高速化
         project_groups = df.groupby('project_id')
         
-        # マイルストーン数の計算を高速化
-        if 'task_milestone' in df.columns:
-            milestone_counts = project_groups['task_milestone'].apply(
-                lambda x: x.str.contains('○', na=False).sum()
+        with span('progress_counts'):
+            # マイルストーン数の計算を高速化
+            if 'task_milestone' in df.columns:
+                milestone_counts = project_groups['task_milestone'].apply(
+                    lambda x: x.str.contains('○', na=False).sum()
+                )
+            else:
+                milestone_counts = pd.Series(0, index=df['project_id'].unique())
+            
+            # 完了タスク数の計算
+            completed_counts = project_groups['task_status'].apply(
+                lambda x: (x == '完了').sum()
             )
-        else:
-            milestone_counts = pd.Series(0, index=df['project_id'].unique())
-        
-        # 完了タスク数の計算
-        completed_counts = project_groups['task_status'].apply(
-            lambda x: (x == '完了').sum()
-        )
         
         # 集計処理
         agg_funcs = {
@@ -596,7 +750,8 @@ def calculate_progress(df):
         if 'ganttchart_path' in df.columns:
             agg_funcs['ganttchart_path'] = 'first'
         
-        project_progress = project_groups.agg(agg_funcs).reset_index()
+        with span('progress_aggregate'):
+            project_progress = project_groups.agg(agg_funcs).reset_index()
         
         # 集計結果にマイルストーン数と完了タスク数を追加
         project_progress['milestone_count'] = project_progress['project_id'].map(milestone_counts)
@@ -664,7 +819,7 @@ def calculate_progress(df):
 
 async def async_calculate_progress(df):
     """プロジェクト進捗の計算 - 非同期版"""
-    return await run_in_threadpool(calculate_progress, df)
+    return await run_in_cpu_executor(calculate_progress, df)
 
 
 def get_status_color(progress: float, has_delay: bool) -> str:
@@ -690,6 +845,7 @@ def get_status_color(progress: float, has_delay: bool) -> str:
 
 
 @cache_result(ttl_seconds=60)  # 1分キャッシュ
+@traced()
 def get_next_milestone(df, include_past=False):
     """
     次のマイルストーンを取得（過去のマイルストーンも含めるオプション付き）
@@ -708,20 +864,9 @@ def get_next_milestone(df, include_past=False):
     if pd is None:
         pd = import_pandas()
         
-    current_date = datetime.datetime.now()
-    
-    # マイルストーン列の状態をログ出力
-    if 'task_milestone' in df.columns:
-        unique_values = df['task_milestone'].unique()
-        logger.info(f"task_milestone列のユニーク値: {unique_values}")
-        milestone_count = df[df['task_milestone'] == '○'].shape[0]
-        logger.info(f"'○'マークのあるタスク数: {milestone_count}")
+    check_deadline('aggregate')
     
-    # 現在日付との比較情報をログ出力
-    logger.info(f"現在日付: {current_date}")
-    if 'task_finish_date' in df.columns:
-        future_dates = df[df['task_finish_date'] > current_date].shape[0]
-        logger.info(f"現在日付より未来の日付を持つタスク数: {future_dates}")
+    current_date = datetime.datetime.now()
     
     # マイルストーン基本条件
     milestone_condition = df['task_milestone'] == '○'
@@ -730,12 +875,9 @@ def get_next_milestone(df, include_past=False):
     if not include_past:
         milestone_condition = milestone_condition & (df['task_finish_date'] > current_date)
     
-    # ログ出力を追加
-    milestone_count = df[milestone_condition].shape[0]
-    logger.info(f"マイルストーン条件に一致したタスク数: {milestone_count}")
-    
     # 空の結果に対するフォールバック処理
     result = df[milestone_condition].sort_values('task_finish_date')
+    logger.info(f"マイルストーン条件に一致したタスク数: {len(result)}")
     if result.empty and not include_past:
         logger.info("未来のマイルストーンが見つからないため、過去のマイルストーンも含めます")
         return get_next_milestone(df, True)  # 再帰呼び出しで過去も含める
@@ -743,6 +885,63 @@ def get_next_milestone(df, include_past=False):
     return result
 
 
+@cache_result(ttl_seconds=3600)  # スナップショットと基準日ごとに1回だけ計算
+def get_dataset_diagnostics(df, reference_date: str) -> Dict[str, Any]:
+    """
+    データセットの診断情報（列の状態・件数の集計・サンプル行）を計算
+    
+    Args:
+        df: コア列を含むデータフレーム
+        reference_date: 基準日（ISO形式）
+        
+    Returns:
+        診断情報の辞書
+    """
+    # 遅延インポート
+    global datetime, pd
+    if datetime is None:
+        datetime = import_datetime()
+    if pd is None:
+        pd = import_pandas()
+    
+    check_deadline('aggregate')
+    
+    current_date = datetime.date.fromisoformat(reference_date)
+    diagnostics = {
+        'reference_date': reference_date,
+        'rows': int(df.shape[0]),
+        'columns': df.columns.tolist(),
+    }
+    
+    # マイルストーン列の状態
+    if 'task_milestone' in df.columns:
+        milestones = df['task_milestone']
+        diagnostics['milestone_values'] = [None if pd.isna(v) else str(v) for v in milestones.unique()]
+        diagnostics['milestone_tasks'] = int((milestones == '○').sum())
+    
+    # 日付列の状態と遅延タスク（日付部分のみで比較）
+    if 'task_finish_date' in df.columns:
+        finish_dates = df['task_finish_date'].dt.date
+        diagnostics['finish_date_sample'] = [
+            None if pd.isna(v) else str(v) for v in df['task_finish_date'].head(3).tolist()
+        ]
+        diagnostics['future_tasks'] = int((finish_dates > current_date).sum())
+        
+        delayed = df[(finish_dates < current_date) & (df['task_status'] != '完了')]
+        delayed_project_ids = sorted(set(delayed['project_id'].astype(str)))
+        diagnostics['delayed_tasks'] = len(delayed)
+        diagnostics['delayed_projects'] = len(delayed_project_ids)
+        diagnostics['delayed_project_ids'] = delayed_project_ids
+        
+        sample_columns = [
+            c for c in ['project_id', 'task_id', 'task_name', 'task_finish_date', 'task_status']
+            if c in delayed.columns
+        ]
+        diagnostics['delayed_task_sample'] = delayed.head(3)[sample_columns].astype(str).to_dict('records')
+    
+    return diagnostics
+
+
 def next_milestone_format(next_milestones, project_id: str) -> str:
     """
     マイルストーン表示のフォーマット（強化版）
@@ -796,6 +995,7 @@ def next_milestone_format(next_milestones, project_id: str) -> str:
 
 
 @cache_result(ttl_seconds=30)  # 30秒キャッシュ
+@traced()
 def get_recent_tasks(df, project_id: str) -> Dict[str, Any]:
     """
     プロジェクトの直近のタスク情報を取得する - 最適化版
@@ -812,6 +1012,8 @@ def get_recent_tasks(df, project_id: str) -> Dict[str, Any]:
     if datetime is None:
         datetime = import_datetime()
         
+    check_deadline('aggregate')
+    
     try:
         current_date = datetime.datetime.now()
         
@@ -900,10 +1102,12 @@ def get_recent_tasks(df, project_id: str) -> Dict[str, Any]:
 
 async def async_get_recent_tasks(df, project_id: str) -> Dict[str, Any]:
     """プロジェクトの直近タスク情報取得 - 非同期版"""
-    return await run_in_threadpool(get_recent_tasks, df, project_id)
+    return await run_in_cpu_executor(get_recent_tasks, df, project_id)
 
 
 @cache_result(ttl_seconds=60)  # 60秒キャッシュ
+@traced()
+@offload_to_process
 def get_project_milestones(df, project_id=None):
     """
     プロジェクトのマイルストーン情報を取得する
@@ -922,6 +1126,8 @@ def get_project_milestones(df, project_id=None):
     if pd is None:
         pd = import_pandas()
     
+    check_deadline('aggregate')
+    
     try:
         # データフレームのエラーチェック
         if df.empty or 'error' in df.columns:
@@ -1021,7 +1227,7 @@ async def async_get_project_milestones(df, project_id=None):
     Returns:
         マイルストーン情報のリスト
     """
-    return await run_in_threadpool(get_project_milestones, df, project_id)
+    return await run_in_cpu_executor(get_project_milestones, df, project_id)
 
 
 async def create_milestone(milestone, file_path=None):
@@ -1120,7 +1326,7 @@ async def delete_milestone(milestone_id, file_path=None):
 def clear_cache() -> int:
     """メモリキャッシュをクリアする"""
     global _data_cache
-    cache_size = len(_data_cache)
+    cache_size = len(_data_cache) + _dataset_registry.clear()
     _data_cache = {}
     logger.info(f"キャッシュをクリア: {cache_size}項目を削除しました")
     
@@ -1145,5 +1351,27 @@ def get_cache_stats() -> Dict[str, Any]:
         'hits': _cache_stats['hits'],
         'misses': _cache_stats['misses'],
         'hit_ratio': _cache_stats['hits'] / (_cache_stats['hits'] + _cache_stats['misses']) * 100 if (_cache_stats['hits'] + _cache_stats['misses']) > 0 else 0,
-        'keys': list(_data_cache.keys())
+        'keys': list(_data_cache.keys()),
+        'datasets': len(_dataset_registry.entries())
+    }
+
+
+def get_dataset_registry() -> DatasetRegistry:
+    """データセットレジストリを取得"""
+    return _dataset_registry
+
+
+def get_event_broker() -> DatasetEventBroker:
+    """データセット変更通知のブローカーを取得"""
+    return _dataset_events
+
+
+def get_registry_info() -> Dict[str, Any]:
+    """データセットレジストリ・スレッドプール・流入制御・イベントループの遅延の情報を取得"""
+    return {
+        **_dataset_registry.describe(),
+        'executors': executor_stats(),
+        'process_compute': get_process_compute_stats(),
+        'admission': admission_stats(),
+        'event_loop': loop_monitor_stats(),
     }
\ No newline at end of file
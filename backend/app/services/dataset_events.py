@@ -0,0 +1,319 @@
+"""
+データセット変更通知
+- スナップショットごとにプロジェクト単位のフィンガープリントを計算する
+- スナップショットが差し替えられたら前回との差分（追加・変更・削除されたプロジェクト）を求める
+- 差分をサーバー送信イベント（SSE）の購読者に配信する
+- フィンガープリントは購読者または差分取得（since）のリクエストがあったデータセットのみ、
+  ロードとは別のスレッドで計算する（ロード時間を延ばさず、パス列の遅延結合も妨げない）
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from .async_loader import import_pandas
+from .dataset_snapshot import CORE_COLUMNS, DatasetSnapshot
+
+# ロガー設定
+logger = logging.getLogger("api.dataset_events")
+
+# データセットごとに保持するバージョン履歴の件数
+DEFAULT_HISTORY_SIZE = 16
+# 購読者ごとのキューの上限（溢れた場合は古いメッセージを捨てる）
+SUBSCRIBER_QUEUE_SIZE = 32
+
+# フィンガープリントの対象列（コア列のみ。projects.csv の変更は生データの要約で検知する）
+FINGERPRINT_COLUMNS = CORE_COLUMNS
+
+
+def project_fingerprints(snapshot: DatasetSnapshot) -> Dict[str, str]:
+    """
+    プロジェクトごとのフィンガープリントを計算する
+
+    Args:
+        snapshot: データセットスナップショット
+
+    Returns:
+        プロジェクトID → フィンガープリント（行の並び順に依存しない。
+        projects.csv が変更された場合は全プロジェクトのフィンガープリントが変わる）
+    """
+    if snapshot.is_error or snapshot.row_count == 0:
+        return {}
+
+    pd = import_pandas()
+    df = snapshot.frame(FINGERPRINT_COLUMNS)
+    if 'project_id' not in df.columns:
+        return {}
+
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    project_ids = df['project_id'].astype(str).values
+    grouped = row_hashes.groupby(project_ids)
+    sums = grouped.sum()
+    counts = grouped.size()
+    paths = snapshot.projects_digest or ''
+    return {
+        project_id: f"{int(sums[project_id]) & 0xFFFFFFFFFFFFFFFF:016x}-{int(counts[project_id])}-{paths}"
+        for project_id in sums.index
+    }
+
+
+def diff_fingerprints(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    2つのフィンガープリントの差分を求める
+
+    Returns:
+        added / changed / removed ごとのプロジェクトID一覧
+    """
+    return {
+        'added': sorted(pid for pid in current if pid not in previous),
+        'changed': sorted(pid for pid in current if pid in previous and previous[pid] != current[pid]),
+        'removed': sorted(pid for pid in previous if pid not in current),
+    }
+
+
+class Subscription:
+    """イベントの購読（SSE接続ごとに作成）"""
+
+    def __init__(self, dataset_key: str, loop: asyncio.AbstractEventLoop):
+        self.dataset_key = dataset_key
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def _put(self, message: Dict[str, Any]) -> None:
+        """イベントループのスレッドでキューに追加する"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def deliver(self, message: Dict[str, Any]) -> None:
+        """任意のスレッドからメッセージを配信する"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # イベントループが終了済み
+            pass
+
+
+class DatasetEventBroker:
+    """
+    データセットの変更を検知して購読者に配信する
+
+    レジストリのリスナーとして登録し、'loaded' / 'replaced' イベントのたびにバージョン履歴に追加する。
+    フィンガープリントは追跡中（購読者がいる、または since のリクエストがあった）のデータセットのみ
+    専用のスレッドで計算し、差し替え前のバージョンと比較して購読者に配信する。
+    追跡していないデータセットは最新バージョンのスナップショットのみを保持し、必要になった時点で計算する。
+    """
+
+    def __init__(self, history_size: Optional[int] = None):
+        """
+        Args:
+            history_size: データセットごとに保持するバージョン履歴の件数
+        """
+        if history_size is None:
+            history_size = int(os.environ.get('DATASET_VERSION_HISTORY', DEFAULT_HISTORY_SIZE))
+        self.history_size = max(1, history_size)
+        # バージョン → フィンガープリント（未計算の場合は None）
+        self._history: Dict[str, 'OrderedDict[int, Optional[Dict[str, str]]]'] = {}
+        # フィンガープリントが未計算のバージョンのスナップショット
+        # （追跡していないデータセットは最新バージョンのみ保持する）
+        self._pending: Dict[str, Dict[int, DatasetSnapshot]] = {}
+        self._tracked: Set[str] = set()
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dataset-events")
+        self.published = 0
+
+    def _is_tracked(self, dataset_key: str) -> bool:
+        """フィンガープリントを計算する対象かどうか（ロック取得済みで呼び出す）"""
+        return dataset_key in self._tracked or any(
+            s.dataset_key == dataset_key for s in self._subscriptions
+        )
+
+    def on_dataset_event(self, event: str, entry) -> None:
+        """レジストリのイベントを受け取る（計算は専用のスレッドに任せ、すぐに戻る）"""
+        if event == 'evicted':
+            with self._lock:
+                pending = self._pending.get(entry.key, {})
+                if entry.version not in pending:
+                    return
+                if not self._is_tracked(entry.key):
+                    # 追跡していなければスナップショットを手放す（再ロード後の比較はしない）
+                    pending.clear()
+                    self._discard_unknown(entry.key)
+                    return
+            self._worker.submit(self._resolve, entry.key, entry.version)
+            return
+        if event not in ('loaded', 'replaced'):
+            return
+
+        with self._lock:
+            history = self._history.setdefault(entry.key, OrderedDict())
+            previous_version = next(reversed(history), None)
+            history[entry.version] = None
+            while len(history) > self.history_size:
+                history.popitem(last=False)
+            pending = self._pending.setdefault(entry.key, {})
+            tracked = self._is_tracked(entry.key)
+            if not tracked:
+                pending.clear()
+            pending[entry.version] = entry.snapshot
+            if not tracked:
+                self._discard_unknown(entry.key)
+
+        # 初回ロードは変更として扱わない（退避後の再ロードは前回と比較する）
+        if tracked and previous_version is not None:
+            self._worker.submit(self._publish_changes, entry.key, previous_version, entry.version)
+
+    def _discard_unknown(self, dataset_key: str) -> None:
+        """
+        フィンガープリントを計算できなくなったバージョンを履歴から外す（ロック取得済みで呼び出す）
+
+        未計算のまま最新でなくなったバージョンは比較できないため、since には 410 を返す。
+        """
+        history = self._history.get(dataset_key)
+        if not history:
+            return
+        pending = self._pending.get(dataset_key, {})
+        for version in [v for v, fp in history.items() if fp is None and v not in pending]:
+            del history[version]
+
+    def _resolve(self, dataset_key: str, version: int) -> Optional[Dict[str, str]]:
+        """
+        バージョンのフィンガープリントを取得する（未計算でスナップショットを保持していれば計算する）
+
+        Returns:
+            フィンガープリント（履歴にない・計算できない場合は None）
+        """
+        with self._lock:
+            history = self._history.get(dataset_key)
+            if history is None or version not in history:
+                return None
+            fingerprints = history[version]
+            if fingerprints is not None:
+                return fingerprints
+            snapshot = self._pending.get(dataset_key, {}).get(version)
+            if snapshot is None:
+                return None
+
+        start_time = time.time()
+        fingerprints = project_fingerprints(snapshot)
+        logger.debug(
+            f"フィンガープリントを計算しました: {dataset_key} "
+            f"(version={version}, {time.time() - start_time:.3f}秒)"
+        )
+
+        with self._lock:
+            history = self._history.get(dataset_key)
+            if history is not None and version in history:
+                history[version] = fingerprints
+            self._pending.get(dataset_key, {}).pop(version, None)
+        return fingerprints
+
+    def _publish_changes(self, dataset_key: str, previous_version: int, version: int) -> None:
+        """差し替え前のバージョンとの差分を購読者に配信する（専用のスレッドで実行）"""
+        try:
+            previous = self._resolve(dataset_key, previous_version)
+            if previous is None:
+                # 差し替え前のスナップショットを追跡開始前に手放した場合は比較できない
+                self._resolve(dataset_key, version)
+                return
+            current = self._resolve(dataset_key, version)
+            if current is None:
+                return
+        except Exception as e:
+            logger.error(f"フィンガープリントの計算に失敗しました: {dataset_key}: {e}")
+            return
+
+        diff = diff_fingerprints(previous, current)
+        if not any(diff.values()):
+            logger.info(f"データセットは更新されましたがプロジェクトに変更はありません: {dataset_key}")
+
+        self.publish({
+            'type': 'changed',
+            'dataset': dataset_key,
+            'version': version,
+            'previous_version': previous_version,
+            **diff,
+        })
+
+    def latest_version(self, dataset_key: str) -> Optional[int]:
+        """履歴上の最新バージョン"""
+        with self._lock:
+            history = self._history.get(dataset_key)
+            return next(reversed(history), None) if history else None
+
+    def changes_since(self, dataset_key: str, since_version: int,
+                      until_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        指定したバージョンから until_version（省略時は最新バージョン）までの差分を求める
+
+        呼び出したデータセットは以降フィンガープリントの追跡対象になる。
+        未計算のフィンガープリントを計算する場合があるため、CPU プールで呼び出す。
+
+        Args:
+            dataset_key: データセットのレジストリキー
+            since_version: 基準となるスナップショットバージョン
+            until_version: 差分の終点のバージョン（レスポンスを作成するスナップショットのバージョン）
+
+        Returns:
+            version / since / added / changed / removed を含む辞書
+            （基準・終点のバージョンが履歴に残っていない場合は None）
+        """
+        with self._lock:
+            self._tracked.add(dataset_key)
+            history = self._history.get(dataset_key)
+            if not history:
+                return None
+            latest_version = until_version if until_version is not None else next(reversed(history))
+
+        previous = self._resolve(dataset_key, since_version)
+        current = self._resolve(dataset_key, latest_version)
+        if previous is None or current is None:
+            return None
+        return {
+            'version': latest_version,
+            'since': since_version,
+            **diff_fingerprints(previous, current),
+        }
+
+    def subscribe(self, dataset_key: str) -> Subscription:
+        """現在のイベントループで購読を開始する"""
+        subscription = Subscription(dataset_key, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """購読を終了する"""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """対象データセットの購読者にメッセージを配信する"""
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.dataset_key == message['dataset']]
+            self.published += 1
+        for subscription in targets:
+            subscription.deliver(message)
+        logger.info(
+            f"データセット変更を通知しました: {message['dataset']} "
+            f"(version={message['version']}, 購読者={len(targets)})"
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        """購読状況"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscriptions),
+                'published': self.published,
+                'tracked': sorted(self._tracked),
+                'datasets': {key: list(history.keys()) for key, history in self._history.items()},
+            }
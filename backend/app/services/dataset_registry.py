@@ -0,0 +1,562 @@
+"""
+データセットレジストリ
+- 解決済みファイルパスをキーに複数のデータセットを保持する
+- データセットごとにスナップショット・派生キャッシュ・バージョンを管理する
+- 全体のメモリ予算を超えた場合はLRUでデータセット単位に退避する
+- ロード・派生値の計算はシングルフライトで共有し、待機している全てのリクエストが
+  期限切れ・切断となった場合にのみ打ち切る
+"""
+
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, wait as wait_futures
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .dataset_snapshot import DatasetSnapshot
+from .runtime_metrics import record_cache, record_reload
+from .deadlines import (
+    OperationCancelledError, SharedDeadline, check_deadline, current_deadline, deadline_scope
+)
+
+# ロガー設定
+logger = logging.getLogger("api.dataset_registry")
+
+# メモリ予算（MB）
+DEFAULT_MEMORY_BUDGET_MB = 512
+# ソースファイルの更新確認間隔（秒）
+DEFAULT_REVALIDATE_SECONDS = 2.0
+
+# シングルフライトの待機中に期限・切断を確認する間隔（秒）
+FLIGHT_POLL_SECONDS = 0.25
+
+# 全データセット共通のバージョン採番
+_version_counter = itertools.count(1)
+
+
+def next_version() -> int:
+    """新しいスナップショットバージョンを採番する"""
+    return next(_version_counter)
+
+
+def source_files_for(path: str) -> List[str]:
+    """
+    データセットの更新検知対象となるファイル一覧を返す
+
+    Args:
+        path: ダッシュボードCSVファイルのパス
+
+    Returns:
+        ダッシュボード・プロジェクトファイル（暗号化版を含む）のパス一覧
+    """
+    base = path[:-4] if path.endswith('.enc') else path
+    projects = os.path.join(os.path.dirname(base), 'projects.csv')
+    return [base, base + '.enc', projects, projects + '.enc']
+
+
+def source_signature(path: str) -> Tuple:
+    """ソースファイルの更新時刻とサイズから署名を作成する"""
+    signature = []
+    for file_path in source_files_for(path):
+        try:
+            stat = os.stat(file_path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def estimate_size(value: Any) -> int:
+    """派生キャッシュ値のおおよそのメモリ使用量（バイト）"""
+    if hasattr(value, 'memory_usage'):
+        try:
+            usage = value.memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        except Exception:
+            pass
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(v) for v in value.values())
+    elif isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+class Flight(Future):
+    """
+    シングルフライトで共有される処理の結果
+
+    所有者のリクエストは run() で処理を実行し、同じ処理を待つリクエストは wait() で結果を待つ。
+    処理は参加している全てのリクエストの期限を集約した SharedDeadline のもとで実行される。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.deadline = SharedDeadline(current_deadline())
+
+    def run(self, func: Callable[[], Any]) -> Any:
+        """所有者として処理を実行し、結果を待機中のリクエストと共有する"""
+        try:
+            with deadline_scope(self.deadline):
+                value = func()
+            self.set_result(value)
+            return value
+        except BaseException as e:
+            self.set_exception(e)
+            raise
+
+    def wait(self) -> Any:
+        """
+        結果を待つ（待機中も自身の期限切れ・切断を確認する）
+
+        Raises:
+            OperationCancelledError: 自身の期限切れ・切断、または共有された処理が打ち切られた場合
+        """
+        deadline = current_deadline()
+        self.deadline.join(deadline)
+        try:
+            while not self.done():
+                wait_futures([self], timeout=FLIGHT_POLL_SECONDS if deadline is not None else None)
+                if deadline is not None and not self.done():
+                    deadline.check('single-flight')
+            return self.result()
+        finally:
+            self.deadline.leave(deadline)
+
+
+class DatasetEntry:
+    """レジストリ内の1データセット"""
+
+    def __init__(self, key: str, snapshot: DatasetSnapshot, signature: Tuple):
+        self.key = key
+        # スナップショットとバージョンは組で差し替え、読み出し側が食い違った組を見ないようにする
+        self._current: Tuple[DatasetSnapshot, int] = (snapshot, next_version())
+        self.signature = signature
+        # 派生値は (値, 保存時刻, 推定サイズ) で保持する
+        self.derived: 'OrderedDict[Tuple, Tuple[Any, float, int]]' = OrderedDict()
+        self.derived_inflight: Dict[Tuple, Flight] = {}
+        self.hits = 0
+        self.misses = 1
+        self.loads = 1
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.last_validated = self.created_at
+        self.derived_bytes = 0
+
+    @property
+    def snapshot(self) -> DatasetSnapshot:
+        """現在のスナップショット"""
+        return self._current[0]
+
+    @property
+    def version(self) -> int:
+        """現在のスナップショットのバージョン"""
+        return self._current[1]
+
+    def current(self) -> Tuple[DatasetSnapshot, int]:
+        """現在のスナップショットとそのバージョン（同じ時点の組）"""
+        return self._current
+
+    def replace_snapshot(self, snapshot: DatasetSnapshot, signature: Tuple) -> None:
+        """ソース更新時にスナップショットを差し替える"""
+        self._current = (snapshot, next_version())
+        self.signature = signature
+        self.derived = OrderedDict()
+        self.derived_bytes = 0
+        self.derived_inflight = {}
+        self.misses += 1
+        self.loads += 1
+
+    def store_derived(self, key: Tuple, value: Any, size: int) -> None:
+        """派生値を保存し、サイズを加算する（置き換えた値のサイズは減算する。ロック取得済みで呼び出す）"""
+        previous = self.derived.get(key)
+        if previous is not None:
+            self.derived_bytes -= previous[2]
+        self.derived[key] = (value, time.time(), size)
+        self.derived.move_to_end(key)
+        self.derived_bytes += size
+
+    def drop_derived(self, key: Tuple) -> None:
+        """派生値を破棄し、サイズを減算する（ロック取得済みで呼び出す）"""
+        previous = self.derived.pop(key, None)
+        if previous is not None:
+            self.derived_bytes -= previous[2]
+
+    def memory_usage(self) -> int:
+        """
+        スナップショットと派生キャッシュのメモリ使用量（バイト）
+
+        どちらも追加・破棄の時点で増減させた値を保持しているため、再計算は行わない。
+        """
+        return self.snapshot.memory_usage() + self.derived_bytes
+
+    @property
+    def hit_ratio(self) -> float:
+        """ヒット率（%）"""
+        total = self.hits + self.misses
+        return self.hits / total * 100 if total > 0 else 0
+
+    def describe(self) -> Dict[str, Any]:
+        """一覧表示用の情報"""
+        return {
+            'key': self.key,
+            'version': self.version,
+            'size_bytes': self.memory_usage(),
+            'rows': self.snapshot.row_count,
+            'load_time': round(self.snapshot.load_time, 4),
+            'loaded_at': self.snapshot.loaded_at,
+            'last_access': self.last_access,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hit_ratio, 2),
+            'loads': self.loads,
+            'derived_entries': len(self.derived),
+            'loaded_groups': self.snapshot.loaded_groups,
+            'is_error': self.snapshot.is_error,
+        }
+
+
+class DatasetRegistry:
+    """
+    解決済みパスをキーとするデータセットレジストリ
+
+    データセットはアクセス順（LRU）で管理し、合計メモリ使用量が予算を超えた場合は
+    最も長く使われていないデータセットから丸ごと退避する。
+    """
+
+    def __init__(self, loader: Callable[[str], DatasetSnapshot],
+                 memory_budget_bytes: Optional[int] = None,
+                 revalidate_seconds: Optional[float] = None,
+                 signature_func: Callable[[str], Tuple] = source_signature):
+        """
+        Args:
+            loader: パスからスナップショットを作成する関数
+            signature_func: キーからソースの署名を作成する関数（更新検知に使用）
+            memory_budget_bytes: メモリ予算（バイト、未指定時は環境変数 DATASET_MEMORY_BUDGET_MB）
+            revalidate_seconds: ソースファイルの更新確認間隔（秒）
+        """
+        if memory_budget_bytes is None:
+            budget_mb = float(os.environ.get('DATASET_MEMORY_BUDGET_MB', DEFAULT_MEMORY_BUDGET_MB))
+            memory_budget_bytes = int(budget_mb * 1024 * 1024)
+        if revalidate_seconds is None:
+            revalidate_seconds = float(
+                os.environ.get('DATASET_REVALIDATE_SECONDS', DEFAULT_REVALIDATE_SECONDS)
+            )
+
+        self.loader = loader
+        self.signature_func = signature_func
+        self.memory_budget_bytes = memory_budget_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, DatasetEntry]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[str, DatasetEntry], None]] = []
+        self._inflight: Dict[str, Flight] = {}
+
+    def add_listener(self, callback: Callable[[str, DatasetEntry], None]) -> None:
+        """
+        データセットのイベントを受け取るコールバックを登録する
+
+        Args:
+            callback: (イベント名, エントリ) を受け取る関数
+                      イベント名は 'loaded'（新規）、'replaced'（ソース更新）、'evicted'（退避・削除）
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, entry: DatasetEntry) -> None:
+        """登録済みコールバックにイベントを通知する"""
+        for callback in list(self._listeners):
+            try:
+                callback(event, entry)
+            except Exception as e:
+                logger.error(f"データセットイベント通知エラー ({event}): {e}")
+
+    def get(self, key: str) -> DatasetEntry:
+        """
+        データセットを取得する（未ロードまたはソース更新時はロードする）
+
+        Args:
+            key: 解決済みのダッシュボードファイルパス
+
+        Returns:
+            データセットエントリ
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.last_access = now
+                if now - entry.last_validated < self.revalidate_seconds:
+                    entry.hits += 1
+                    record_cache('dataset', 'hit')
+                    return entry
+
+        signature = self.signature_func(key)
+        if entry is not None:
+            entry.last_validated = now
+            if signature == entry.signature:
+                entry.hits += 1
+                record_cache('dataset', 'hit')
+                return entry
+            logger.info(f"データセットの更新を検知しました: {key}")
+
+        # 同じキーのロードが進行中であれば、その完了を待つ（シングルフライト）
+        with self._lock:
+            inflight = self._inflight.get(key)
+            is_owner = inflight is None
+            if is_owner:
+                inflight = Flight()
+                self._inflight[key] = inflight
+
+        if not is_owner:
+            try:
+                loaded = inflight.wait()
+            except OperationCancelledError:
+                # 所有者側の打ち切りと同時に参加した場合は自身の期限内で読み込み直す
+                check_deadline('load')
+                return self.get(key)
+            loaded.hits += 1
+            record_cache('dataset', 'hit')
+            return loaded
+
+        record_cache('dataset', 'miss')
+        try:
+            return inflight.run(lambda: self._load(key, entry, signature))
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _load(self, key: str, entry: Optional[DatasetEntry], signature: Tuple) -> DatasetEntry:
+        """スナップショットをロードしてレジストリに登録する"""
+        # ロックの外でロード（他のデータセットへのアクセスを妨げない）
+        snapshot = self.loader(key)
+
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current is not entry and current.signature == signature:
+                # 並行してロードされた新しいエントリを優先
+                current.hits += 1
+                return current
+            if current is not None:
+                current.replace_snapshot(snapshot, signature)
+                entry = current
+                event = 'replaced'
+            else:
+                entry = DatasetEntry(key, snapshot, signature)
+                self._entries[key] = entry
+                event = 'loaded'
+            self._entries.move_to_end(key)
+            entry.last_validated = time.time()
+            evicted = self._enforce_budget(keep=key)
+        record_reload(event, snapshot.load_time)
+
+        # 登録済みのデータセットの通知はリクエストの期限・切断で打ち切らない
+        with deadline_scope(None):
+            self._notify(event, entry)
+            for evicted_entry in evicted:
+                self._notify('evicted', evicted_entry)
+
+        logger.info(
+            f"データセットをロードしました: {key} (version={entry.version}, "
+            f"rows={snapshot.row_count}, {snapshot.load_time:.3f}秒)"
+        )
+        return entry
+
+    def owner_of(self, df) -> Optional[Tuple[DatasetEntry, Tuple[str, ...]]]:
+        """
+        データフレームを提供したデータセットを探す
+
+        Args:
+            df: 判定するデータフレーム
+
+        Returns:
+            (データセットエントリ, 列グループ) のタプル、該当がなければ None
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in reversed(entries):
+            projection = entry.snapshot.projection_of(df)
+            if projection is not None:
+                return entry, projection
+        return None
+
+    def is_loading(self, key: str) -> bool:
+        """指定したキーのロードが進行中かどうか"""
+        with self._lock:
+            return key in self._inflight
+
+    def get_or_compute(self, entry: DatasetEntry, key: Tuple, ttl_seconds: float,
+                       compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        派生キャッシュから値を取得し、なければ計算して保存する
+
+        同じキーの計算が進行中であれば、その結果を待つ（シングルフライト）。
+
+        Args:
+            entry: データセットエントリ
+            key: 派生キャッシュのキー
+            ttl_seconds: 有効期間（秒）
+            compute: 値を計算する関数
+
+        Returns:
+            (値, キャッシュヒットしたかどうか) のタプル
+        """
+        version = entry.version
+        with self._lock:
+            cached = entry.derived.get(key)
+            if cached is not None and time.time() - cached[1] < ttl_seconds:
+                return cached[0], True
+            inflight = entry.derived_inflight.get(key)
+            is_owner = inflight is None
+            if is_owner:
+                inflight = Flight()
+                entry.derived_inflight[key] = inflight
+
+        if not is_owner:
+            try:
+                return inflight.wait(), True
+            except OperationCancelledError:
+                check_deadline('compute')
+                return self.get_or_compute(entry, key, ttl_seconds, compute)
+
+        try:
+            value = inflight.run(compute)
+        finally:
+            with self._lock:
+                if entry.derived_inflight.get(key) is inflight:
+                    del entry.derived_inflight[key]
+
+        # 計算中にスナップショットが差し替えられた場合は古い結果を保存しない
+        self.set_derived(entry, key, value, version)
+        return value, False
+
+    def get_derived(self, entry: DatasetEntry, key: Tuple,
+                    ttl_seconds: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        派生キャッシュから値を取得する
+
+        Returns:
+            (値, 見つかったかどうか) のタプル
+        """
+        with self._lock:
+            cached = entry.derived.get(key)
+            if cached is None:
+                return None, False
+            if ttl_seconds is not None and time.time() - cached[1] >= ttl_seconds:
+                return None, False
+            # 件数上限のある派生値（レスポンスキャッシュ）を最近使用したものとして扱う
+            entry.derived.move_to_end(key)
+        return cached[0], True
+
+    def set_derived(self, entry: DatasetEntry, key: Tuple, value: Any,
+                    version: Optional[int] = None, max_entries: Optional[int] = None) -> None:
+        """
+        派生キャッシュに値を保存する
+
+        Args:
+            entry: データセットエントリ
+            key: 派生キャッシュのキー
+            value: 保存する値
+            version: 値の計算に使ったスナップショットのバージョン（差し替え済みなら保存しない）
+            max_entries: キーの先頭要素が同じ派生値の上限件数（超えた分は最も長く使われていないものから破棄）
+        """
+        if version is not None and entry.version != version:
+            return
+        # サイズの推定はロックの外で1回だけ行う
+        size = estimate_size(value)
+        evicted = []
+        with self._lock:
+            if version is not None and entry.version != version:
+                return
+            entry.store_derived(key, value, size)
+            if max_entries is not None:
+                group = [k for k in entry.derived if k[0] == key[0]]
+                for stale in group[:max(0, len(group) - max_entries)]:
+                    entry.drop_derived(stale)
+            if entry.key in self._entries:
+                evicted = self._enforce_budget(keep=entry.key)
+        for evicted_entry in evicted:
+            self._notify('evicted', evicted_entry)
+
+    def discard_derived(self, entry: DatasetEntry, predicate: Callable[[Tuple], bool]) -> int:
+        """
+        条件に一致するキーの派生値を破棄する
+
+        Args:
+            entry: データセットエントリ
+            predicate: 破棄するキーであれば True を返す関数
+
+        Returns:
+            破棄した件数
+        """
+        with self._lock:
+            stale = [key for key in entry.derived if predicate(key)]
+            for key in stale:
+                entry.drop_derived(key)
+        return len(stale)
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> List[DatasetEntry]:
+        """
+        メモリ予算を超えている間、LRU順にデータセットを退避する（ロック取得済みで呼び出す）
+
+        Returns:
+            退避したエントリ一覧
+        """
+        evicted_entries = []
+        total = sum(entry.memory_usage() for entry in self._entries.values())
+        while total > self.memory_budget_bytes and len(self._entries) > 1:
+            oldest_key = next(iter(self._entries))
+            if oldest_key == keep:
+                # 使用中のデータセットは退避しない
+                self._entries.move_to_end(oldest_key)
+                oldest_key = next(iter(self._entries))
+                if oldest_key == keep:
+                    break
+            evicted = self._entries.pop(oldest_key)
+            total -= evicted.memory_usage()
+            self.evictions += 1
+            evicted_entries.append(evicted)
+            logger.info(
+                f"メモリ予算超過のためデータセットを退避しました: {oldest_key} "
+                f"({evicted.memory_usage() / (1024 * 1024):.1f}MB)"
+            )
+        return evicted_entries
+
+    def remove(self, key: str) -> bool:
+        """データセットを削除する"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._notify('evicted', entry)
+        return entry is not None
+
+    def clear(self) -> int:
+        """全データセットを削除する"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._notify('evicted', entry)
+        return len(entries)
+
+    def entries(self) -> List[DatasetEntry]:
+        """アクセス順（新しい順）のデータセット一覧"""
+        with self._lock:
+            return list(reversed(self._entries.values()))
+
+    def describe(self) -> Dict[str, Any]:
+        """レジストリ全体の情報"""
+        with self._lock:
+            datasets = [entry.describe() for entry in reversed(self._entries.values())]
+        return {
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'total_bytes': sum(d['size_bytes'] for d in datasets),
+            'evictions': self.evictions,
+            'loading': sorted(self._inflight.keys()),
+            'datasets': datasets,
+        }
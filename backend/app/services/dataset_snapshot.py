@@ -0,0 +1,300 @@
+"""
+データセットスナップショット
+- ダッシュボードCSVの読み込み結果を保持する
+- コア列のみを usecols で先行パースし、残りの列グループは初回アクセス時にパースする
+- projects.csv 由来の列（パス情報）も初回アクセス時に結合する
+"""
+
+import hashlib
+import io
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .async_loader import import_pandas
+from .process_compute import read_csv_bytes
+from .deadlines import check_deadline
+from .tracing import span
+
+# ロガー設定
+logger = logging.getLogger("api.dataset_snapshot")
+
+# 先行パースするコア列（進捗計算・遅延検出・マイルストーン処理で使用）
+CORE_COLUMNS = [
+    'project_id', 'project_name', 'process', 'line',
+    'task_id', 'task_name', 'task_start_date', 'task_finish_date',
+    'task_status', 'task_milestone'
+]
+
+# 遅延パースする列グループ
+COLUMN_GROUPS = {
+    'organization': ['manager', 'division', 'factory', 'status', 'created_at'],
+    'assignment': ['task_assignee', 'task_work_hours'],
+    # projects.csv から結合される列
+    'paths': ['project_path', 'ganttchart_path'],
+}
+
+# どのグループにも属さない列をまとめるグループ
+EXTRA_GROUP = 'extra'
+
+# 日付として変換する列
+DATE_COLUMNS = ['task_start_date', 'task_finish_date', 'created_at']
+
+# 全グループを指定するためのキーワード
+ALL_COLUMNS = '*'
+
+
+def convert_date_columns(df) -> None:
+    """日付列をdatetime型に変換する（インプレース）"""
+    pd = import_pandas()
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            try:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+            except Exception as e:
+                logger.warning(f"{col}列の日付変換エラー: {e}")
+
+
+class DatasetSnapshot:
+    """
+    読み込み済みデータセットのスナップショット
+
+    コア列はロード時にパース済み。その他の列グループは frame() で要求された時に
+    保持している生データから usecols でパースし、以降はキャッシュする。
+    """
+
+    def __init__(self, core_df, source_path: Optional[str] = None,
+                 raw_data: Optional[bytes] = None, encoding: Optional[str] = None,
+                 header: Optional[List[str]] = None,
+                 projects_data: Optional[bytes] = None,
+                 load_time: float = 0.0):
+        """
+        Args:
+            core_df: パース済みのコア列データフレーム
+            source_path: 読み込み元のファイルパス
+            raw_data: CSVの生データ（遅延パース用）
+            encoding: 読み込みに成功したエンコーディング
+            header: CSVのヘッダー列一覧
+            projects_data: projects.csv の生データ（パス列の遅延結合用）
+            load_time: ロードに要した時間（秒）
+        """
+        self.source_path = source_path
+        self.encoding = encoding
+        self.load_time = load_time
+        self.loaded_at = time.time()
+
+        self._core = core_df
+        self._raw_data = raw_data
+        self._projects_data = projects_data
+        # projects.csv の内容の要約（生データを破棄した後も変更検知に使用する）
+        self.projects_digest = (
+            hashlib.sha1(projects_data).hexdigest()[:16] if projects_data is not None else None
+        )
+        self._groups: Dict[str, Any] = {}
+        self._frames: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.RLock()
+
+        # メモリ使用量はロード時に1回だけ計算し、列グループ・フレームの追加時に加算する
+        self._size_bytes = (
+            int(core_df.memory_usage(index=True, deep=True).sum())
+            + len(raw_data or b'') + len(projects_data or b'')
+        )
+
+        # 列 → グループの対応表を作成
+        header = header if header is not None else list(core_df.columns)
+        self._column_order = list(header)
+        self._column_group: Dict[str, str] = {}
+        for col in header:
+            if col in core_df.columns:
+                continue
+            group = self._known_group_of(col)
+            # 'paths' グループは projects.csv 専用（ダッシュボード側の同名列は extra 扱い）
+            self._column_group[col] = EXTRA_GROUP if group == 'paths' else group
+
+        # パス列は projects.csv がある場合のみ利用可能
+        if projects_data is not None:
+            for col in COLUMN_GROUPS['paths']:
+                if col not in self._column_group and col not in core_df.columns:
+                    self._column_group[col] = 'paths'
+                    self._column_order.append(col)
+
+    @classmethod
+    def from_frame(cls, df, source_path: Optional[str] = None) -> 'DatasetSnapshot':
+        """パース済みのデータフレーム（エラー結果など）からスナップショットを作成"""
+        return cls(df, source_path=source_path)
+
+    @staticmethod
+    def _known_group_of(column: str) -> str:
+        """列が属するグループ名を返す"""
+        for group, columns in COLUMN_GROUPS.items():
+            if column in columns:
+                return group
+        return EXTRA_GROUP
+
+    @property
+    def is_error(self) -> bool:
+        """エラー結果のスナップショットかどうか"""
+        return 'error' in self._core.columns or 'error_message' in self._core.columns
+
+    @property
+    def row_count(self) -> int:
+        """行数"""
+        return len(self._core)
+
+    @property
+    def available_groups(self) -> List[str]:
+        """遅延パース可能な列グループ一覧"""
+        return sorted(set(self._column_group.values()))
+
+    @property
+    def loaded_groups(self) -> List[str]:
+        """パース済みの列グループ一覧"""
+        with self._lock:
+            return sorted(self._groups.keys())
+
+    @property
+    def columns(self) -> List[str]:
+        """利用可能な全列（未パースの列を含む）"""
+        return list(self._core.columns) + [
+            col for col in self._column_order if col in self._column_group
+        ]
+
+    def _groups_for(self, columns) -> List[str]:
+        """要求された列をパースするのに必要なグループを返す"""
+        if columns is None:
+            return []
+        if columns == ALL_COLUMNS:
+            return self.available_groups
+        groups = set()
+        for col in columns:
+            group = self._column_group.get(col)
+            if group is not None:
+                groups.add(group)
+        return sorted(groups)
+
+    def _parse_group(self, group: str):
+        """列グループをパースする（ロック取得済みで呼び出す）"""
+        pd = import_pandas()
+        group_columns = [col for col, g in self._column_group.items() if g == group]
+
+        check_deadline('merge' if group == 'paths' else 'parse')
+        start_time = time.time()
+        if group == 'paths':
+            # projects.csv の結合
+            with span('merge', group=group, rows=len(self._core)):
+                projects_df = pd.read_csv(
+                    io.BytesIO(self._projects_data), encoding=self.encoding,
+                    usecols=lambda c: c == 'project_id' or c in group_columns
+                )
+                projects_df = projects_df.drop_duplicates('project_id').set_index('project_id')
+                group_df = pd.DataFrame(index=self._core.index)
+                for col in group_columns:
+                    if col in projects_df.columns:
+                        group_df[col] = self._core['project_id'].map(projects_df[col])
+                    else:
+                        group_df[col] = None
+        else:
+            with span('parse_group', group=group, rows=len(self._core)):
+                group_df = read_csv_bytes(self._raw_data, self.encoding, group_columns)
+                group_df.index = self._core.index
+            with span('convert_dates', group=group):
+                convert_date_columns(group_df)
+
+        logger.debug(
+            f"列グループ '{group}' をパースしました: {group_columns} "
+            f"({time.time() - start_time:.3f}秒)"
+        )
+        return group_df
+
+    def materialize(self, *groups: str) -> None:
+        """指定した列グループをパース済みにする"""
+        with self._lock:
+            for group in groups:
+                if group in self._groups:
+                    continue
+                group_df = self._parse_group(group)
+                self._groups[group] = group_df
+                self._size_bytes += int(group_df.memory_usage(index=False, deep=True).sum())
+            # 全グループをパースしたら生データは不要
+            if self._raw_data is not None and all(
+                g in self._groups for g in self.available_groups
+            ):
+                self._size_bytes -= len(self._raw_data) + len(self._projects_data or b'')
+                self._raw_data = None
+                self._projects_data = None
+
+    def frame(self, columns: Optional[Iterable[str]] = None):
+        """
+        データフレームを取得する
+
+        Args:
+            columns: 必要な列（None の場合はコア列のみ、ALL_COLUMNS の場合は全列）
+
+        Returns:
+            要求された列を含むデータフレーム（同じ列グループの組み合わせには同じオブジェクトを返す）
+        """
+        if columns is not None and columns != ALL_COLUMNS:
+            columns = list(columns)
+        groups = tuple(self._groups_for(columns))
+
+        cached = self._frames.get(groups)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            cached = self._frames.get(groups)
+            if cached is not None:
+                return cached
+
+            if not groups:
+                frame = self._core
+            else:
+                pd = import_pandas()
+                self.materialize(*groups)
+                frame = pd.concat([self._core] + [self._groups[g] for g in groups], axis=1)
+                ordered = [col for col in self._column_order if col in frame.columns]
+                ordered += [col for col in frame.columns if col not in ordered]
+                frame = frame[ordered]
+                self._size_bytes += int(frame.memory_usage(index=False, deep=False).sum())
+
+            self._frames[groups] = frame
+            return frame
+
+    def projection_of(self, df) -> Optional[Tuple[str, ...]]:
+        """
+        frame() が返したデータフレームであれば、その列グループの組み合わせを返す
+
+        Args:
+            df: 判定するデータフレーム
+
+        Returns:
+            列グループのタプル（このスナップショットのフレームでなければ None）
+        """
+        for groups, frame in list(self._frames.items()):
+            if frame is df:
+                return groups
+        if df is self._core:
+            return ()
+        return None
+
+    def memory_usage(self) -> int:
+        """
+        スナップショットのおおよそのメモリ使用量（バイト）
+
+        コア列・生データはロード時、列グループ（deep）・結合済みフレーム（列の参照分）は
+        追加時に計算した値の合計を返す（呼び出しごとの再計算は行わない）。
+        """
+        return self._size_bytes
+
+    def describe(self) -> Dict[str, Any]:
+        """スナップショットの概要を返す"""
+        return {
+            'source_path': self.source_path,
+            'rows': self.row_count,
+            'encoding': self.encoding,
+            'core_columns': list(self._core.columns),
+            'available_groups': self.available_groups,
+            'loaded_groups': self.loaded_groups,
+            'load_time': round(self.load_time, 4),
+        }
@@ -0,0 +1,230 @@
+"""
+リクエストの期限と協調的な取り消し
+- リクエストごとの期限（X-Request-Timeout-Ms ヘッダーまたは既定値）を contextvars で保持する
+  （I/O・CPU プールのスレッドにはプールが投入時のコンテキストを引き継ぐ）
+- データ処理は段階の境目（復号化・パース・結合・集計）で check_deadline() を呼び出し、
+  期限切れまたはクライアントの切断を検知した場合は OperationCancelledError を送出して処理を打ち切る
+- シングルフライトで共有される処理は SharedDeadline で実行し、待機している全てのリクエストが
+  期限切れ・切断となった場合にのみ打ち切る
+- OperationCancelledError は HTTPException として扱い、アプリの例外ハンドラーで
+  期限切れは 504、クライアントの切断は 499 として返す
+"""
+
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from fastapi import HTTPException
+
+# ロガー設定
+logger = logging.getLogger("api.deadlines")
+
+# 期限を指定するリクエストヘッダー（ミリ秒）
+DEADLINE_HEADER = "x-request-timeout-ms"
+
+# 既定の期限（秒）
+DEFAULT_DEADLINE_SECONDS = 30.0
+
+
+# クライアントが切断したリクエストのステータスコード
+CLIENT_CLOSED_REQUEST = 499
+
+
+class OperationCancelledError(HTTPException):
+    """期限切れまたはクライアントの切断により処理を打ち切った場合のエラー"""
+
+    # レスポンスのステータスコード
+    response_status = CLIENT_CLOSED_REQUEST
+
+    def __init__(self, message: str, stage: Optional[str] = None):
+        super().__init__(status_code=self.response_status, detail=message)
+        self.stage = stage
+
+    def __str__(self) -> str:
+        return self.detail
+
+
+class DeadlineExceededError(OperationCancelledError):
+    """リクエストの期限を過ぎた場合のエラー"""
+
+    response_status = 504
+
+
+class RequestCancelledError(OperationCancelledError):
+    """クライアントが切断した場合のエラー"""
+
+
+class Deadline:
+    """リクエストの期限と取り消し状態"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Args:
+            timeout: 期限までの秒数（None の場合は期限なし・取り消しのみ）
+        """
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """取り消す（クライアントの切断時）"""
+        self._cancelled.set()
+
+    def clear_expiry(self) -> None:
+        """期限を解除し、取り消しのみ有効にする（ストリーミングレスポンスの送信開始後）"""
+        self.expires_at = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def aborted(self) -> bool:
+        """処理を打ち切るべきかどうか"""
+        return self.cancelled or self.expired
+
+    def remaining(self) -> Optional[float]:
+        """期限までの残り秒数（期限なしの場合は None）"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self, stage: str) -> None:
+        """
+        期限切れ・取り消しを確認する
+
+        Raises:
+            RequestCancelledError: クライアントが切断した場合
+            DeadlineExceededError: 期限を過ぎた場合
+        """
+        if self.cancelled:
+            raise RequestCancelledError(f"クライアントが切断したため処理を中止しました ({stage})", stage)
+        if self.expired:
+            raise DeadlineExceededError(
+                f"リクエストの期限 ({self.timeout:g}秒) を過ぎたため処理を中止しました ({stage})", stage
+            )
+
+
+class SharedDeadline(Deadline):
+    """
+    シングルフライトで共有される処理の期限
+
+    参加している全てのリクエストが打ち切られた場合にのみ打ち切る。
+    期限のないリクエスト（先読みなど）が参加している場合は打ち切らない。
+    """
+
+    def __init__(self, owner: Optional[Deadline]):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._participants: List[Optional[Deadline]] = [owner]
+
+    def join(self, deadline: Optional[Deadline]) -> None:
+        """待機するリクエストを追加する"""
+        with self._lock:
+            self._participants.append(deadline)
+
+    def leave(self, deadline: Optional[Deadline]) -> None:
+        """待機をやめたリクエストを外す"""
+        with self._lock:
+            try:
+                self._participants.remove(deadline)
+            except ValueError:
+                pass
+
+    def _snapshot(self) -> List[Optional[Deadline]]:
+        with self._lock:
+            return list(self._participants)
+
+    @property
+    def aborted(self) -> bool:
+        return all(d is not None and d.aborted for d in self._snapshot())
+
+    def remaining(self) -> Optional[float]:
+        participants = self._snapshot()
+        if any(d is None or d.expires_at is None for d in participants):
+            return None
+        return max(d.remaining() for d in participants)
+
+    def check(self, stage: str) -> None:
+        participants = self._snapshot()
+        if not all(d is not None and d.aborted for d in participants):
+            return
+        if any(d.cancelled for d in participants):
+            raise RequestCancelledError(
+                f"待機中の全てのクライアントが切断したため処理を中止しました ({stage})", stage
+            )
+        raise DeadlineExceededError(
+            f"待機中の全てのリクエストが期限を過ぎたため処理を中止しました ({stage})", stage
+        )
+
+
+# 現在のリクエストの期限
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    'request_deadline', default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """現在のリクエストの期限（リクエスト外では None）"""
+    return _current_deadline.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """期限を設定して処理を実行する（None の場合は期限なし）"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline(stage: str) -> None:
+    """
+    現在のリクエストの期限切れ・取り消しを確認する（段階の境目で呼び出す）
+
+    Args:
+        stage: 処理の段階名（ログとエラーメッセージに使用）
+
+    Raises:
+        OperationCancelledError: 期限切れまたはクライアントが切断した場合
+    """
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def default_timeout() -> Optional[float]:
+    """既定の期限（秒、REQUEST_DEADLINE_SECONDS=0 の場合は期限なし）"""
+    seconds = float(os.environ.get('REQUEST_DEADLINE_SECONDS', DEFAULT_DEADLINE_SECONDS))
+    return seconds if seconds > 0 else None
+
+
+def deadline_from_headers(headers) -> Deadline:
+    """
+    リクエストヘッダーから期限を作成する
+
+    Args:
+        headers: リクエストヘッダー（X-Request-Timeout-Ms が不正・未指定の場合は既定値）
+
+    Returns:
+        リクエストの期限
+    """
+    timeout = default_timeout()
+    value = headers.get(DEADLINE_HEADER)
+    if value:
+        try:
+            requested = float(value) / 1000
+            if requested > 0:
+                timeout = requested
+        except ValueError:
+            logger.debug(f"不正な期限ヘッダーを無視しました: {value}")
+    return Deadline(timeout)
@@ -0,0 +1,43 @@
+"""
+リクエスト単位のデバッグトレース
+- X-Debug-Trace: 1 ヘッダーを付けたリクエストのみ、データ処理の診断ログ
+  （列のユニーク値・件数の集計・サンプル行など）を出力する
+- ヘッダーは DEBUG=1 または DEBUG_TRACE_ENABLED=1 の場合のみ有効
+- 有効かどうかは contextvars で保持する（I/O・CPU プールのスレッドにも引き継がれる）
+"""
+
+import contextlib
+import contextvars
+import os
+from typing import Iterator
+
+# デバッグトレースを要求するリクエストヘッダー
+DEBUG_TRACE_HEADER = "x-debug-trace"
+
+# 現在のリクエストでデバッグトレースが有効かどうか
+_debug_trace: contextvars.ContextVar[bool] = contextvars.ContextVar('debug_trace', default=False)
+
+
+def debug_trace_allowed() -> bool:
+    """デバッグトレースのヘッダーを受け付けるかどうか"""
+    return os.environ.get('DEBUG') == '1' or os.environ.get('DEBUG_TRACE_ENABLED', '0') == '1'
+
+
+def debug_trace_enabled() -> bool:
+    """現在のリクエストでデバッグトレースが有効かどうか"""
+    return _debug_trace.get()
+
+
+@contextlib.contextmanager
+def debug_trace_scope(enabled: bool) -> Iterator[bool]:
+    """デバッグトレースの有効・無効を設定して処理を実行する"""
+    token = _debug_trace.set(enabled)
+    try:
+        yield enabled
+    finally:
+        _debug_trace.reset(token)
+
+
+def debug_trace_from_headers(headers) -> bool:
+    """リクエストヘッダーでデバッグトレースが要求されているかどうか"""
+    return headers.get(DEBUG_TRACE_HEADER, "").strip().lower() in ("1", "true", "yes")
@@ -0,0 +1,227 @@
+"""
+名前付きスレッドプール
+- I/O プール: ファイルの読み込み・復号化・データセットのロード
+- CPU プール: pandas による集計・変換（少数のワーカー）
+- イベントループの既定のエグゼキューター（Starlette と共有）とは分離し、
+  一方の処理の集中がもう一方を待たせないようにする
+- プールごとにワーカー数と待ち行列の上限を設定でき、待ち行列の長さと待ち時間を記録する
+- 投入時のコンテキスト（リクエストの期限）をワーカーに引き継ぎ、期限切れ・切断したリクエストの
+  処理は待ち行列から取り出した時点で実行せずに打ち切る
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from .deadlines import check_deadline
+from .profiling import current_profile
+
+# ロガー設定
+logger = logging.getLogger("api.executors")
+
+# プール名
+IO_EXECUTOR = 'io'
+CPU_EXECUTOR = 'cpu'
+
+# 待ち時間の統計に使う直近の件数
+WAIT_SAMPLE_SIZE = 256
+
+
+def _default_sizes(name: str) -> Dict[str, int]:
+    """プールごとの既定のワーカー数と待ち行列の上限"""
+    cpu_count = os.cpu_count() or 1
+    if name == CPU_EXECUTOR:
+        return {'workers': max(1, min(4, cpu_count)), 'queue': 128}
+    return {'workers': min(8, cpu_count + 4), 'queue': 64}
+
+
+class ExecutorSaturatedError(HTTPException):
+    """
+    待ち行列が上限に達して処理を受け付けられない場合のエラー
+
+    ルーターの except HTTPException をそのまま通過させ、アプリの例外ハンドラーで 503 として返す。
+    """
+
+    def __init__(self, name: str, pending: int):
+        super().__init__(status_code=503, detail=f"{name} プールの待ち行列が上限に達しています (pending={pending})")
+        self.executor_name = name
+        self.pending = pending
+
+    def __str__(self) -> str:
+        return self.detail
+
+
+class BoundedExecutor:
+    """
+    待ち行列の上限と統計を持つスレッドプール
+
+    実行中と待機中の合計が workers + queue_size に達している場合は
+    ExecutorSaturatedError を送出して処理を受け付けない。
+    """
+
+    def __init__(self, name: str, max_workers: int, queue_size: int):
+        """
+        Args:
+            name: プール名（スレッド名の接頭辞にも使用）
+            max_workers: ワーカースレッド数
+            queue_size: 待ち行列の上限
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_wait = 0.0
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        処理を投入する
+
+        Raises:
+            ExecutorSaturatedError: 待ち行列が上限に達している場合
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.queue_size:
+                self.rejected += 1
+                pending = self._pending
+            else:
+                self._pending += 1
+                self.submitted += 1
+                pending = None
+        if pending is not None:
+            logger.warning(f"{self.name} プールの待ち行列が上限に達したため処理を拒否しました (pending={pending})")
+            raise ExecutorSaturatedError(self.name, pending)
+
+        enqueued_at = time.monotonic()
+        context = contextvars.copy_context()
+
+        def task():
+            wait = time.monotonic() - enqueued_at
+            with self._lock:
+                self._active += 1
+                self._waits.append(wait)
+                self.max_wait = max(self.max_wait, wait)
+            succeeded = False
+            try:
+                result = context.run(self._run_checked, func, args, kwargs)
+                succeeded = True
+                return result
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._pending -= 1
+                    self.completed += 1
+                    if not succeeded:
+                        self.failed += 1
+
+        try:
+            return self._executor.submit(task)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    @staticmethod
+    def _run_checked(func: Callable, args, kwargs) -> Any:
+        """待機中に期限切れ・切断したリクエストの処理は実行しない"""
+        check_deadline('queued')
+        profile = current_profile()
+        if profile is not None:
+            # X-Profile で要求されたリクエストの処理はスレッドごとに計測する
+            return profile.run_in_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    def run(self, func: Callable, *args, **kwargs) -> asyncio.Future:
+        """処理を投入し、イベントループで待機できる Future を返す"""
+        return asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """待ち行列の長さ・待ち時間などの統計"""
+        with self._lock:
+            waits = list(self._waits)
+            queued = self._pending - self._active
+            return {
+                'workers': self.max_workers,
+                'queue_size': self.queue_size,
+                'active': self._active,
+                'queued': queued,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        """プールを終了する（待機中の処理は取り消す）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 名前付きプール（遅延作成）
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """
+    名前付きプールを取得する（初回は環境変数の設定で作成）
+
+    ワーカー数は EXECUTOR_<NAME>_WORKERS、待ち行列の上限は EXECUTOR_<NAME>_QUEUE で設定する。
+    """
+    executor = _executors.get(name)
+    if executor is not None:
+        return executor
+
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            defaults = _default_sizes(name)
+            prefix = f"EXECUTOR_{name.upper()}"
+            workers = int(os.environ.get(f"{prefix}_WORKERS", defaults['workers']))
+            queue_size = int(os.environ.get(f"{prefix}_QUEUE", defaults['queue']))
+            executor = BoundedExecutor(name, workers, queue_size)
+            _executors[name] = executor
+            logger.info(f"{name} プールを作成しました (workers={executor.max_workers}, queue={executor.queue_size})")
+        return executor
+
+
+def run_in_io_executor(func: Callable, *args, **kwargs) -> asyncio.Future:
+    """ファイルの読み込み・復号化などの I/O 処理を I/O プールで実行する"""
+    return get_executor(IO_EXECUTOR).run(func, *args, **kwargs)
+
+
+def run_in_cpu_executor(func: Callable, *args, **kwargs) -> asyncio.Future:
+    """pandas による集計などの CPU 処理を CPU プールで実行する"""
+    return get_executor(CPU_EXECUTOR).run(func, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    """作成済みのプールの統計"""
+    with _executors_lock:
+        executors = dict(_executors)
+    return {name: executor.stats() for name, executor in executors.items()}
+
+
+def shutdown_executors() -> None:
+    """全てのプールを終了する"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
@@ -0,0 +1,87 @@
+"""
+フィールド選択（fields= パラメータ）
+- レスポンスに含めるフィールドをカンマ区切りで指定する
+- 指定されたフィールドだけを計算・シリアライズするための集合と include 指定を作成する
+"""
+
+import logging
+from typing import Any, Dict, FrozenSet, Optional, Set, Type
+
+from pydantic import BaseModel
+
+# ロガー設定
+logger = logging.getLogger("api.field_selection")
+
+# モデルごとに必ず含めるフィールド（クライアントが行を識別するため）
+_KEY_FIELDS = {'Project': 'project_id', 'Milestone': 'id'}
+
+
+def parse_fields(fields: Optional[str], model_class: Type[BaseModel]) -> Optional[FrozenSet[str]]:
+    """
+    fields= パラメータを解析する
+
+    Args:
+        fields: カンマ区切りのフィールド名（None または空の場合は全フィールド）
+        model_class: 対象のモデルクラス
+
+    Returns:
+        選択されたフィールドの集合（全フィールドの場合は None）
+
+    Raises:
+        ValueError: モデルに存在しないフィールドが指定された場合
+    """
+    if not fields:
+        return None
+
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    if not requested:
+        return None
+
+    available = set(model_class.model_fields)
+    unknown = sorted(requested - available)
+    if unknown:
+        raise ValueError(
+            f"存在しないフィールドが指定されました: {', '.join(unknown)} "
+            f"(使用可能: {', '.join(model_class.model_fields)})"
+        )
+
+    key_field = _KEY_FIELDS.get(model_class.__name__)
+    if key_field:
+        requested.add(key_field)
+    return frozenset(requested)
+
+
+def wants(fields: Optional[FrozenSet[str]], name: str) -> bool:
+    """フィールドを計算する必要があるかどうか"""
+    return fields is None or name in fields
+
+
+def include_for(fields: Optional[FrozenSet[str]]) -> Optional[Set[str]]:
+    """
+    モデル（またはモデルのリスト）をシリアライズする時の include 指定を作成する
+
+    Returns:
+        Pydantic の include 形式の指定（全フィールドの場合は None）
+    """
+    return set(fields) if fields is not None else None
+
+
+def include_within(fields: Optional[FrozenSet[str]], container_class: Type[BaseModel],
+                   *list_keys: str) -> Optional[Dict[str, Any]]:
+    """
+    レスポンスモデル内のリストの要素にフィールド選択を適用する include 指定を作成する
+
+    Args:
+        fields: 選択されたフィールドの集合
+        container_class: レスポンスモデルのクラス（例: ProjectPage）
+        list_keys: 選択を適用するリストフィールド（例: 'items'）
+
+    Returns:
+        Pydantic の include 形式の指定（全フィールドの場合は None）
+    """
+    if fields is None:
+        return None
+    include: Dict[str, Any] = {name: True for name in container_class.model_fields}
+    for key in list_keys:
+        include[key] = {'__all__': set(fields)}
+    return include
@@ -15,10 +15,8 @@ from typing import Optional, Dict, Any
 from .async_loader import lazy_import
 
 # ロガー設定
+# （出力はルートロガーのハンドラーに任せる）
 logger = logging.getLogger(__name__)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
 def validate_file_path(path: Optional[str], allow_directories: bool = True) -> Optional[str]:
@@ -0,0 +1,276 @@
+"""
+HTTPキャッシュ（条件付きGET・レスポンスキャッシュ）
+- データセットのスナップショットバージョン・リクエストパラメータ・基準日からETagを作成する
+- If-None-Match が一致した場合は計算を行わずに 304 を返す
+- エンコード済みのレスポンスボディ（gzip済みを含む）をデータセットの派生キャッシュに保存する
+  （スナップショットが差し替えられると派生キャッシュごと破棄される）
+- キャッシュキー・ETag にはエンドポイントが受け取るクエリパラメータのみを使用し
+  （キャッシュ回避用の _=... などを無視する）、スナップショットごとの件数を LRU で制限する
+"""
+
+import datetime
+import gzip
+import hashlib
+import logging
+import os
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .data_processing import async_get_dataset, get_dataset_registry
+from .executors import run_in_cpu_executor
+from .dataset_registry import DatasetEntry
+from .dataset_snapshot import DatasetSnapshot
+from .json_encoding import encode_json
+from .runtime_metrics import record_cache
+
+# ロガー設定
+logger = logging.getLogger("api.http_cache")
+
+# ブラウザには保存させつつ、毎回再検証させる
+CACHE_CONTROL = "no-cache"
+
+# スナップショットバージョンを返すヘッダー（差分取得の since に使用）
+VERSION_HEADER = "X-Dataset-Version"
+
+# 派生キャッシュのキー接頭辞
+RESPONSE_CACHE_PREFIX = "response"
+
+# gzip済みボディを作成する最小サイズ（バイト）
+DEFAULT_GZIP_MIN_BYTES = 1024
+
+# スナップショットごとに保持するレスポンスボディの上限件数
+DEFAULT_RESPONSE_CACHE_MAX_ENTRIES = 64
+
+# ルートごとのクエリパラメータ名
+_route_query_names: Dict[int, FrozenSet[str]] = {}
+
+
+def _response_cache_enabled() -> bool:
+    """レスポンスキャッシュが有効かどうか"""
+    return os.environ.get('RESPONSE_CACHE_ENABLED', '1') != '0'
+
+
+def _gzip_min_bytes() -> Optional[int]:
+    """gzip済みボディを作成する最小サイズ（無効な場合は None）"""
+    if os.environ.get('RESPONSE_CACHE_GZIP', '1') == '0':
+        return None
+    return int(os.environ.get('RESPONSE_CACHE_GZIP_MIN_BYTES', DEFAULT_GZIP_MIN_BYTES))
+
+
+def _response_cache_max_entries() -> int:
+    """スナップショットごとに保持するレスポンスボディの上限件数"""
+    return int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_RESPONSE_CACHE_MAX_ENTRIES))
+
+
+def _query_names(route: Any) -> Optional[FrozenSet[str]]:
+    """ルートが受け取るクエリパラメータ名（依存関係を含む。判定できない場合は None）"""
+    dependant = getattr(route, 'dependant', None)
+    if dependant is None:
+        return None
+    names = _route_query_names.get(id(route))
+    if names is None:
+        collected = set()
+        pending = [dependant]
+        while pending:
+            current = pending.pop()
+            collected.update(param.alias for param in current.query_params)
+            pending.extend(current.dependencies)
+        names = _route_query_names[id(route)] = frozenset(collected)
+    return names
+
+
+def normalized_query(request: Request) -> str:
+    """
+    クエリパラメータを並べ替えて正規化する
+
+    エンドポイントが受け取らないパラメータ（キャッシュ回避用の _=... など）は除外する。
+    """
+    names = _query_names(request.scope.get("route"))
+    return "&".join(
+        f"{k}={v}" for k, v in sorted(request.query_params.multi_items())
+        if names is None or k in names
+    )
+
+
+def build_etag(request: Request, dataset_key: str, version: int,
+               reference_date: Optional[datetime.date] = None) -> str:
+    """
+    ETagを作成する
+
+    Args:
+        request: リクエスト
+        dataset_key: データセットのレジストリキー
+        version: スナップショットバージョン
+        reference_date: 遅延判定などの基準日（指定がない場合は今日）
+
+    Returns:
+        弱いETag（圧縮などの表現の違いを許容する）
+    """
+    if reference_date is None:
+        reference_date = datetime.date.today()
+    source = "|".join([
+        request.url.path, normalized_query(request), dataset_key, str(version),
+        reference_date.isoformat()
+    ])
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:20]
+    return f'W/"{version}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match ヘッダーが ETag と一致するかどうか（弱い比較）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified_response(etag: str, version: int) -> Response:
+    """304 レスポンスを作成する"""
+    return Response(status_code=304, headers={
+        "ETag": etag, "Cache-Control": CACHE_CONTROL, VERSION_HEADER: str(version)
+    })
+
+
+class CachedBody:
+    """エンコード済みのレスポンスボディ（gzip済みボディを含む）"""
+
+    __slots__ = ('body', 'gzipped', 'etag', 'version')
+
+    def __init__(self, body: bytes, etag: str, version: int):
+        self.body = body
+        self.etag = etag
+        self.version = version
+        min_bytes = _gzip_min_bytes()
+        self.gzipped = (
+            gzip.compress(body, compresslevel=6)
+            if min_bytes is not None and len(body) >= min_bytes else None
+        )
+
+    def __sizeof__(self) -> int:
+        return len(self.body) + len(self.gzipped or b'') + len(self.etag)
+
+    def to_response(self, request: Request) -> Response:
+        """リクエストの Accept-Encoding に応じたレスポンスを作成する"""
+        headers = {
+            "ETag": self.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding",
+            VERSION_HEADER: str(self.version),
+        }
+        accept_encoding = request.headers.get("accept-encoding", "")
+        if self.gzipped is not None and "gzip" in accept_encoding.lower():
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=self.gzipped, media_type="application/json", headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+class CachedRequest:
+    """
+    データセットに紐づくGETリクエストのキャッシュ処理
+
+    open_cached_request() で作成し、cached_response が None でなければそのまま返す。
+    結果は frame() / snapshot（ETag・バージョンと同じスナップショット）から計算し、
+    respond() でエンコードして保存し、レスポンスとして返す。
+    """
+
+    def __init__(self, request: Request, entry: DatasetEntry, snapshot: DatasetSnapshot,
+                 version: int, etag: str, cache_key: Tuple):
+        self.request = request
+        self.entry = entry
+        self.snapshot = snapshot
+        self.version = version
+        self.etag = etag
+        self.cache_key = cache_key
+        self.cached_response: Optional[Response] = None
+
+    async def frame(self, columns=None):
+        """
+        ETag・バージョンと同じスナップショットのデータフレームを取得する
+        （計算中に再ロードされても、別のスナップショットから作成したボディを返さないようにする）
+
+        Args:
+            columns: 必要な列（None の場合はコア列のみ）
+        """
+        return await run_in_cpu_executor(self.snapshot.frame, columns)
+
+    def respond(self, content: Any, include: Optional[Any] = None) -> Response:
+        """
+        結果をエンコードしてキャッシュに保存し、レスポンスを返す
+
+        Args:
+            content: エンドポイントの結果（Pydanticモデルやそのリスト）
+            include: 含めるフィールド（fields= パラメータ指定時）
+
+        Returns:
+            エンコード済みのレスポンス
+        """
+        cached = CachedBody(encode_json(content, include), self.etag, self.version)
+        if _response_cache_enabled():
+            # 計算中にスナップショットが差し替えられていれば保存しない
+            get_dataset_registry().set_derived(
+                self.entry, self.cache_key, cached, self.version,
+                max_entries=_response_cache_max_entries()
+            )
+        return cached.to_response(self.request)
+
+
+async def open_cached_request(request: Request, file_path: Optional[str] = None,
+                              sources: Optional[str] = None) -> CachedRequest:
+    """
+    条件付きGETとレスポンスキャッシュを処理する
+
+    データセットのバージョンのみを確認し、変更がなければ 304 を、
+    エンコード済みのボディがあればそれを cached_response に設定する。
+    流入制御の前に同じリクエストで作成済みのコンテキストがあり、データセットが
+    差し替えられていなければそれを返す。
+
+    Args:
+        request: リクエスト
+        file_path: ダッシュボードCSVファイルのパス
+        sources: 集約する拠点のエクスポートディレクトリ
+
+    Returns:
+        キャッシュ処理のコンテキスト
+    """
+    entry = await async_get_dataset(file_path, sources)
+    snapshot, version = entry.current()
+    opened = getattr(request.state, 'cached_request', None)
+    if opened is not None and opened.entry is entry and opened.version == version:
+        return opened
+
+    reference_date = datetime.date.today()
+    etag = build_etag(request, entry.key, version, reference_date)
+    today = reference_date.isoformat()
+    cache_key = (
+        RESPONSE_CACHE_PREFIX, request.url.path, normalized_query(request), version, today
+    )
+    context = CachedRequest(request, entry, snapshot, version, etag, cache_key)
+    request.state.cached_request = context
+
+    if etag_matches(request, etag):
+        logger.debug(f"変更なしのため 304 を返します: {request.url.path} ({etag})")
+        context.cached_response = not_modified_response(etag, version)
+        record_cache('response', 'not_modified')
+        return context
+
+    if _response_cache_enabled():
+        registry = get_dataset_registry()
+        cached, hit = registry.get_derived(entry, cache_key)
+        record_cache('response', 'hit' if hit else 'miss')
+        if hit:
+            context.cached_response = cached.to_response(request)
+        else:
+            # 日付が変わる前に保存したボディは再び使われないため破棄する
+            registry.discard_derived(
+                entry, lambda key: key[0] == RESPONSE_CACHE_PREFIX and key[-1] != today
+            )
+
+    return context
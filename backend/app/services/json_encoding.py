@@ -0,0 +1,100 @@
+"""
+JSONエンコード
+- 標準パス: FastAPI と同じ jsonable_encoder + json.dumps
+- 高速パス（FAST_JSON_ENABLED=1）: Pydanticモデルは型ごとに事前構築した TypeAdapter で直接バイト列に、
+  それ以外の値は orjson（インストールされている場合）でエンコードする
+"""
+
+import functools
+import json
+import logging
+import os
+from typing import Any, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+# ロガー設定
+logger = logging.getLogger("api.json_encoding")
+
+# orjson は任意の依存関係
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def fast_json_enabled() -> bool:
+    """高速パスが有効かどうか"""
+    return os.environ.get('FAST_JSON_ENABLED', '0') == '1'
+
+
+@functools.lru_cache(maxsize=64)
+def _list_adapter(model_class: type) -> TypeAdapter:
+    """モデルのリスト用の TypeAdapter（型ごとに1度だけ構築）"""
+    return TypeAdapter(List[model_class])
+
+
+def encode_json_standard(content: Any, include: Optional[Any] = None) -> bytes:
+    """FastAPI の JSONResponse と同じ形式でエンコードする"""
+    return json.dumps(
+        jsonable_encoder(content, include=include),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _model_class_of(content: Any) -> Optional[type]:
+    """同一モデルのリストであればそのモデルクラスを返す"""
+    if not isinstance(content, list) or not content:
+        return None
+    model_class = type(content[0])
+    if not issubclass(model_class, BaseModel):
+        return None
+    if any(type(item) is not model_class for item in content):
+        return None
+    return model_class
+
+
+def encode_json_fast(content: Any, include: Optional[Any] = None) -> bytes:
+    """
+    高速パスでエンコードする（日時は標準パスと同じ ISO 8601 形式）
+
+    Args:
+        content: Pydanticモデル・そのリスト・JSON互換の値
+        include: 含めるフィールド（Pydantic の include 形式。リストの場合は各要素に適用）
+
+    Returns:
+        エンコード済みのバイト列
+    """
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content, include=include)
+
+    model_class = _model_class_of(content)
+    if model_class is not None:
+        return _list_adapter(model_class).dump_json(
+            content, include={'__all__': include} if include is not None else None
+        )
+
+    # フィールド選択は Pydantic モデル以外には標準パスで適用する
+    if orjson is not None and include is None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return encode_json_standard(content, include)
+
+
+def encode_json(content: Any, include: Optional[Any] = None) -> bytes:
+    """
+    設定に応じたパスでエンコードする
+
+    Args:
+        content: エンコードする値
+        include: 含めるフィールド（Pydantic の include 形式。リストの場合は各要素に適用）
+    """
+    if fast_json_enabled():
+        return encode_json_fast(content, include)
+    return encode_json_standard(content, include)
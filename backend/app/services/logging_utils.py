@@ -2,14 +2,28 @@
 ログ設定ユーティリティ
 - ログディレクトリとファイルの管理
 - ロガー設定の一元化
+- 非同期のログ出力（ルートロガーはキューに積むだけで、標準出力・ファイルへの書き込みは
+  専用の書き込みスレッドが行う）
+  - キューが上限に達した場合は待たずに破棄し、件数を記録する
+  - LOG_SAMPLE_RATES で大量に出力されるロガーの INFO 以下のログを間引く
 """
 
 import os
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
 import sys
-from typing import Optional
+from typing import Any, Dict, Optional
+
+# ログキューの既定の上限
+DEFAULT_LOG_QUEUE_SIZE = 10000
+
+# 書き込みスレッド（setup_logging で作成）
+_listener: Optional["DrainingQueueListener"] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
 
 # data_processing.pyからCSVパス解決関数をインポート
 from .data_processing import resolve_dashboard_path
@@ -42,24 +56,149 @@ def get_log_directory() -> Path:
     
     return logs_dir
 
+class SamplingFilter(logging.Filter):
+    """
+    ロガーごとに INFO 以下のログを間引くフィルター（WARNING 以上は常に出力）
+
+    間引く割合は LOG_SAMPLE_RATES（例: "app.services.data_processing=0.1,api.projects=0.5"）で指定し、
+    子ロガーにも適用する。割合 r のロガーは 1/r 件ごとに1件を出力する。
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.intervals = {name: max(1, round(1 / rate)) for name, rate in rates.items() if rate > 0}
+        self.muted = {name for name, rate in rates.items() if rate <= 0}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.sampled_out = 0
+
+    def _match(self, name: str) -> Optional[str]:
+        """ロガー名に適用する設定の名前（最も近い親）"""
+        while name:
+            if name in self.intervals or name in self.muted:
+                return name
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        name = self._match(record.name)
+        if name is None:
+            return True
+        with self._lock:
+            if name in self.muted:
+                self.sampled_out += 1
+                return False
+            count = self._counters.get(name, 0)
+            self._counters[name] = count + 1
+            if count % self.intervals[name] == 0:
+                return True
+            self.sampled_out += 1
+            return False
+
+
+def parse_sample_rates(value: Optional[str]) -> Dict[str, float]:
+    """LOG_SAMPLE_RATES の値（"ロガー名=割合" のカンマ区切り）を解析する"""
+    rates = {}
+    for item in (value or "").split(','):
+        name, _, rate = item.partition('=')
+        if not name.strip() or not rate.strip():
+            continue
+        try:
+            rates[name.strip()] = min(1.0, float(rate))
+        except ValueError:
+            print(f"不正なログの間引き設定を無視しました: {item}")
+    return rates
+
+
+class DroppingQueueHandler(QueueHandler):
+    """キューが上限に達している場合は待たずにログを破棄する QueueHandler"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """停止時にキューが埋まっていても、残っているログを書き出してから終了する QueueListener"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def _deduplicate_handlers() -> None:
+    """
+    ルートロガーに伝播するロガーから標準出力・標準エラーへのハンドラーを外す（二重出力防止）
+    """
+    for name, candidate in list(logging.Logger.manager.loggerDict.items()):
+        if not isinstance(candidate, logging.Logger) or not candidate.propagate:
+            continue
+        for handler in candidate.handlers[:]:
+            if type(handler) is logging.StreamHandler and handler.stream in (sys.stdout, sys.stderr):
+                candidate.removeHandler(handler)
+
+
+def shutdown_logging() -> None:
+    """書き込みスレッドを停止し、キューに残っているログを書き出す"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def logging_stats() -> Dict[str, Any]:
+    """ログキューの状態と破棄・間引いた件数"""
+    if _queue_handler is None:
+        return {'queued': False}
+    sampler = next((f for f in _queue_handler.filters if isinstance(f, SamplingFilter)), None)
+    return {
+        'queued': True,
+        'queue_size': _queue_handler.queue.maxsize,
+        'pending': _queue_handler.queue.qsize(),
+        'dropped': _queue_handler.dropped,
+        'sampled_out': sampler.sampled_out if sampler is not None else 0,
+    }
+
+
 def setup_logging(log_level: int = logging.INFO, log_to_file: bool = True, 
                  app_name: str = "project_dashboard") -> None:
     """
     ロギング設定を行う
     
+    標準出力・ファイルへの書き込みは QueueListener の書き込みスレッドで行い、ルートロガーには
+    上限付きのキューに積むだけの QueueHandler を設定する（リクエスト処理中に書き込みを待たない）。
+    キューの上限は LOG_QUEUE_SIZE（0 の場合は従来どおり直接書き込む）で設定する。
+    
     Args:
         log_level: ログレベル
         log_to_file: ファイルへのログ出力を有効にするかどうか
         app_name: アプリケーション名（ログファイル名に使用）
     """
+    global _listener, _queue_handler
+    
     # ルートロガーの設定
     root_logger = logging.getLogger()
     
-    # 既存のハンドラーを削除（二重登録防止）
+    # 既存のハンドラー・書き込みスレッドを削除（二重登録防止）
+    shutdown_logging()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    _queue_handler = None
+    _deduplicate_handlers()
     
     root_logger.setLevel(log_level)
+    handlers = []
+    log_file = None
+    file_error = None
     
     # フォーマッターの作成
     formatter = logging.Formatter(
@@ -69,7 +208,7 @@ def setup_logging(log_level: int = logging.INFO, log_to_file: bool = True,
     # 標準出力へのハンドラー
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # ファイルへのハンドラー（オプション）
     if log_to_file:
@@ -82,9 +221,31 @@ def setup_logging(log_level: int = logging.INFO, log_to_file: bool = True,
                 log_file, maxBytes=10_485_760, backupCount=5
             )
             file_handler.setFormatter(formatter)
-            root_logger.addHandler(file_handler)
-            
-            # ログファイルの設定完了を記録
-            root_logger.info(f"ログファイルを設定しました: {log_file}")
+            handlers.append(file_handler)
         except Exception as e:
-            root_logger.error(f"ログファイルの設定に失敗しました: {e}")
\ No newline at end of file
+            log_file = None
+            file_error = e
+    
+    queue_size = int(os.environ.get('LOG_QUEUE_SIZE', DEFAULT_LOG_QUEUE_SIZE))
+    if queue_size > 0:
+        # 書き込みスレッドを開始し、ルートロガーにはキューへのハンドラーのみを設定
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        rates = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES'))
+        if rates:
+            _queue_handler.addFilter(SamplingFilter(rates))
+        root_logger.addHandler(_queue_handler)
+        _listener = DrainingQueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
+    
+    # ログファイルの設定完了を記録
+    if log_file is not None:
+        root_logger.info(f"ログファイルを設定しました: {log_file}")
+    elif file_error is not None:
+        root_logger.error(f"ログファイルの設定に失敗しました: {file_error}")
+
+
+# 終了時にキューに残っているログを書き出す
+atexit.register(shutdown_logging)
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+イベントループの遅延監視
+- 一定間隔でスリープするタスクの起床の遅れをイベントループの遅延として記録する
+- 監視スレッドが起床の遅れを検知した時点でイベントループのスレッドのスタックを取得し、
+  ブロックしている処理とエンドポイント（ルート）をログに出力する
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict, Optional
+
+from .route_table import iter_routes
+
+# ロガー設定
+logger = logging.getLogger("api.loop_monitor")
+
+# 既定の監視間隔・閾値（ミリ秒）
+DEFAULT_INTERVAL_MS = 100
+DEFAULT_THRESHOLD_MS = 200
+
+# 統計に使う直近のサンプル数
+LAG_SAMPLE_SIZE = 600
+
+# ログに出力するスタックの深さ
+STACK_DEPTH = 6
+
+
+def loop_monitor_enabled() -> bool:
+    """イベントループの遅延監視が有効かどうか"""
+    return os.environ.get('LOOP_MONITOR_ENABLED', '1') != '0'
+
+
+class LoopMonitor:
+    """
+    イベントループの遅延を計測し、閾値を超えてブロックした処理をログに出力する
+
+    ルートはブロック中のスタックに含まれるエンドポイント関数から特定する。
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        """
+        Args:
+            interval: 計測間隔（秒）
+            threshold: ブロックとして記録する遅延（秒）
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._beat = time.monotonic()
+        self._reported_beat = 0.0
+        self._endpoints: Dict[Any, str] = {}
+        self._lags = deque(maxlen=LAG_SAMPLE_SIZE)
+        self.max_lag = 0.0
+        self.blocked = 0
+        self.last_block: Optional[Dict[str, Any]] = None
+
+    def register_routes(self, routes) -> None:
+        """エンドポイント関数のコードとルートの対応を登録する"""
+        for path, _, endpoint in iter_routes(routes):
+            while endpoint is not None:
+                code = getattr(endpoint, '__code__', None)
+                if code is not None:
+                    self._endpoints[code] = path
+                endpoint = getattr(endpoint, '__wrapped__', None)
+
+    def start(self) -> None:
+        """現在のイベントループで監視を開始する"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = self._loop.create_task(self._sample())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"イベントループの遅延監視を開始しました "
+            f"(interval={self.interval * 1000:.0f}ms, threshold={self.threshold * 1000:.0f}ms)"
+        )
+
+    def stop(self) -> None:
+        """監視を終了する"""
+        self._stop.set()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def _sample(self) -> None:
+        """一定間隔でスリープし、起床の遅れを記録する"""
+        while not self._stop.is_set():
+            beat = self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - beat - self.interval)
+            self._lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.blocked += 1
+                # 監視スレッドがこのブロック中にスタックを取得していればそのルートを使う
+                route = self.last_block['route'] if self._reported_beat == beat and self.last_block else None
+                logger.warning(
+                    f"イベントループが {lag * 1000:.0f}ms ブロックされました (route={route or '不明'})"
+                )
+
+    def _watch(self) -> None:
+        """ブロック中のイベントループのスタックを取得する（監視スレッド）"""
+        poll = max(0.01, min(self.interval, self.threshold) / 2)
+        while not self._stop.wait(poll):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            route = None
+            walker = frame
+            while walker is not None:
+                route = self._endpoints.get(walker.f_code)
+                if route is not None:
+                    break
+                walker = walker.f_back
+            stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+            del frame, walker
+
+            location = " <- ".join(
+                f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}" for entry in reversed(stack)
+            )
+            self.last_block = {
+                'route': route,
+                'stalled_ms': round(stalled * 1000, 1),
+                'stack': location,
+                'at': time.time(),
+            }
+            logger.warning(
+                f"イベントループをブロックしている処理を検出しました: route={route or '不明'}, "
+                f"{stalled * 1000:.0f}ms 経過, {location}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """遅延の統計"""
+        lags = sorted(self._lags)
+        p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+        return {
+            'interval_ms': round(self.interval * 1000, 1),
+            'threshold_ms': round(self.threshold * 1000, 1),
+            'samples': len(lags),
+            'avg_lag_ms': round(sum(lags) / len(lags) * 1000, 3) if lags else 0.0,
+            'p99_lag_ms': round(p99 * 1000, 3),
+            'max_lag_ms': round(self.max_lag * 1000, 3),
+            'blocked': self.blocked,
+            'last_block': self.last_block,
+        }
+
+
+# 実行中の監視
+_monitor: Optional[LoopMonitor] = None
+
+
+def start_loop_monitor(app) -> Optional[LoopMonitor]:
+    """
+    イベントループの遅延監視を開始する（ライフスパンの開始時に呼び出す）
+
+    計測間隔は LOOP_MONITOR_INTERVAL_MS、ブロックとして記録する閾値は LOOP_LAG_THRESHOLD_MS で設定する。
+
+    Args:
+        app: FastAPI アプリケーション（ルートの特定に使用）
+
+    Returns:
+        開始した監視（無効化されている場合は None）
+    """
+    global _monitor
+    if not loop_monitor_enabled():
+        return None
+    stop_loop_monitor()
+    interval = float(os.environ.get('LOOP_MONITOR_INTERVAL_MS', DEFAULT_INTERVAL_MS)) / 1000
+    threshold = float(os.environ.get('LOOP_LAG_THRESHOLD_MS', DEFAULT_THRESHOLD_MS)) / 1000
+    monitor = LoopMonitor(interval, threshold)
+    monitor.register_routes(app.routes)
+    monitor.start()
+    _monitor = monitor
+    return monitor
+
+
+def stop_loop_monitor() -> None:
+    """イベントループの遅延監視を終了する"""
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+def loop_monitor_stats() -> Dict[str, Any]:
+    """イベントループの遅延の統計（監視していない場合は空）"""
+    return _monitor.stats() if _monitor is not None else {}
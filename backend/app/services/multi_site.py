@@ -0,0 +1,301 @@
+"""
+複数拠点の集約データセット
+- 拠点ごとのエクスポートディレクトリ（リストまたはglob）をまとめて1つのデータセットとして扱う
+- 各拠点のファイルはプロセスプールで並列に読み込み・復号化する
+- 行には読み込み元の拠点名を付与し、重複タスクを除去して結合する
+- ソースごとに更新を検知し、変更された拠点のみ再読み込みする
+"""
+
+import glob
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .async_loader import import_pandas
+from .dataset_registry import source_signature
+from .dataset_snapshot import DatasetSnapshot
+from .deadlines import check_deadline
+
+# ロガー設定
+logger = logging.getLogger("api.multi_site")
+
+# 集約データセットのレジストリキー接頭辞
+AGGREGATE_KEY_PREFIX = "aggregate:"
+
+# 拠点名の推定時に読み飛ばすディレクトリ名
+_GENERIC_DIR_NAMES = {'exports', 'data', 'projectmanager', 'projectsuite'}
+
+# ディレクトリ内で探索するダッシュボードファイル
+_DASHBOARD_FILE_NAMES = ['dashboard.csv', 'dashboard.csv.enc']
+
+# プロセスプール（遅延作成）
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def is_aggregate_key(key: str) -> bool:
+    """集約データセットのキーかどうか"""
+    return key.startswith(AGGREGATE_KEY_PREFIX)
+
+
+def aggregate_key(sources: str) -> str:
+    """
+    ソース指定から集約データセットのキーを作成する
+
+    Args:
+        sources: カンマ区切りのエクスポートディレクトリまたはglobパターン
+
+    Returns:
+        正規化されたレジストリキー
+    """
+    parts = sorted({part.strip() for part in sources.split(',') if part.strip()})
+    return AGGREGATE_KEY_PREFIX + ','.join(parts)
+
+
+def expand_sources(key: str) -> List[str]:
+    """
+    集約キーに含まれるソース指定をダッシュボードファイルのパスに展開する
+
+    Args:
+        key: 集約データセットのキー
+
+    Returns:
+        ダッシュボードファイルの解決済みパス一覧（重複なし）
+    """
+    spec = key[len(AGGREGATE_KEY_PREFIX):] if is_aggregate_key(key) else key
+    paths: List[str] = []
+
+    for pattern in spec.split(','):
+        pattern = os.path.expanduser(pattern.strip())
+        if not pattern:
+            continue
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            candidate = Path(match)
+            if candidate.is_dir():
+                for name in _DASHBOARD_FILE_NAMES:
+                    if (candidate / name).exists():
+                        candidate = candidate / name
+                        break
+                else:
+                    logger.warning(f"ダッシュボードファイルが見つかりません: {candidate}")
+                    continue
+            resolved = str(candidate.resolve())
+            if resolved not in paths:
+                paths.append(resolved)
+
+    return paths
+
+
+def source_label(path: str) -> str:
+    """
+    ダッシュボードファイルのパスから拠点名を推定する
+
+    `<拠点>/ProjectSuite/ProjectManager/data/exports/dashboard.csv` の形式では `<拠点>` を、
+    それ以外では汎用的でない最も近い親ディレクトリ名を返す
+    """
+    parents = list(Path(path).parents)
+    for i, parent in enumerate(parents):
+        if parent.name.lower() == 'projectsuite' and i + 1 < len(parents):
+            return parents[i + 1].name or str(parents[i + 1])
+    for parent in parents:
+        if parent.name and parent.name.lower() not in _GENERIC_DIR_NAMES:
+            return parent.name
+    return str(Path(path).parent)
+
+
+def load_source_frame(path: str, columns: Optional[List[str]] = None):
+    """
+    1拠点分のデータを読み込む（プロセスプールのワーカーで実行）
+
+    Args:
+        path: ダッシュボードファイルのパス
+        columns: 読み込む列
+
+    Returns:
+        (データフレーム, ロード時間) のタプル
+    """
+    from . import data_processing
+
+    # ワーカープロセスでは初期化タスクが走らないため暗号化ユーティリティを用意する
+    if data_processing.crypto_utils is None:
+        try:
+            from .crypto_utils import get_crypto_instance
+            data_processing.crypto_utils = get_crypto_instance()
+        except ImportError:
+            pass
+
+    start_time = time.time()
+    snapshot = data_processing.load_dataset_snapshot(path)
+    return snapshot.frame(columns), time.time() - start_time
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """集約読み込み用のプロセスプールを取得する（無効化されている場合は None）"""
+    global _process_pool
+
+    if os.environ.get('AGGREGATE_USE_PROCESSES', '1') == '0':
+        return None
+
+    with _process_pool_lock:
+        if _process_pool is None:
+            import multiprocessing
+            workers = int(os.environ.get(
+                'AGGREGATE_PROCESS_WORKERS', min(4, os.cpu_count() or 1)
+            ))
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max(1, workers),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"集約読み込み用プロセスプールを作成しました (workers={workers})")
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """プロセスプールを終了する"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+class AggregateLoader:
+    """
+    集約データセットのローダー
+
+    拠点ごとに (署名, フレーム) をキャッシュし、署名が変わった拠点のみを
+    プロセスプールで並列に再読み込みしてから結合する。
+    """
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        """
+        Args:
+            columns: 各拠点から読み込む列
+        """
+        self.columns = columns
+        self._sources: Dict[str, Tuple[Tuple, Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def signature(self, key: str) -> Tuple:
+        """集約データセット全体の署名（拠点ごとの署名の組）"""
+        return tuple((path, source_signature(path)) for path in expand_sources(key))
+
+    def _load_changed(self, changed: List[str]) -> Dict[str, Tuple[Any, float]]:
+        """変更された拠点を並列に読み込む"""
+        if not changed:
+            return {}
+
+        pool = _get_process_pool() if len(changed) > 1 else None
+        if pool is not None:
+            try:
+                futures = {path: pool.submit(load_source_frame, path, self.columns) for path in changed}
+                return {path: future.result() for path, future in futures.items()}
+            except Exception as e:
+                # プロセスプールが使えない環境（凍結バイナリの制約など）ではスレッドで読み込む
+                logger.warning(f"プロセスプールでの読み込みに失敗したためスレッドで再試行します: {e}")
+                shutdown_process_pool()
+
+        with ThreadPoolExecutor(max_workers=min(len(changed), 4)) as executor:
+            futures = {path: executor.submit(load_source_frame, path, self.columns) for path in changed}
+            return {path: future.result() for path, future in futures.items()}
+
+    def load(self, key: str) -> DatasetSnapshot:
+        """
+        集約データセットのスナップショットを作成する
+
+        Args:
+            key: 集約データセットのキー
+
+        Returns:
+            全拠点を結合したスナップショット
+        """
+        pd = import_pandas()
+        start_time = time.time()
+
+        with self._lock:
+            paths = expand_sources(key)
+            signatures = {path: source_signature(path) for path in paths}
+            changed = [
+                path for path in paths
+                if path not in self._sources or self._sources[path][0] != signatures[path]
+            ]
+            if changed:
+                logger.info(f"集約データセットの拠点を読み込みます: {len(changed)}/{len(paths)}件")
+
+            check_deadline('parse')
+            for path, (frame, load_time) in self._load_changed(changed).items():
+                self._sources[path] = (signatures[path], frame, load_time)
+
+            # 対象外になった拠点を破棄
+            for path in list(self._sources):
+                if path not in signatures:
+                    del self._sources[path]
+
+            sources = {path: self._sources[path] for path in paths}
+
+        check_deadline('merge')
+        frames = []
+        errors = []
+        labels: Dict[str, str] = {}
+        # 更新日時の新しい拠点を優先（重複除去で先頭が残る）
+        ordered = sorted(
+            sources.items(),
+            key=lambda item: max((s[0] for s in item[1][0] if s), default=0),
+            reverse=True
+        )
+        for path, (_, frame, _) in ordered:
+            if 'error' in frame.columns or 'error_message' in frame.columns:
+                errors.append(path)
+                continue
+            label = source_label(path)
+            if label in labels.values():
+                label = f"{label}#{len(labels) + 1}"
+            labels[path] = label
+            tagged = frame.copy()
+            tagged['project_id'] = tagged['project_id'].astype(str)
+            tagged['source'] = label
+            frames.append(tagged)
+
+        if errors:
+            logger.warning(f"読み込みに失敗した拠点を除外しました: {errors}")
+
+        if not frames:
+            return DatasetSnapshot.from_frame(pd.DataFrame({
+                "error": [f"集約対象のデータファイルが読み込めませんでした: {key[len(AGGREGATE_KEY_PREFIX):]}"]
+            }), key)
+
+        combined = pd.concat(frames, ignore_index=True)
+
+        # 同一プロジェクトの重複タスクを除去
+        if {'project_id', 'project_name', 'task_id'}.issubset(combined.columns):
+            before = len(combined)
+            combined = combined.drop_duplicates(
+                subset=['project_id', 'project_name', 'task_id'], keep='first'
+            ).reset_index(drop=True)
+            if before != len(combined):
+                logger.info(f"重複タスクを除去しました: {before - len(combined)}件")
+
+            # 拠点間でIDが衝突した別プロジェクトは拠点名で修飾する
+            name_counts = combined.groupby('project_id')['project_name'].transform('nunique')
+            collided = name_counts > 1
+            if collided.any():
+                combined.loc[collided, 'project_id'] = (
+                    combined.loc[collided, 'source'] + ':' + combined.loc[collided, 'project_id']
+                )
+
+        snapshot = DatasetSnapshot.from_frame(combined, key)
+        snapshot.load_time = time.time() - start_time
+        return snapshot
+
+    def describe_sources(self) -> List[Dict[str, Any]]:
+        """拠点ごとの読み込み状況"""
+        with self._lock:
+            return [
+                {'path': path, 'label': source_label(path), 'rows': len(frame), 'load_time': round(load_time, 4)}
+                for path, (_, frame, load_time) in self._sources.items()
+            ]
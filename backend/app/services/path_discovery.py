@@ -0,0 +1,259 @@
+"""
+ダッシュボードファイルの探索
+- アプリケーションバンドルとユーザーフォルダの候補ファイルを並列に確認する
+- ネットワークドライブ上のフォルダに備えて確認全体に短いタイムアウトを設定する
+  （タイムアウトした候補は存在不明として扱い、選択中のファイルであれば選択を維持する）
+- 応答しない候補の確認は打ち切れないため、完了するまで同じパスの確認を重ねて投入しない
+- 探索結果はキャッシュし、選択したファイルの消失や優先度の高い候補の出現で無効化する
+"""
+
+import os
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# ロガー設定
+logger = logging.getLogger("api.path_discovery")
+
+# 候補の確認全体のタイムアウト（秒）
+DEFAULT_PROBE_TIMEOUT = 0.5
+# キャッシュした探索結果の再確認間隔（秒）
+DEFAULT_REVALIDATE_SECONDS = 5.0
+
+# ユーザーフォルダ内の相対パス
+_EXPORTS_RELATIVE = Path("ProjectSuite") / "ProjectManager" / "data" / "exports"
+
+# 探索専用のスレッドプール（応答しないドライブで共有プールを塞がないため分離）
+_probe_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="path-probe")
+
+# 完了していない確認（パス → Future）
+_probe_lock = threading.Lock()
+_inflight_probes: Dict[str, Future] = {}
+
+# 探索結果のキャッシュ
+_cache_lock = threading.Lock()
+_cached_result: Optional[Dict[str, Any]] = None
+
+
+def _user_folders() -> List[Path]:
+    """検索対象のユーザーフォルダ（優先度順）"""
+    home_dir = Path.home()
+    return [
+        home_dir / "Documents",  # Windows/macOS
+        home_dir / "Desktop",    # Windows/macOS
+        home_dir / "Downloads",  # Windows/macOS
+        home_dir / "ドキュメント",  # 日本語Windows
+        home_dir / "デスクトップ",  # 日本語Windows
+        home_dir / "ダウンロード",  # 日本語Windows
+        home_dir / "文書",      # 日本語macOS
+    ]
+
+
+def candidate_paths() -> List[str]:
+    """
+    ダッシュボードファイルの候補パスを優先度順に返す
+
+    Returns:
+        候補パスの一覧（先頭ほど優先度が高い）
+    """
+    candidates = []
+
+    # アプリケーションバンドルパス
+    app_path = os.environ.get('APP_PATH', '')
+    if app_path:
+        bundle_dir = Path(app_path) / "data" / "exports"
+        candidates.append(str(bundle_dir / "dashboard.csv"))
+        candidates.append(str(bundle_dir / "dashboard.csv.enc"))
+
+    # ユーザーフォルダ内の ProjectSuite エクスポート
+    for folder in _user_folders():
+        target_dir = folder / _EXPORTS_RELATIVE
+        candidates.append(str(target_dir / "dashboard.csv"))
+        candidates.append(str(target_dir / "dashboard.csv.enc"))
+
+    return candidates
+
+
+def _probe(path: str) -> Dict[str, Any]:
+    """候補パスの存在・サイズ・更新日時を確認する"""
+    try:
+        stat = os.stat(path)
+        return {'path': path, 'exists': True, 'size': stat.st_size, 'mtime': stat.st_mtime}
+    except OSError:
+        return {'path': path, 'exists': False, 'size': None, 'mtime': None}
+
+
+def _submit_probe(path: str) -> Future:
+    """
+    候補パスの確認を投入する
+
+    前回の確認が応答せずに残っている場合は、新たに投入せずにその Future を返す
+    （応答しないドライブの確認で探索専用のプールが埋まらないようにする）。
+    """
+    with _probe_lock:
+        future = _inflight_probes.get(path)
+        if future is not None and not future.done():
+            return future
+        future = _probe_executor.submit(_probe, path)
+        _inflight_probes[path] = future
+    future.add_done_callback(lambda f: _discard_probe(path, f))
+    return future
+
+
+def _discard_probe(path: str, future: Future) -> None:
+    """完了した確認を記録から外す"""
+    with _probe_lock:
+        if _inflight_probes.get(path) is future:
+            del _inflight_probes[path]
+
+
+def probe_candidates(paths: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    候補パスを並列に確認する
+
+    Args:
+        paths: 確認するパス一覧
+        timeout: 確認全体のタイムアウト（秒、全候補を並列に確認して待つ時間の上限）
+
+    Returns:
+        候補ごとの確認結果（入力と同じ順序）。
+        タイムアウトした候補は timed_out=True・exists=None（存在不明）
+    """
+    if timeout is None:
+        timeout = float(os.environ.get('DISCOVERY_PROBE_TIMEOUT', DEFAULT_PROBE_TIMEOUT))
+
+    futures = [_submit_probe(path) for path in paths]
+    wait(futures, timeout=timeout)
+
+    results = []
+    for priority, (path, future) in enumerate(zip(paths, futures)):
+        if future.done():
+            result = dict(future.result())
+            result['timed_out'] = False
+        else:
+            # 応答しないドライブは存在を判定できない
+            result = {'path': path, 'exists': None, 'size': None, 'mtime': None, 'timed_out': True}
+        result['priority'] = priority
+        results.append(result)
+    return results
+
+
+def _fallback_path() -> str:
+    """候補が見つからない場合のフォールバックパス"""
+    folders = _user_folders()
+    for folder, probed in zip(folders, probe_candidates([str(f) for f in folders])):
+        if probed['exists']:
+            return str(folder / "data" / "exports" / "dashboard.csv")
+    return str(Path.home() / "data" / "exports" / "dashboard.csv")
+
+
+def discover(timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    全候補を確認してダッシュボードファイルを選択する
+
+    Args:
+        timeout: 確認全体のタイムアウト（秒）
+
+    Returns:
+        選択したパス・発見フラグ・全候補の確認結果を含む辞書
+    """
+    global _cached_result
+
+    start_time = time.time()
+    paths = candidate_paths()
+    candidates = probe_candidates(paths, timeout)
+
+    found = next((c for c in candidates if c['exists']), None)
+
+    # 選択中のファイルが応答しないだけであれば、優先度の低い候補に切り替えない
+    with _cache_lock:
+        previous = _cached_result
+    if previous is not None and previous['found'] and previous['candidate_paths'] == paths:
+        selected = candidates[previous['priority']]
+        if selected['timed_out'] and (found is None or found['priority'] > selected['priority']):
+            logger.warning(f"選択中のデータファイルが応答しないため選択を維持します: {selected['path']}")
+            found = selected
+    if found:
+        result = {'path': found['path'], 'found': True, 'priority': found['priority']}
+        logger.info(f"データファイルを発見: {found['path']}")
+    else:
+        result = {'path': _fallback_path(), 'found': False, 'priority': len(paths)}
+        logger.warning(f"データファイルが見つかりません。フォールバックパス: {result['path']}")
+
+    timed_out = [c['path'] for c in candidates if c['timed_out']]
+    if timed_out:
+        logger.warning(f"応答のない候補パスがありました: {timed_out}")
+
+    result.update({
+        'candidates': candidates,
+        'candidate_paths': paths,
+        'discovered_at': time.time(),
+        'validated_at': time.time(),
+        'elapsed': time.time() - start_time,
+    })
+
+    with _cache_lock:
+        _cached_result = result
+    return result
+
+
+def _is_cache_valid(cached: Dict[str, Any], timeout: Optional[float]) -> bool:
+    """キャッシュした探索結果が有効かどうかを確認する"""
+    # 候補一覧が変わった（APP_PATH の変更など）
+    paths = candidate_paths()
+    if paths != cached['candidate_paths']:
+        return False
+
+    # 選択したファイルと、それより優先度の高い候補のみを確認する
+    check_count = min(cached['priority'] + 1, len(paths))
+    probed = probe_candidates(paths[:check_count], timeout)
+
+    # タイムアウトした候補（exists=None）は判定に使わない
+    for candidate in probed:
+        if candidate['priority'] < cached['priority'] and candidate['exists']:
+            logger.info(f"優先度の高いデータファイルが見つかりました: {candidate['path']}")
+            return False
+        if candidate['priority'] == cached['priority'] and cached['found'] and candidate['exists'] is False:
+            logger.info(f"選択中のデータファイルが見つかりません: {candidate['path']}")
+            return False
+    return True
+
+
+def get_discovery(timeout: Optional[float] = None, refresh: bool = False) -> Dict[str, Any]:
+    """
+    キャッシュを考慮してダッシュボードファイルの探索結果を返す
+
+    Args:
+        timeout: 確認全体のタイムアウト（秒）
+        refresh: キャッシュを使わずに再探索するかどうか
+
+    Returns:
+        探索結果
+    """
+    with _cache_lock:
+        cached = _cached_result
+
+    if cached is None or refresh:
+        return discover(timeout)
+
+    revalidate_seconds = float(
+        os.environ.get('DISCOVERY_REVALIDATE_SECONDS', DEFAULT_REVALIDATE_SECONDS)
+    )
+    if time.time() - cached['validated_at'] < revalidate_seconds:
+        return cached
+
+    if not _is_cache_valid(cached, timeout):
+        return discover(timeout)
+
+    cached['validated_at'] = time.time()
+    return cached
+
+
+def invalidate() -> None:
+    """探索結果のキャッシュを破棄する"""
+    global _cached_result
+    with _cache_lock:
+        _cached_result = None
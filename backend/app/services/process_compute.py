@@ -0,0 +1,363 @@
+"""
+プロセスプールでの計算（任意）
+- 大きなデータセットの進捗計算・マイルストーン抽出・CSVパースを別プロセスで実行し、
+  Python レベルの処理が GIL で直列化されてバックエンド全体が待たされるのを避ける
+- データフレームは列バッファを multiprocessing.shared_memory に書き出して受け渡す（フレーム全体を pickle しない）
+  - 数値・日時・真偽値の列はバッファをそのまま共有する
+  - 文字列などのオブジェクト列は整数コード（共有メモリ）と値の辞書（ユニーク値のみ pickle）に分解する
+- COMPUTE_USE_PROCESSES=1 の場合のみ有効。行数が COMPUTE_PROCESS_MIN_ROWS 未満の入力は
+  呼び出し元のスレッドでそのまま実行する
+"""
+
+import functools
+import importlib
+import inspect
+import io
+import logging
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .async_loader import import_numpy, import_pandas
+
+# ロガー設定
+logger = logging.getLogger("api.process_compute")
+
+# プロセスで実行する最小行数の既定値
+DEFAULT_MIN_ROWS = 200000
+
+# プロセスプール（遅延作成）
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+# ワーカーが結果のブロックを保持する最大時間（秒）。親プロセスの複製完了の通知がない場合に備える
+RESULT_HOLD_TIMEOUT = 60.0
+
+# 複製完了の通知を確認する間隔（秒）
+_ACK_POLL_INTERVAL = 0.005
+
+# プロセスプール自体の障害（関数内の例外はそのまま呼び出し元に送出する）
+_POOL_ERRORS = (BrokenProcessPool, OSError, pickle.PicklingError)
+
+# 統計
+_stats = {'process_runs': 0, 'thread_runs': 0, 'fallbacks': 0}
+
+
+def processes_enabled() -> bool:
+    """プロセスプールでの計算が有効かどうか"""
+    return os.environ.get('COMPUTE_USE_PROCESSES', '0') == '1'
+
+
+def min_rows() -> int:
+    """プロセスで実行する最小行数"""
+    return int(os.environ.get('COMPUTE_PROCESS_MIN_ROWS', DEFAULT_MIN_ROWS))
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """計算用のプロセスプールを取得する（無効化されている場合は None）"""
+    global _process_pool
+
+    if not processes_enabled():
+        return None
+
+    with _process_pool_lock:
+        if _process_pool is None:
+            import multiprocessing
+            workers = int(os.environ.get('COMPUTE_PROCESS_WORKERS', min(4, os.cpu_count() or 1)))
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max(1, workers),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"計算用プロセスプールを作成しました (workers={workers})")
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """プロセスプールを終了する"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def get_stats() -> Dict[str, Any]:
+    """プロセス・スレッドでの実行回数"""
+    return {**_stats, 'enabled': processes_enabled(), 'min_rows': min_rows()}
+
+
+# --- 共有メモリでのデータフレームの受け渡し ---
+
+def _create_block(nbytes: int):
+    """共有メモリブロックを作成する"""
+    from multiprocessing import shared_memory
+    return shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+
+
+def _attach_block(name: str):
+    """
+    既存の共有メモリブロックに接続する
+
+    spawn で起動したワーカーは親プロセスとリソーストラッカーを共有するため、
+    どちらで作成したブロックも親プロセスの unlink() で登録が解除される。
+    """
+    from multiprocessing import shared_memory
+    return shared_memory.SharedMemory(name=name)
+
+
+def release_blocks(blocks: List[Any], unlink: bool = False) -> None:
+    """共有メモリブロックを閉じる（unlink=True の場合は削除も行う）"""
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            # 参照中のビューが残っている場合はガベージコレクションに任せる
+            pass
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _share_array(array, blocks: List[Any]) -> Dict[str, Any]:
+    """numpy 配列を共有メモリに書き出す"""
+    np = import_numpy()
+    array = np.ascontiguousarray(array)
+    shm = _create_block(array.nbytes)
+    blocks.append(shm)
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    del view
+    return {'shm': shm.name, 'dtype': array.dtype.str, 'shape': array.shape}
+
+
+def _array_from(desc: Dict[str, Any], blocks: List[Any], copy: bool):
+    """共有メモリから numpy 配列を取り出す"""
+    np = import_numpy()
+    shm = _attach_block(desc['shm'])
+    blocks.append(shm)
+    array = np.ndarray(tuple(desc['shape']), dtype=np.dtype(desc['dtype']), buffer=shm.buf)
+    return array.copy() if copy else array
+
+
+def share_frame(df) -> Tuple[Dict[str, Any], List[Any]]:
+    """
+    データフレームの列を共有メモリに書き出す
+
+    Args:
+        df: データフレーム（インデックスは受け渡さない）
+
+    Returns:
+        (列の記述, 作成した共有メモリブロック) のタプル
+        ブロックは呼び出し側が release_blocks(blocks, unlink=True) で削除する
+    """
+    pd = import_pandas()
+    np = import_numpy()
+    blocks: List[Any] = []
+    columns = []
+    try:
+        for name in df.columns:
+            series = df[name]
+            if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufcmM':
+                columns.append({'name': name, 'kind': 'buffer', **_share_array(series.to_numpy(), blocks)})
+                continue
+
+            # オブジェクト列は整数コードとユニーク値に分解する（欠損は -1）
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            code_dtype = np.int32 if len(uniques) < 2 ** 31 else np.int64
+            columns.append({
+                'name': name, 'kind': 'codes', 'pandas_dtype': str(series.dtype),
+                'values': list(uniques), **_share_array(codes.astype(code_dtype), blocks)
+            })
+    except Exception:
+        release_blocks(blocks, unlink=True)
+        raise
+    return {'rows': len(df), 'columns': columns}, blocks
+
+
+def attach_frame(spec: Dict[str, Any], copy: bool = False):
+    """
+    共有メモリからデータフレームを復元する
+
+    Args:
+        spec: share_frame() が返した列の記述
+        copy: True の場合は共有メモリから複製する（ブロックを閉じた後もフレームを使う場合）
+
+    Returns:
+        (データフレーム, 接続した共有メモリブロック) のタプル
+    """
+    pd = import_pandas()
+    np = import_numpy()
+    blocks: List[Any] = []
+    data = {}
+    for column in spec['columns']:
+        array = _array_from(column, blocks, copy)
+        if column['kind'] == 'buffer':
+            data[column['name']] = array
+            continue
+        lookup = np.empty(len(column['values']) + 1, dtype=object)
+        lookup[:-1] = column['values']
+        lookup[-1] = None
+        values = pd.Series(lookup[array])
+        try:
+            values = values.astype(column['pandas_dtype'])
+        except (TypeError, ValueError):
+            pass
+        data[column['name']] = values
+    df = pd.DataFrame(data, index=pd.RangeIndex(spec['rows']), columns=[c['name'] for c in spec['columns']])
+    return df, blocks
+
+
+# --- ワーカープロセスで実行する関数 ---
+
+def _resolve(target: str) -> Callable:
+    """'モジュール:関数名' からデコレータを外した元の関数を取得する"""
+    module_name, _, qualname = target.partition(':')
+    func = importlib.import_module(module_name)
+    for part in qualname.split('.'):
+        func = getattr(func, part)
+    return inspect.unwrap(func)
+
+
+def _compute_in_worker(target: str, spec: Dict[str, Any], args: Tuple, kwargs: Dict[str, Any]):
+    """共有メモリのフレームに対して関数を実行する（ワーカープロセス）"""
+    df, blocks = attach_frame(spec)
+    try:
+        return _resolve(target)(df, *args, **kwargs)
+    finally:
+        del df
+        release_blocks(blocks)
+
+
+def _hold_until_copied(blocks: List[Any], ack) -> None:
+    """親プロセスが結果を複製するまで共有メモリブロックを開いたままにする（ワーカープロセスのスレッド）"""
+    deadline = time.monotonic() + RESULT_HOLD_TIMEOUT
+    try:
+        while ack.buf[0] == 0 and time.monotonic() < deadline:
+            time.sleep(_ACK_POLL_INTERVAL)
+    finally:
+        release_blocks(blocks)
+        release_blocks([ack])
+
+
+def _parse_csv_in_worker(raw_desc: Dict[str, Any], encoding: str, usecols, ack_name: str) -> Dict[str, Any]:
+    """共有メモリのCSV生データをパースし、結果を共有メモリに書き出す（ワーカープロセス）"""
+    pd = import_pandas()
+    raw_blocks: List[Any] = []
+    raw = _array_from(raw_desc, raw_blocks, copy=False)
+    try:
+        df = pd.read_csv(io.BytesIO(raw.data), encoding=encoding, usecols=usecols)
+    finally:
+        del raw
+        release_blocks(raw_blocks)
+
+    # Windows では最後のハンドルを閉じた時点でブロックが破棄されるため、
+    # 親プロセスが複製して ack ブロックに書き込むまで結果のブロックを開いたままにする（削除は親プロセスが行う）
+    ack = _attach_block(ack_name)
+    try:
+        spec, blocks = share_frame(df)
+    except Exception:
+        release_blocks([ack])
+        raise
+    threading.Thread(
+        target=_hold_until_copied, args=(blocks, ack), name="shared-result-holder", daemon=True
+    ).start()
+    return spec
+
+
+# --- 呼び出し側 ---
+
+def _should_use_process(rows: int) -> Optional[ProcessPoolExecutor]:
+    """入力の行数からプロセスで実行するかどうかを判断し、使用するプールを返す"""
+    if rows < min_rows():
+        return None
+    return _get_process_pool()
+
+
+def _on_process_failure(what: str, error: Exception) -> None:
+    """プロセスプールが使えない場合（凍結バイナリの制約など）はプールを破棄してスレッドで実行する"""
+    _stats['fallbacks'] += 1
+    logger.warning(f"{what} のプロセス実行に失敗したためスレッドで実行します: {error}")
+    shutdown_process_pool()
+
+
+def offload_to_process(func: Callable) -> Callable:
+    """
+    データフレームを第1引数に取る関数を、行数が閾値以上であればプロセスプールで実行するデコレータ
+
+    フレームは共有メモリで受け渡し、ワーカーではデコレータを外した元の関数を呼び出す。
+    結果は pickle で返すため、集計結果など入力より十分小さいものを返す関数に使用する。
+    """
+    target = f"{func.__module__}:{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(df, *args, **kwargs):
+        pool = _should_use_process(len(df)) if df is not None else None
+        if pool is None:
+            _stats['thread_runs'] += 1
+            return func(df, *args, **kwargs)
+
+        spec, blocks = share_frame(df)
+        try:
+            result = pool.submit(_compute_in_worker, target, spec, args, kwargs).result()
+            _stats['process_runs'] += 1
+            return result
+        except _POOL_ERRORS as e:
+            _on_process_failure(func.__name__, e)
+        finally:
+            release_blocks(blocks, unlink=True)
+
+        _stats['thread_runs'] += 1
+        return func(df, *args, **kwargs)
+
+    return wrapper
+
+
+def read_csv_bytes(raw_data: bytes, encoding: str, usecols=None):
+    """
+    CSVの生データをパースする（行数が閾値以上であればプロセスプールで実行）
+
+    パースエラーはスレッドで実行した場合と同じく呼び出し元に送出する。
+
+    Args:
+        raw_data: CSVの生データ
+        encoding: エンコーディング
+        usecols: 読み込む列の一覧（None の場合は全列。プロセスに渡すため関数は指定できない）
+
+    Returns:
+        パース済みのデータフレーム
+    """
+    pd = import_pandas()
+    np = import_numpy()
+
+    pool = _should_use_process(raw_data.count(b'\n')) if processes_enabled() else None
+    if pool is None:
+        return pd.read_csv(io.BytesIO(raw_data), encoding=encoding, usecols=usecols)
+
+    raw_blocks: List[Any] = []
+    result_blocks: List[Any] = []
+    ack = None
+    try:
+        raw_desc = _share_array(np.frombuffer(raw_data, dtype=np.uint8), raw_blocks)
+        ack = _create_block(1)
+        ack.buf[0] = 0
+        spec = pool.submit(_parse_csv_in_worker, raw_desc, encoding, usecols, ack.name).result()
+        df, result_blocks = attach_frame(spec, copy=True)
+        _stats['process_runs'] += 1
+        return df
+    except _POOL_ERRORS as e:
+        _on_process_failure('CSVパース', e)
+    finally:
+        release_blocks(raw_blocks, unlink=True)
+        release_blocks(result_blocks, unlink=True)
+        if ack is not None:
+            # 複製が終わった（または失敗した）ことをワーカーに通知し、結果のブロックを閉じさせる
+            ack.buf[0] = 1
+            release_blocks([ack], unlink=True)
+
+    return pd.read_csv(io.BytesIO(raw_data), encoding=encoding, usecols=usecols)
@@ -0,0 +1,277 @@
+"""
+リクエスト単位のプロファイリング（オンデマンド）
+- PROFILING_ENABLED=1 の場合のみ、X-Profile: 1 ヘッダーを付けたリクエストをプロファイルする
+  （パッケージ済みのバイナリに外部のプロファイラを接続せずに本番環境の問題を調査するため）
+- イベントループのスレッド（非同期ハンドラー）と I/O・CPU プールのスレッドでの処理を cProfile で計測し、
+  1つの pstats にまとめる。あわせて一定間隔でスタックを採取し、フレームグラフ用の collapsed 形式を作成する
+- 結果は ID 付きで保持し、/api/system/profiles/{id} から pstats・テキスト・collapsed 形式で取得できる
+- cProfile はスレッドごとに1つしか有効にできないため、同時にプロファイルするリクエストは1件のみ
+  （イベントループのスレッドの計測には同時に処理中の他のリクエストも含まれる）
+- プロセスプールで実行した計算はプロファイルに含まれない
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+# ロガー設定
+logger = logging.getLogger("api.profiling")
+
+# プロファイルを要求するリクエストヘッダー
+PROFILE_HEADER = "x-profile"
+
+# 既定の保持件数・スタックの採取間隔（ミリ秒）
+DEFAULT_PROFILE_BUFFER_SIZE = 20
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+
+# 採取するスタックの最大の深さ
+MAX_STACK_DEPTH = 64
+
+# イベントループの待機中（処理がない状態）とみなすモジュール
+_IDLE_MODULES = ('selectors.py',)
+
+
+def profiling_enabled() -> bool:
+    """X-Profile ヘッダーによるプロファイリングを受け付けるかどうか"""
+    return os.environ.get('PROFILING_ENABLED', '0') == '1'
+
+
+def profile_requested(headers) -> bool:
+    """リクエストヘッダーでプロファイルが要求されているかどうか"""
+    return headers.get(PROFILE_HEADER, "").strip().lower() in ("1", "true", "yes")
+
+
+def _frame_label(frame) -> str:
+    """collapsed 形式のフレーム名（関数名 (ファイル名:行)）"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """1件のリクエストのプロファイル"""
+
+    def __init__(self, method: str, path: str, query: str = ""):
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stats: Optional[pstats.Stats] = None
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.executor_tasks = 0
+        self._lock = threading.Lock()
+        self._active_threads: Set[int] = set()
+        self._loop_thread: Optional[int] = None
+        self._loop_profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- 計測 ---
+
+    def _add_stats(self, profile: cProfile.Profile) -> None:
+        """スレッドごとの計測結果をまとめる"""
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def start(self, interval: float) -> None:
+        """イベントループのスレッドでの計測とスタックの採取を開始する（イベントループ上で呼び出す）"""
+        self._loop_thread = threading.get_ident()
+        self._loop_profile = cProfile.Profile()
+        self._loop_profile.enable()
+        self._sampler = threading.Thread(
+            target=self._sample, args=(interval,), name="profile-sampler", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self, status: Optional[int]) -> None:
+        """計測を終了する（start() と同じスレッドで呼び出す）"""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1.0)
+        if self._loop_profile is not None:
+            self._loop_profile.disable()
+            self._add_stats(self._loop_profile)
+            self._loop_profile = None
+        self.status = status
+        self.duration = time.time() - self.started_at
+
+    def run_in_thread(self, func: Callable, *args, **kwargs) -> Any:
+        """プールのスレッドで処理を計測しながら実行する"""
+        ident = threading.get_ident()
+        if ident == self._loop_thread or self.duration is not None:
+            # 終了後（保持済み）のプロファイルには計測結果を追加しない
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        with self._lock:
+            self._active_threads.add(ident)
+            self.executor_tasks += 1
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._active_threads.discard(ident)
+            self._add_stats(profile)
+
+    def _sample(self, interval: float) -> None:
+        """イベントループと処理中のプールのスレッドのスタックを採取する（採取スレッド）"""
+        names = {}
+        while not self._stop.wait(interval):
+            with self._lock:
+                idents = set(self._active_threads)
+            idents.add(self._loop_thread)
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if ident == self._loop_thread and os.path.basename(frame.f_code.co_filename) in _IDLE_MODULES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if ident not in names:
+                    names[ident] = next(
+                        (t.name for t in threading.enumerate() if t.ident == ident), str(ident)
+                    )
+                stack.append(names[ident])
+                self.samples[";".join(reversed(stack))] += 1
+                self.sample_count += 1
+            del frames
+
+    # --- 出力 ---
+
+    def summary(self) -> Dict[str, Any]:
+        """プロファイルの概要"""
+        return {
+            'profile_id': self.profile_id,
+            'method': self.method,
+            'path': self.path,
+            'query': self.query,
+            'status': self.status,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'executor_tasks': self.executor_tasks,
+            'samples': self.sample_count,
+        }
+
+    def to_pstats(self) -> bytes:
+        """pstats.Stats / snakeviz で読み込める形式（marshal）"""
+        if self.stats is None:
+            return marshal.dumps({})
+        return marshal.dumps(self.stats.stats)
+
+    def to_text(self, sort: str = 'cumulative', limit: int = 50) -> str:
+        """print_stats() の出力"""
+        if self.stats is None:
+            return ""
+        output = io.StringIO()
+        stats = pstats.Stats(stream=output)
+        with self._lock:
+            stats.add(self.stats)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def to_collapsed(self) -> str:
+        """フレームグラフ用の collapsed 形式（"スレッド;呼び出し元;...;関数 件数"）"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+# 現在のリクエストのプロファイル
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    'request_profile', default=None
+)
+
+# 同時にプロファイルできるのは1件のみ
+_profiling_lock = threading.Lock()
+
+# 保持しているプロファイル（古いものから破棄）
+_profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """現在のリクエストのプロファイル（プロファイルしていない場合は None）"""
+    return _current_profile.get()
+
+
+@contextlib.contextmanager
+def detached_profile() -> Iterator[None]:
+    """現在のプロファイルを外して処理を実行する（先読みなどリクエスト外の処理はプロファイルに含めない）"""
+    token = _current_profile.set(None)
+    try:
+        yield
+    finally:
+        _current_profile.reset(token)
+
+
+@contextlib.contextmanager
+def profile_scope(method: str, path: str, query: str = "") -> Iterator[Optional[RequestProfile]]:
+    """
+    リクエストをプロファイルする（イベントループ上で使用する）
+
+    他のリクエストをプロファイル中の場合は何もせずに None を返す。
+
+    Yields:
+        プロファイル（終了後に stop() と保持を行う）
+    """
+    if not _profiling_lock.acquire(blocking=False):
+        yield None
+        return
+
+    profile = RequestProfile(method, path, query)
+    interval = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', DEFAULT_SAMPLE_INTERVAL_MS)) / 1000
+    token = _current_profile.set(profile)
+    try:
+        profile.start(interval)
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        try:
+            profile.stop(profile.status if profile.status is not None else 500)
+            _store(profile)
+        finally:
+            _profiling_lock.release()
+        logger.info(
+            f"リクエストをプロファイルしました: {method} {path} "
+            f"(id={profile.profile_id}, {profile.duration * 1000:.0f}ms, samples={profile.sample_count})"
+        )
+
+
+def _store(profile: RequestProfile) -> None:
+    """プロファイルを保持する（PROFILE_BUFFER_SIZE を超えた分は古いものから破棄）"""
+    limit = int(os.environ.get('PROFILE_BUFFER_SIZE', DEFAULT_PROFILE_BUFFER_SIZE))
+    with _profiles_lock:
+        _profiles[profile.profile_id] = profile
+        while len(_profiles) > max(1, limit):
+            _profiles.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional[RequestProfile]:
+    """保持しているプロファイルを取得する"""
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def list_profiles() -> list:
+    """保持しているプロファイルの概要（新しい順）"""
+    with _profiles_lock:
+        profiles = list(_profiles.values())
+    return [profile.summary() for profile in reversed(profiles)]
@@ -0,0 +1,279 @@
+"""
+プロジェクト一覧のインデックス
+- スナップショットごとにプロジェクト一覧から絞り込み・並べ替え用の配列を事前に作成する
+- 絞り込みは値ごとの位置配列（転置インデックス）と数値配列の比較のみで評価する
+- ページングはスナップショットバージョンに紐づくカーソルで行う
+"""
+
+import base64
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .async_loader import import_numpy
+
+# ロガー設定
+logger = logging.getLogger("api.project_index")
+
+# 値の一致で絞り込む属性（カンマ区切りで複数指定可）
+FILTER_FIELDS = ['status', 'process', 'line', 'division', 'factory']
+
+# 並べ替えに使用できるフィールド
+SORT_FIELDS = [
+    'project_id', 'project_name', 'process', 'line', 'progress', 'start_date', 'end_date',
+    'duration', 'total_tasks', 'completed_tasks', 'milestone_count', 'has_delay'
+]
+
+# 一覧モデルに含まれず、スナップショットの organization グループから取得する属性
+ATTRIBUTE_FIELDS = ['status', 'division', 'factory']
+
+# ページサイズの上限
+MAX_PAGE_SIZE = 500
+
+
+class CursorError(ValueError):
+    """カーソルが不正な場合のエラー"""
+
+
+class StaleCursorError(CursorError):
+    """カーソル作成後にスナップショットが差し替えられた場合のエラー"""
+
+
+class ProjectQuery:
+    """プロジェクト一覧の絞り込み・並べ替え・ページング条件"""
+
+    def __init__(self, filters: Optional[Dict[str, List[str]]] = None,
+                 has_delay: Optional[bool] = None,
+                 progress_min: Optional[float] = None, progress_max: Optional[float] = None,
+                 sort: Optional[str] = None, descending: bool = False,
+                 limit: Optional[int] = None, cursor: Optional[str] = None):
+        """
+        Args:
+            filters: 属性名 → 許可する値の一覧
+            has_delay: 遅延の有無
+            progress_min: 進捗率の下限（含む）
+            progress_max: 進捗率の上限（含む）
+            sort: 並べ替えフィールド
+            descending: 降順にするかどうか
+            limit: ページサイズ（指定時はページング）
+            cursor: 前のページで返されたカーソル
+        """
+        self.filters = {k: v for k, v in (filters or {}).items() if v}
+        self.has_delay = has_delay
+        self.progress_min = progress_min
+        self.progress_max = progress_max
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.cursor = cursor
+
+        if sort is not None and sort not in SORT_FIELDS:
+            raise ValueError(f"並べ替えできないフィールドです: {sort} (使用可能: {', '.join(SORT_FIELDS)})")
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit は 1〜{MAX_PAGE_SIZE} の範囲で指定してください: {limit}")
+
+    @classmethod
+    def from_params(cls, status: Optional[str] = None, process: Optional[str] = None,
+                    line: Optional[str] = None, division: Optional[str] = None,
+                    factory: Optional[str] = None, **kwargs) -> 'ProjectQuery':
+        """カンマ区切りのクエリパラメータから条件を作成する"""
+        raw = {'status': status, 'process': process, 'line': line, 'division': division, 'factory': factory}
+        filters = {
+            field: [v.strip() for v in value.split(',') if v.strip()]
+            for field, value in raw.items() if value
+        }
+        return cls(filters=filters, **kwargs)
+
+    @property
+    def is_empty(self) -> bool:
+        """条件が何も指定されていないかどうか"""
+        return (
+            not self.filters and self.has_delay is None
+            and self.progress_min is None and self.progress_max is None
+            and self.sort is None and self.limit is None and self.cursor is None
+        )
+
+    @property
+    def is_paged(self) -> bool:
+        """ページングするかどうか"""
+        return self.limit is not None or self.cursor is not None
+
+    def fingerprint(self) -> str:
+        """ページングに影響する条件（カーソル・ページサイズ以外）のハッシュ"""
+        source = json.dumps([
+            sorted((k, sorted(v)) for k, v in self.filters.items()),
+            self.has_delay, self.progress_min, self.progress_max, self.sort, self.descending
+        ], ensure_ascii=False)
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+
+
+def encode_cursor(version: int, offset: int, query: ProjectQuery) -> str:
+    """カーソルを作成する"""
+    payload = json.dumps({'v': version, 'o': offset, 'q': query.fingerprint()}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, version: int, query: ProjectQuery) -> int:
+    """
+    カーソルを検証してオフセットを返す
+
+    Raises:
+        CursorError: カーソルが不正、または条件が変わっている場合
+        StaleCursorError: カーソル作成後にスナップショットが差し替えられた場合
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        cursor_version, offset, fingerprint = int(payload['v']), int(payload['o']), payload['q']
+    except Exception:
+        raise CursorError(f"カーソルが不正です: {cursor}")
+    if fingerprint != query.fingerprint():
+        raise CursorError("カーソル作成時と絞り込み・並べ替え条件が異なります")
+    if cursor_version != version:
+        raise StaleCursorError(
+            f"カーソル作成後にデータが更新されました (cursor={cursor_version}, current={version})"
+        )
+    return max(0, offset)
+
+
+def project_attributes(snapshot) -> Dict[str, Dict[str, str]]:
+    """
+    プロジェクトごとの属性（status / division / factory）を取得する
+
+    インデックス作成時にスナップショットごとに1度だけ呼び出す。
+
+    Args:
+        snapshot: データセットスナップショット
+
+    Returns:
+        プロジェクトID → 属性名 → 値（プロジェクト内の最初の行の値）
+    """
+    if snapshot.is_error or snapshot.row_count == 0:
+        return {}
+
+    df = snapshot.frame(ATTRIBUTE_FIELDS)
+    columns = [col for col in ATTRIBUTE_FIELDS if col in df.columns]
+    if 'project_id' not in df.columns or not columns:
+        return {}
+
+    first_rows = df[columns].fillna('').astype(str).groupby(df['project_id'].astype(str).values).first()
+    return first_rows.to_dict(orient='index')
+
+
+class ProjectIndex:
+    """
+    スナップショットごとのプロジェクト一覧インデックス
+
+    プロジェクト一覧（Pydanticモデル）と属性の位置配列・数値配列・並べ替え順序を保持する。
+    """
+
+    def __init__(self, projects: List[Any], attributes: Dict[str, Dict[str, str]], version: int):
+        """
+        Args:
+            projects: プロジェクト一覧（load_projects の結果）
+            attributes: プロジェクトID → 一覧に含まれない属性（division / factory / status）
+            version: 作成元のスナップショットバージョン
+        """
+        np = import_numpy()
+        self.projects = projects
+        self.version = version
+        count = len(projects)
+
+        self.progress = np.array([p.progress for p in projects], dtype=float)
+        self.has_delay = np.array([p.has_delay for p in projects], dtype=bool)
+
+        # 属性値 → 位置配列（転置インデックス）
+        self.postings: Dict[str, Dict[str, Any]] = {}
+        for field in FILTER_FIELDS:
+            values: Dict[str, List[int]] = {}
+            for position, project in enumerate(projects):
+                value = getattr(project, field, None)
+                if value is None:
+                    value = attributes.get(project.project_id, {}).get(field, '')
+                values.setdefault(str(value), []).append(position)
+            self.postings[field] = {value: np.array(positions, dtype=np.int64) for value, positions in values.items()}
+
+        # フィールドごとの昇順の並び（安定ソート）
+        self.orders: Dict[str, Any] = {}
+        for field in SORT_FIELDS:
+            keys = [self._sort_key(getattr(p, field)) for p in projects]
+            self.orders[field] = np.array(
+                sorted(range(count), key=keys.__getitem__), dtype=np.int64
+            )
+        self.natural_order = np.arange(count, dtype=np.int64)
+
+    @staticmethod
+    def _sort_key(value) -> Tuple:
+        """None を末尾に、数値を含むIDは数値順に並べるためのキー"""
+        if value is None:
+            return (2, '')
+        if isinstance(value, str) and value.isdigit():
+            return (0, int(value), value)
+        return (1, value) if isinstance(value, str) else (0, value)
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    def __sizeof__(self) -> int:
+        total = self.progress.nbytes + self.has_delay.nbytes + self.natural_order.nbytes
+        total += sum(order.nbytes for order in self.orders.values())
+        total += sum(a.nbytes for values in self.postings.values() for a in values.values())
+        # プロジェクトモデル自体は1件あたり約1KBとして見積もる
+        return total + len(self.projects) * 1024
+
+    def select(self, query: ProjectQuery):
+        """
+        条件に一致するプロジェクトの位置を並べ替え済みで返す
+
+        Args:
+            query: 絞り込み・並べ替え条件
+
+        Returns:
+            プロジェクト一覧内の位置配列
+        """
+        np = import_numpy()
+        mask = np.ones(len(self.projects), dtype=bool)
+
+        for field, values in query.filters.items():
+            field_mask = np.zeros(len(self.projects), dtype=bool)
+            for value in values:
+                positions = self.postings.get(field, {}).get(value)
+                if positions is not None:
+                    field_mask[positions] = True
+            mask &= field_mask
+
+        if query.has_delay is not None:
+            mask &= self.has_delay == query.has_delay
+        if query.progress_min is not None:
+            mask &= self.progress >= query.progress_min
+        if query.progress_max is not None:
+            mask &= self.progress <= query.progress_max
+
+        order = self.orders[query.sort] if query.sort else self.natural_order
+        if query.descending:
+            order = order[::-1]
+        return order[mask[order]]
+
+    def page(self, query: ProjectQuery) -> Dict[str, Any]:
+        """
+        条件に一致するプロジェクトの1ページ分を返す
+
+        Returns:
+            items / total / next_cursor を含む辞書（ページングしない場合は全件）
+        """
+        positions = self.select(query)
+        total = len(positions)
+
+        if not query.is_paged:
+            return {'items': [self.projects[i] for i in positions], 'total': total, 'next_cursor': None}
+
+        offset = decode_cursor(query.cursor, self.version, query) if query.cursor else 0
+        limit = query.limit or MAX_PAGE_SIZE
+        window = positions[offset:offset + limit]
+        next_offset = offset + len(window)
+        return {
+            'items': [self.projects[i] for i in window],
+            'total': total,
+            'next_cursor': encode_cursor(self.version, next_offset, query) if next_offset < total else None,
+        }
@@ -0,0 +1,79 @@
+"""
+登録済みルートの一覧とパスからのルートの特定
+- include_router で登録したルートを展開し、(パスのテンプレート, メソッド, エンドポイント) を列挙する
+  （FastAPI のバージョンにより、登録したルーターがルート単位に展開されない場合がある）
+- メトリクスなどのラベルに使うため、リクエストのパスからルートのテンプレートを求める
+"""
+
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from starlette.routing import compile_path
+
+# ルートに一致しなかったリクエストのテンプレート（パスごとに系列が増えないようにまとめる）
+UNMATCHED_ROUTE = "unmatched"
+
+# パスからテンプレートへの対応のキャッシュの上限（超えた場合は作り直す）
+ROUTE_CACHE_SIZE = 2048
+
+
+def iter_routes(routes: Iterable[Any]) -> Iterator[Tuple[str, FrozenSet[str], Optional[Callable]]]:
+    """
+    ルートを展開して列挙する
+
+    Args:
+        routes: app.routes
+
+    Yields:
+        (パスのテンプレート, メソッド, エンドポイント) のタプル
+    """
+    for route in routes:
+        contexts = getattr(route, 'effective_route_contexts', None)
+        if callable(contexts):
+            # 展開されていないルーター（FastAPI の include_router）
+            for context in contexts():
+                original = getattr(context, 'original_route', None)
+                methods = getattr(original, 'methods', None) or ()
+                yield context.path, frozenset(methods), context.endpoint
+            continue
+
+        path = getattr(route, 'path', None)
+        if path is not None:
+            yield path, frozenset(getattr(route, 'methods', None) or ()), getattr(route, 'endpoint', None)
+
+
+class RouteTable:
+    """リクエストのメソッドとパスからルートのテンプレートを求める"""
+
+    def __init__(self, routes: Iterable[Any]):
+        self._patterns: List[Tuple[Pattern, FrozenSet[str], str]] = []
+        for path, methods, _ in iter_routes(routes):
+            regex, _, _ = compile_path(path)
+            self._patterns.append((regex, methods, path))
+        self._cache: Dict[Tuple[str, str], str] = {}
+
+    def resolve(self, method: str, path: str) -> str:
+        """
+        ルートのテンプレートを求める（メソッドのみ一致しない場合もそのルート）
+
+        Returns:
+            パスのテンプレート（一致しない場合は UNMATCHED_ROUTE）
+        """
+        key = (method, path)
+        route = self._cache.get(key)
+        if route is not None:
+            return route
+
+        route = UNMATCHED_ROUTE
+        for regex, methods, template in self._patterns:
+            if regex.match(path) is None:
+                continue
+            if not methods or method in methods or (method == 'HEAD' and 'GET' in methods):
+                route = template
+                break
+            if route == UNMATCHED_ROUTE:
+                route = template
+
+        if len(self._cache) >= ROUTE_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = route
+        return route
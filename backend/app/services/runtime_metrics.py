@@ -0,0 +1,251 @@
+"""
+プロセス内のランタイムメトリクス
+- ルートごとの処理時間のヒストグラム（固定バケット）・リクエスト数・エラー数・処理中のリクエスト数
+- キャッシュ（データセット・派生キャッシュ・レスポンスキャッシュ）のヒット・ミス数
+- データセットのロード回数と所要時間
+- JSON と Prometheus のテキスト形式で出力する
+
+記録はカウンターの加算とバケットの二分探索のみで、常時有効にしても負荷にならないようにしている。
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 処理時間のバケット（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# データセットのロード時間のバケット（秒）
+RELOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def runtime_metrics_enabled() -> bool:
+    """ランタイムメトリクスの記録が有効かどうか"""
+    return os.environ.get('RUNTIME_METRICS_ENABLED', '1') != '0'
+
+
+class Histogram:
+    """固定バケットのヒストグラム（呼び出し側でロックする）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(上限, 累積件数) の一覧（最後は +Inf）"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append(('+Inf' if bound == float('inf') else f"{bound:g}", total))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """バケットの上限から求めた分位点の目安（+Inf に入った場合は最大のバケット）"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= target:
+                return bound
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50 = self.quantile(0.5)
+        p99 = self.quantile(0.99)
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.sum, 6),
+            'avg_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms_le': p50 * 1000 if p50 is not None else None,
+            'p99_ms_le': p99 * 1000 if p99 is not None else None,
+            'buckets': dict(self.cumulative()),
+        }
+
+
+class RouteStats:
+    """ルートごとの処理時間・ステータス別のリクエスト数"""
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+
+
+class RuntimeMetrics:
+    """ランタイムメトリクスの集計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.inflight: Dict[Tuple[str, str], int] = {}
+        self.caches: Dict[Tuple[str, str], int] = {}
+        self.reloads: Dict[str, Histogram] = {}
+
+    # --- 記録 ---
+
+    def request_started(self, method: str, route: str) -> None:
+        key = (method, route)
+        with self._lock:
+            self.inflight[key] = self.inflight.get(key, 0) + 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route)
+        with self._lock:
+            self.inflight[key] = self.inflight.get(key, 1) - 1
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.latency.observe(seconds)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status >= 500:
+                stats.errors += 1
+
+    def record_cache(self, cache: str, result: str) -> None:
+        """キャッシュの結果（hit / miss / not_modified）を記録する"""
+        key = (cache, result)
+        with self._lock:
+            self.caches[key] = self.caches.get(key, 0) + 1
+
+    def record_reload(self, event: str, seconds: float) -> None:
+        """データセットのロード（loaded / replaced）と所要時間を記録する"""
+        with self._lock:
+            histogram = self.reloads.get(event)
+            if histogram is None:
+                histogram = self.reloads[event] = Histogram(RELOAD_BUCKETS)
+            histogram.observe(seconds)
+
+    # --- 出力 ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON 形式のメトリクス"""
+        with self._lock:
+            routes = []
+            for (method, route), stats in sorted(self.routes.items(), key=lambda item: (item[0][1], item[0][0])):
+                routes.append({
+                    'method': method,
+                    'route': route,
+                    'requests': stats.latency.count,
+                    'errors': stats.errors,
+                    'in_flight': self.inflight.get((method, route), 0),
+                    'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+                    'latency': stats.latency.to_dict(),
+                })
+            caches: Dict[str, Dict[str, int]] = {}
+            for (cache, result), count in sorted(self.caches.items()):
+                caches.setdefault(cache, {})[result] = count
+            reloads = {event: histogram.to_dict() for event, histogram in sorted(self.reloads.items())}
+            in_flight = sum(self.inflight.values())
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'in_flight': in_flight,
+            'routes': routes,
+            'caches': caches,
+            'reloads': reloads,
+            'logging': _logging_stats(),
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus のテキスト形式（version 0.0.4）のメトリクス"""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram_lines(name: str, labels: str, histogram: Histogram) -> None:
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            inflight = sorted(self.inflight.items())
+            caches = sorted(self.caches.items())
+            reloads = sorted(self.reloads.items())
+
+            header('http_request_duration_seconds', 'histogram', 'Request latency by route.')
+            for (method, route), stats in routes:
+                histogram_lines('http_request_duration_seconds', _labels(method=method, route=route), stats.latency)
+
+            header('http_requests_total', 'counter', 'Requests by route and status code.')
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+
+            header('http_request_errors_total', 'counter', 'Requests that ended with a 5xx status.')
+            for (method, route), stats in routes:
+                lines.append(f"http_request_errors_total{{{_labels(method=method, route=route)}}} {stats.errors}")
+
+            header('http_requests_in_flight', 'gauge', 'Requests currently being processed.')
+            for (method, route), count in inflight:
+                lines.append(f"http_requests_in_flight{{{_labels(method=method, route=route)}}} {count}")
+
+            header('cache_requests_total', 'counter', 'Cache lookups by cache and result.')
+            for (cache, result), count in caches:
+                lines.append(f"cache_requests_total{{{_labels(cache=cache, result=result)}}} {count}")
+
+            header('dataset_reload_duration_seconds', 'histogram', 'Dataset load time by event.')
+            for event, histogram in reloads:
+                histogram_lines('dataset_reload_duration_seconds', _labels(event=event), histogram)
+
+        logging_stats = _logging_stats()
+        if logging_stats.get('queued'):
+            header('log_records_dropped_total', 'counter', 'Log records dropped because the queue was full.')
+            lines.append(f"log_records_dropped_total {logging_stats['dropped']}")
+            header('log_records_sampled_out_total', 'counter', 'Log records skipped by sampling.')
+            lines.append(f"log_records_sampled_out_total {logging_stats['sampled_out']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels: Any) -> str:
+    """Prometheus のラベル文字列"""
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    return ",".join(parts)
+
+
+def _logging_stats() -> Dict[str, Any]:
+    """ログキューの統計（ログ設定を読み込んでいない場合は空）"""
+    try:
+        from .logging_utils import logging_stats
+    except ImportError:
+        return {}
+    return logging_stats()
+
+
+# プロセス全体のメトリクス
+_metrics = RuntimeMetrics()
+
+
+def get_runtime_metrics() -> RuntimeMetrics:
+    """プロセス全体のメトリクスを取得する"""
+    return _metrics
+
+
+def record_cache(cache: str, result: str) -> None:
+    """キャッシュの結果を記録する（無効化されている場合は何もしない）"""
+    if runtime_metrics_enabled():
+        _metrics.record_cache(cache, result)
+
+
+def record_reload(event: str, seconds: float) -> None:
+    """データセットのロードを記録する（無効化されている場合は何もしない）"""
+    if runtime_metrics_enabled():
+        _metrics.record_reload(event, seconds)
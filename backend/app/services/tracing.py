@@ -0,0 +1,293 @@
+"""
+データ処理の段階ごとのトレース
+- リクエストごとのトレースに、段階（復号化・読み込み・パース・結合・日付変換・集計）ごとの
+  スパン（所要時間・行数などの属性）を記録する
+- トレースは contextvars で保持する（I/O・CPU プールのスレッドにもプールが投入時のコンテキストを引き継ぐ）
+- スパンの合計時間は Server-Timing ヘッダーで返し、処理時間が閾値を超えたトレースは
+  リングバッファに保持して /api/system/traces で参照できるようにする
+- リクエスト外（先読みなど）ではスパンは何も記録しない
+"""
+
+import contextlib
+import contextvars
+import functools
+import itertools
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 既定の閾値（ミリ秒）とリングバッファの件数
+DEFAULT_SLOW_TRACE_MS = 1000
+DEFAULT_TRACE_BUFFER_SIZE = 50
+
+# 1件のトレースに記録するスパンの上限（集約データセットなどでの肥大化を防ぐ）
+MAX_SPANS_PER_TRACE = 500
+
+# Server-Timing に出力するスパン名の上限
+MAX_SERVER_TIMING_ENTRIES = 20
+
+# Server-Timing のメトリクス名に使えない文字
+_INVALID_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+def tracing_enabled() -> bool:
+    """トレースが有効かどうか"""
+    return os.environ.get('TRACING_ENABLED', '1') != '0'
+
+
+def server_timing_enabled() -> bool:
+    """Server-Timing ヘッダーを返すかどうか"""
+    return os.environ.get('SERVER_TIMING_ENABLED', '1') != '0'
+
+
+class Span:
+    """処理の1段階（開始時刻・所要時間・属性）"""
+
+    __slots__ = ('span_id', 'parent_id', 'name', 'start', 'duration', 'thread', 'attributes')
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, attributes: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.thread = threading.current_thread().name
+        self.attributes = attributes
+
+    def set(self, **attributes: Any) -> None:
+        """属性（行数など）を追加する"""
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    """トレース外で使用するスパン（何も記録しない）"""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """1件のリクエストのトレース"""
+
+    def __init__(self, method: str, path: str, query: str = ""):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._ids = itertools.count(1)
+
+    def open_span(self, name: str, parent_id: Optional[int], attributes: Dict[str, Any]) -> Optional[Span]:
+        """スパンを開始する（上限を超えた場合は None）"""
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped_spans += 1
+            return None
+        span = Span(next(self._ids), parent_id, name, attributes)
+        self.spans.append(span)
+        return span
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.duration = time.perf_counter() - self.start
+
+    def totals(self) -> Dict[str, float]:
+        """スパン名ごとの合計時間（秒、終了したスパンのみ）"""
+        totals: Dict[str, float] = {}
+        for span in list(self.spans):
+            if span.duration is not None:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing ヘッダーの値（スパン名ごとの合計時間と全体の経過時間）"""
+        totals = sorted(self.totals().items(), key=lambda item: item[1], reverse=True)
+        entries = [
+            f"{_INVALID_TOKEN.sub('_', name)};dur={seconds * 1000:.1f}"
+            for name, seconds in totals[:MAX_SERVER_TIMING_ENTRIES]
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def summary(self) -> Dict[str, Any]:
+        """トレースの概要"""
+        return {
+            'trace_id': self.trace_id,
+            'method': self.method,
+            'path': self.path,
+            'query': self.query,
+            'status': self.status,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'span_count': len(self.spans),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """スパンを含むトレースの詳細"""
+        spans = []
+        for span in list(self.spans):
+            spans.append({
+                'span_id': span.span_id,
+                'parent_id': span.parent_id,
+                'name': span.name,
+                'offset_ms': round((span.start - self.start) * 1000, 3),
+                'duration_ms': round(span.duration * 1000, 3) if span.duration is not None else None,
+                'thread': span.thread,
+                'attributes': span.attributes,
+            })
+        return {
+            **self.summary(),
+            'dropped_spans': self.dropped_spans,
+            'totals_ms': {name: round(seconds * 1000, 3) for name, seconds in self.totals().items()},
+            'spans': spans,
+        }
+
+
+# 現在のリクエストのトレースと、実行中のスパン
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('request_trace', default=None)
+_current_span: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('trace_span', default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """現在のリクエストのトレース（リクエスト外では None）"""
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def trace_scope(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """トレースを設定して処理を実行する（None の場合は記録しない）"""
+    token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    処理の段階をスパンとして記録する
+
+    使用例:
+        with span('parse', encoding=encoding) as s:
+            df = read_csv_bytes(...)
+            s.set(rows=len(df))
+
+    Args:
+        name: 段階名（Server-Timing のメトリクス名にも使用）
+        attributes: スパンの属性
+
+    Yields:
+        スパン（set() で属性を追加できる。トレース外では何も記録しない）
+    """
+    trace = _current_trace.get()
+    opened = trace.open_span(name, _current_span.get(), attributes) if trace is not None else None
+    if opened is None:
+        yield _NOOP_SPAN
+        return
+
+    token = _current_span.set(opened.span_id)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        opened.duration = time.perf_counter() - opened.start
+        _current_span.reset(token)
+
+
+def _row_count(value: Any) -> Optional[int]:
+    """データフレームの行数・リストの件数（取得できない場合は None）"""
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    return None
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    関数の実行をスパンとして記録するデコレータ
+
+    第1引数がデータフレームの場合は入力の行数（rows）、結果がデータフレーム・リストの場合は
+    結果の件数（result_rows）を属性に記録する。
+
+    Args:
+        name: 段階名（省略時は関数名）
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            attributes = {}
+            rows = _row_count(args[0]) if args else None
+            if rows is not None:
+                attributes['rows'] = rows
+            with span(span_name, **attributes) as s:
+                result = func(*args, **kwargs)
+                result_rows = _row_count(result)
+                if result_rows is not None:
+                    s.set(result_rows=result_rows)
+                return result
+
+        return wrapper
+    return decorator
+
+
+# --- 遅いトレースのリングバッファ ---
+
+_slow_traces: deque = deque(maxlen=int(os.environ.get('TRACE_BUFFER_SIZE', DEFAULT_TRACE_BUFFER_SIZE)))
+_slow_traces_lock = threading.Lock()
+
+
+def slow_trace_threshold() -> float:
+    """リングバッファに保持するトレースの処理時間の閾値（秒）"""
+    return float(os.environ.get('TRACE_SLOW_MS', DEFAULT_SLOW_TRACE_MS)) / 1000
+
+
+def record_trace(trace: Trace) -> bool:
+    """
+    終了したトレースを記録する（処理時間が閾値以上の場合のみリングバッファに保持）
+
+    Returns:
+        保持したかどうか
+    """
+    if trace.duration is None or trace.duration < slow_trace_threshold():
+        return False
+    with _slow_traces_lock:
+        _slow_traces.append(trace)
+    return True
+
+
+def slow_traces() -> List[Dict[str, Any]]:
+    """保持している遅いトレースの概要（新しい順）"""
+    with _slow_traces_lock:
+        traces = list(_slow_traces)
+    return [trace.summary() for trace in reversed(traces)]
+
+
+def get_slow_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    """保持している遅いトレースの詳細（見つからない場合は None）"""
+    with _slow_traces_lock:
+        trace = next((t for t in _slow_traces if t.trace_id == trace_id), None)
+    return trace.to_dict() if trace is not None else None
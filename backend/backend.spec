@@ -27,8 +27,39 @@ a = Analysis(
         'app.routers.files',
         'app.routers.system',
         'app.routers.milestones',
+        'app.routers.datasets',
+        'app.routers.events',
+        'app.routers.dashboard',
+        'app.routers.tasks',
+        'app.routers.diagnostics',
+        'app.routers.observability',
+        'app.middleware.deadline_middleware',
+        'app.middleware.debug_trace_middleware',
+        'app.middleware.metrics_middleware',
+        'app.middleware.profiling_middleware',
+        'app.middleware.tracing_middleware',
         'app.services.async_loader',
         'app.services.data_processing',
+        'app.services.dataset_snapshot',
+        'app.services.dataset_registry',
+        'app.services.multi_site',
+        'app.services.path_discovery',
+        'app.services.http_cache',
+        'app.services.json_encoding',
+        'app.services.dataset_events',
+        'app.services.project_index',
+        'app.services.field_selection',
+        'app.services.columnar',
+        'app.services.executors',
+        'app.services.process_compute',
+        'app.services.admission',
+        'app.services.deadlines',
+        'app.services.loop_monitor',
+        'app.services.debug_trace',
+        'app.services.runtime_metrics',
+        'app.services.route_table',
+        'app.services.tracing',
+        'app.services.profiling',
         'app.services.file_utils',
         'app.services.system_health',
         'app.services.crypto_utils',
@@ -0,0 +1,103 @@
+"""
+JSONエンコードのベンチマーク
+- 標準パス（jsonable_encoder + json.dumps）と高速パス（TypeAdapter / orjson）を比較する
+- 両パスの出力がデコード後に一致することも確認する
+
+使い方:
+    python scripts/benchmark_json.py [件数] [繰り返し回数]
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.schemas import Milestone, MilestoneStatus, MilestoneTimelineResponse, Project
+from app.services.json_encoding import encode_json_fast, encode_json_standard, orjson
+
+
+def build_milestones(project_id: str, count: int, base: datetime):
+    """テスト用のマイルストーンを作成する"""
+    return [
+        Milestone(
+            id=f"m-{project_id}-{i}",
+            name=f"マイルストーン{i}",
+            description=f"マイルストーン{i}の説明",
+            planned_date=base + timedelta(days=i * 7),
+            actual_date=base + timedelta(days=i * 7 + 1) if i % 2 else None,
+            status=MilestoneStatus.DELAYED if i % 3 else MilestoneStatus.COMPLETED,
+            category="P001",
+            owner="",
+            dependencies=[f"m-{project_id}-{i - 1}"] if i else [],
+            project_id=project_id,
+        )
+        for i in range(count)
+    ]
+
+
+def build_projects(count: int, with_milestones: bool = False):
+    """テスト用のプロジェクトを作成する"""
+    base = datetime(2025, 3, 1)
+    return [
+        Project(
+            project_id=str(i),
+            project_name=f"プロジェクト{i}",
+            process="P001",
+            line="L001",
+            total_tasks=22,
+            completed_tasks=i % 22,
+            milestone_count=6,
+            start_date=base,
+            end_date=base + timedelta(days=251),
+            project_path=f"C:\\Projects\\D001_F001_P001_L001_プロジェクト{i}",
+            ganttchart_path=None,
+            progress=round((i % 22) / 22 * 100, 2),
+            duration=251,
+            next_milestone="要件定義・仕様検討 (10日後)",
+            has_delay=bool(i % 2),
+            milestones=build_milestones(str(i), 6, base) if with_milestones else None,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(func, content, repeat: int) -> float:
+    """1回あたりの平均時間（ミリ秒）"""
+    func(content)  # ウォームアップ（TypeAdapter の構築を除外）
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return (time.perf_counter() - start_time) / repeat * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    payloads = {
+        "/api/projects": build_projects(count),
+        "/api/milestones": build_milestones("1", count, datetime(2025, 3, 1)),
+        "/api/milestones/timeline": MilestoneTimelineResponse(
+            projects=build_projects(max(1, count // 6), with_milestones=True)
+        ),
+    }
+
+    print(f"件数: {count}, 繰り返し: {repeat}, orjson: {'あり' if orjson is not None else 'なし'}")
+    print(f"{'エンドポイント':<28}{'標準(ms)':>10}{'高速(ms)':>10}{'倍率':>8}{'サイズ':>10}  出力一致")
+    for name, content in payloads.items():
+        standard = encode_json_standard(content)
+        fast = encode_json_fast(content)
+        same = json.loads(standard) == json.loads(fast)
+        standard_ms = measure(encode_json_standard, content, repeat)
+        fast_ms = measure(encode_json_fast, content, repeat)
+        print(
+            f"{name:<28}{standard_ms:>10.2f}{fast_ms:>10.2f}"
+            f"{standard_ms / fast_ms:>7.1f}x{len(fast):>10}  {'OK' if same else 'NG'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
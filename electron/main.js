@@ -982,6 +982,8 @@ ipcMain.handle('api:request', async (event, method, path, params, data, options)
         headers: {
           'Content-Type': 'application/json',
           'Accept': 'application/json',
+          // バックエンドはこの期限を過ぎた処理を打ち切る
+          'X-Request-Timeout-Ms': String(options?.timeout || 10000),
           ...(options?.headers || {})
         }
       });
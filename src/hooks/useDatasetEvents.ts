@@ -0,0 +1,104 @@
+import { useState, useEffect, useRef } from 'react';
+
+// クライアントサイドかどうかをチェック
+const isClient = typeof window !== 'undefined';
+
+// 再接続までの待機時間（ミリ秒）
+const RECONNECT_DELAY = 5000;
+
+/**
+ * データセット変更通知の内容
+ */
+export interface DatasetChangeEvent {
+  type: 'current' | 'changed';
+  dataset: string;
+  version: number;
+  previous_version?: number;
+  added?: string[];
+  changed?: string[];
+  removed?: string[];
+}
+
+/**
+ * データセット変更通知（SSE）を購読するフック
+ * 接続（再接続）時の現在のバージョン（type=current）と、スナップショットが差し替えられた時の
+ * 変更（type=changed）を onChange に渡す
+ *
+ * @param filePath - ダッシュボードCSVファイルのパス
+ * @param onChange - 通知を受け取った時のコールバック
+ * @returns 接続状態と最新のデータセットバージョン
+ */
+export function useDatasetEvents(
+  filePath: string | null,
+  onChange: (event: DatasetChangeEvent) => void
+) {
+  const [connected, setConnected] = useState<boolean>(false);
+  const [version, setVersion] = useState<number | null>(null);
+
+  // 最新のコールバックを参照（再接続を避けるため）
+  const onChangeRef = useRef(onChange);
+  useEffect(() => {
+    onChangeRef.current = onChange;
+  }, [onChange]);
+
+  useEffect(() => {
+    if (!isClient || !filePath || typeof EventSource === 'undefined') return;
+
+    let eventSource: EventSource | null = null;
+    let reconnectTimer: NodeJS.Timeout | null = null;
+    let disposed = false;
+
+    const connect = async () => {
+      try {
+        // APIベースURLを取得（Electron環境のみ）
+        const baseUrl = await window.electron?.getApiBaseUrl?.();
+        if (!baseUrl || disposed) return;
+
+        const url = `${baseUrl.replace(/\/$/, '')}/events?file_path=${encodeURIComponent(filePath)}`;
+        eventSource = new EventSource(url);
+
+        eventSource.addEventListener('open', () => {
+          if (!disposed) setConnected(true);
+        });
+
+        eventSource.addEventListener('dataset', (message: MessageEvent) => {
+          if (disposed) return;
+          try {
+            const event = JSON.parse(message.data) as DatasetChangeEvent;
+            setVersion(event.version);
+            onChangeRef.current(event);
+          } catch (e) {
+            console.error('データセット変更通知の解析エラー:', e);
+          }
+        });
+
+        eventSource.addEventListener('error', () => {
+          // 切断時はポーリングに戻し、一定時間後に再接続
+          setConnected(false);
+          eventSource?.close();
+          eventSource = null;
+          if (!disposed && !reconnectTimer) {
+            reconnectTimer = setTimeout(() => {
+              reconnectTimer = null;
+              connect();
+            }, RECONNECT_DELAY);
+          }
+        });
+      } catch (e) {
+        console.error('データセット変更通知の接続エラー:', e);
+      }
+    };
+
+    connect();
+
+    // クリーンアップ
+    return () => {
+      disposed = true;
+      if (reconnectTimer) clearTimeout(reconnectTimer);
+      eventSource?.close();
+      setConnected(false);
+    };
+  }, [filePath]);
+
+  return { connected, version };
+}
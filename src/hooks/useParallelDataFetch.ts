@@ -1,7 +1,8 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
-import { Project, DashboardMetrics, ErrorInfo } from '../types';
+import { Project, ProjectDelta, DashboardMetrics, DashboardResponse, ErrorInfo } from '../types';
 import { apiClient } from '../services/api';
 import { useNotification } from '../contexts/NotificationContext';
+import { useDatasetEvents, DatasetChangeEvent } from './useDatasetEvents';
 
 // クライアントサイドかどうかをチェック
 const isClient = typeof window !== 'undefined';
@@ -64,6 +65,27 @@ export function useParallelDataFetch(filePath: string | null) {
   
   // キャッシュからの初期ロードフラグ
   const initialLoadDoneRef = useRef<boolean>(false);
+  
+  // 差分マージ用に最新のプロジェクト一覧を参照
+  const projectsRef = useRef<Project[] | null>(null);
+  useEffect(() => {
+    projectsRef.current = projects;
+  }, [projects]);
+  
+  // 表示中のデータのバージョン（差分取得の基準）と変更通知で受け取った最新のバージョン
+  const loadedVersionRef = useRef<number | null>(null);
+  const latestVersionRef = useRef<number | null>(null);
+  // 再接続時に通知の取りこぼしを検出した場合は全件を再取得する
+  const fullFetchRequiredRef = useRef<boolean>(false);
+  // 取得完了後に最新のバージョンへ追従する処理（syncDataset）
+  const syncDatasetRef = useRef<() => void>(() => {});
+  
+  // ファイルが変わった場合はバージョンを引き継がない
+  useEffect(() => {
+    loadedVersionRef.current = null;
+    latestVersionRef.current = null;
+    fullFetchRequiredRef.current = false;
+  }, [filePath]);
 
   // コンポーネントのマウント/アンマウント管理
   useEffect(() => {
@@ -115,11 +137,12 @@ export function useParallelDataFetch(filePath: string | null) {
     setError(null);
     
     try {
-      // プロジェクトデータとメトリクスデータを並列取得
-      const [projectsResponse, metricsResponse] = await Promise.all([
-        apiClient.get<Project[]>('/projects', { file_path: filePath }, { timeout: 8000 }),
-        apiClient.get<DashboardMetrics>('/metrics', { file_path: filePath }, { timeout: 8000 })
-      ]);
+      // プロジェクトデータとメトリクスデータを同じスナップショットから一括取得
+      const dashboard = await apiClient.get<DashboardResponse>(
+        '/dashboard', { file_path: filePath }, { timeout: 8000 }
+      );
+      const projectsResponse = dashboard.projects;
+      const metricsResponse = dashboard.metrics;
       
       if (!isMounted.current) {
         fetchingData.current = false;
@@ -129,11 +152,16 @@ export function useParallelDataFetch(filePath: string | null) {
       // データを更新
       setProjects(projectsResponse);
       setMetrics(metricsResponse);
+      projectsRef.current = projectsResponse;
+      loadedVersionRef.current = dashboard.version;
       
       // データを永続化
       persistData('projects', projectsResponse);
       persistData('metrics', metricsResponse);
       
+      // 取得中に届いた変更通知に追従する
+      setTimeout(() => syncDatasetRef.current(), 0);
+      
     } catch (error: any) {
       if (!isMounted.current) {
         fetchingData.current = false;
@@ -196,7 +224,89 @@ export function useParallelDataFetch(filePath: string | null) {
     }
   }, [filePath, fetchData, addNotification, error]);
 
-  // 定期的なデータ更新
+  // 表示中のバージョンから最新のバージョンまでの差分を取得してマージ（差分が取得できない場合は全件を再取得）
+  const syncDataset = useCallback(async () => {
+    if (!isMounted.current || !filePath || fetchingData.current) return;
+    
+    const since = loadedVersionRef.current;
+    const latest = latestVersionRef.current;
+    const fullFetchRequired = fullFetchRequiredRef.current;
+    if (latest === null || (!fullFetchRequired && since !== null && latest <= since)) return;
+    
+    const currentProjects = projectsRef.current;
+    if (fullFetchRequired || since === null || !currentProjects) {
+      fullFetchRequiredRef.current = false;
+      lastFetchTime.current = 0;
+      fetchData();
+      return;
+    }
+    
+    fetchingData.current = true;
+    let needsFullFetch = false;
+    try {
+      const [delta, metricsResponse] = await Promise.all([
+        apiClient.get<ProjectDelta>(
+          '/projects', { file_path: filePath, since }, { timeout: 8000 }
+        ),
+        apiClient.get<DashboardMetrics>('/metrics', { file_path: filePath }, { timeout: 8000 })
+      ]);
+      
+      if (!isMounted.current) return;
+      
+      // 削除・変更されたプロジェクトを除いてから、変更後と追加分を反映
+      const updated = new Map<string, Project>();
+      [...delta.changed, ...delta.added].forEach(p => updated.set(p.project_id, p));
+      const merged = currentProjects
+        .filter(p => !delta.removed.includes(p.project_id))
+        .map(p => updated.get(p.project_id) ?? p);
+      delta.added.forEach(p => {
+        if (!merged.some(existing => existing.project_id === p.project_id)) merged.push(p);
+      });
+      
+      setProjects(merged);
+      setMetrics(metricsResponse);
+      projectsRef.current = merged;
+      loadedVersionRef.current = delta.version;
+      persistData('projects', merged);
+      persistData('metrics', metricsResponse);
+      
+      // 取得中に届いた変更通知に追従する
+      setTimeout(() => syncDatasetRef.current(), 0);
+    } catch (error) {
+      // 履歴外のバージョン（410）などの場合は全件を再取得
+      console.warn('差分の取得に失敗したため全件を再取得します:', error);
+      needsFullFetch = true;
+    } finally {
+      fetchingData.current = false;
+    }
+    
+    if (needsFullFetch && isMounted.current) {
+      lastFetchTime.current = 0;
+      fetchData();
+    }
+  }, [filePath, fetchData]);
+  
+  useEffect(() => {
+    syncDatasetRef.current = syncDataset;
+  }, [syncDataset]);
+  
+  // 変更通知を受け取ったら最新のバージョンを記録して追従（取得中の場合は完了後に追従する）
+  const applyDatasetChange = useCallback((event: DatasetChangeEvent) => {
+    if (!isMounted.current || !filePath) return;
+    
+    // 接続時の現在のバージョンが表示中のバージョンと異なる場合は、切断中の変更を取りこぼしているため全件を再取得
+    if (event.type === 'current' && !fetchingData.current &&
+        loadedVersionRef.current !== null && event.version !== loadedVersionRef.current) {
+      fullFetchRequiredRef.current = true;
+    }
+    latestVersionRef.current = event.version;
+    syncDataset();
+  }, [filePath, syncDataset]);
+  
+  // データセット変更通知 - スナップショットが差し替えられた時だけ取得
+  const { connected: eventsConnected } = useDatasetEvents(filePath, applyDatasetChange);
+
+  // 定期的なデータ更新（変更通知の接続中は取りこぼし対策として間隔を延長）
   useEffect(() => {
     if (!isClient || !filePath || !isMounted.current) return;
     
@@ -222,12 +332,12 @@ export function useParallelDataFetch(filePath: string | null) {
       }
     };
     
-    // 自動更新を開始 - 8分に延長
+    // 自動更新を開始 - 8分ごと（変更通知の接続中は30分ごと）
     const startAutoRefresh = () => {
       if (intervalId) clearInterval(intervalId);
       intervalId = setInterval(() => {
         if (isActive && isMounted.current && !fetchingData.current) fetchData();
-      }, 8 * 60 * 1000); // 8分ごと
+      }, (eventsConnected ? 30 : 8) * 60 * 1000);
     };
     
     // イベントリスナーを登録
@@ -241,7 +351,7 @@ export function useParallelDataFetch(filePath: string | null) {
       document.removeEventListener('visibilitychange', handleVisibilityChange);
       if (intervalId) clearInterval(intervalId);
     };
-  }, [filePath, fetchData]);
+  }, [filePath, fetchData, eventsConnected]);
 
   return {
     projects,
@@ -2,6 +2,7 @@ import { useState, useEffect, useCallback, useRef } from 'react';
 import { Project, DashboardMetrics, ErrorInfo } from '../types';
 import { getInitialData, openFile } from '../services/api';
 import { useNotification } from '../contexts/NotificationContext';
+import { useDatasetEvents } from './useDatasetEvents';
 import { useApi } from '../contexts/ApiContext';
 
 // クライアントサイドかどうかをチェック
@@ -251,7 +252,12 @@ export const useProjects = (filePath: string | null) => {
     }
   }, [addNotification]);
 
-  // 定期的なデータ更新
+  // データセット変更通知 - スナップショットが差し替えられた時だけ再取得
+  const { connected: eventsConnected } = useDatasetEvents(filePath, () => {
+    if (isMounted.current && !fetchingData.current) fetchData();
+  });
+
+  // 定期的なデータ更新（変更通知の接続中は取りこぼし対策として間隔を延長）
   useEffect(() => {
     if (!isClient || !filePath || !apiStatus.connected || !isMounted.current) return;
     
@@ -277,12 +283,12 @@ export const useProjects = (filePath: string | null) => {
       }
     };
     
-    // 自動更新を開始 - 8分に延長
+    // 自動更新を開始 - 8分ごと（変更通知の接続中は30分ごと）
     const startAutoRefresh = () => {
       if (intervalId) clearInterval(intervalId);
       intervalId = setInterval(() => {
         if (isActive && isMounted.current && !fetchingData.current) fetchData();
-      }, 8 * 60 * 1000); // 8分ごと
+      }, (eventsConnected ? 30 : 8) * 60 * 1000);
     };
     
     // イベントリスナーを登録
@@ -296,7 +302,7 @@ export const useProjects = (filePath: string | null) => {
       document.removeEventListener('visibilitychange', handleVisibilityChange);
       if (intervalId) clearInterval(intervalId);
     };
-  }, [filePath, apiStatus.connected, fetchData]);
+  }, [filePath, apiStatus.connected, fetchData, eventsConnected]);
 
   // キーボードショートカットリスナー
   useEffect(() => {
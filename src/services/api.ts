@@ -2,6 +2,9 @@ import { isElectronEnvironment } from '../utils/environment';
 import { 
   Project, 
   DashboardMetrics, 
+  DashboardResponse,
+  ProjectPage,
+  ProjectQueryParams,
   FileResponse, 
   RecentTasks, 
   HealthResponse, 
@@ -318,6 +321,16 @@ export const getInitialData = async (filePath: string): Promise<{
 }> => {
   return withApiInitialized(async () => {
     try {
+      // 同じスナップショットから一括取得（1回のリクエスト）
+      try {
+        const dashboard = await apiClient.get<DashboardResponse>(
+          '/dashboard', { file_path: filePath }, { timeout: 8000, useCrypto: true }
+        );
+        return { projects: dashboard.projects, metrics: dashboard.metrics };
+      } catch (e) {
+        console.warn('一括取得に失敗したため個別に取得します:', e);
+      }
+      
       // メトリクスとプロジェクトデータを並列に取得
       const [metricsData, projectsData] = await Promise.allSettled([
         apiClient.get<DashboardMetrics>('/metrics', { file_path: filePath }, { timeout: 8000, useCrypto: true }),
@@ -361,6 +374,24 @@ export const getProjects = async (filePath?: string): Promise<Project[]> => {
   }, `projects_${filePath || 'default'}`, 5000); // 5秒キャッシュ
 };
 
+/**
+ * 絞り込み・並べ替え・ページングしたプロジェクト一覧の取得
+ * 次のページは返された next_cursor を cursor に指定して取得する
+ */
+export const getProjectPage = async (
+  query: ProjectQueryParams,
+  filePath?: string
+): Promise<ProjectPage> => {
+  return withApiInitialized(async () => {
+    const data = await apiClient.get<ProjectPage>(
+      '/projects',
+      { ...query, limit: query.limit ?? 50, file_path: filePath },
+      { timeout: 8000, useCrypto: true }
+    );
+    return data;
+  }, `project_page_${JSON.stringify(query)}_${filePath || 'default'}`, 5000); // 5秒キャッシュ
+};
+
 /**
  * プロジェクト詳細の取得
  */
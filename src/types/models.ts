@@ -51,6 +51,52 @@ export interface MilestoneTimelineResponse {
   projects: Project[];
 }
 
+// 指定バージョン以降のプロジェクト差分（/projects?since=）
+export interface ProjectDelta {
+  version: number;
+  since: number;
+  added: Project[];
+  changed: Project[];
+  removed: string[];
+}
+
+export interface ProjectPage {
+  version: number;
+  total: number;
+  items: Project[];
+  next_cursor: string | null;
+}
+
+export interface ColumnarColumn {
+  name: string;
+  type: 'string' | 'dict' | 'date' | 'int' | 'float' | 'bool' | 'json';
+  dictionary?: any[];
+}
+
+export interface ColumnarPayload {
+  format: 'columnar';
+  count: number;
+  date_origin: string | null;
+  header: ColumnarColumn[];
+  columns: any[][];
+}
+
+export interface ProjectQueryParams {
+  status?: string;
+  has_delay?: boolean;
+  process?: string;
+  line?: string;
+  division?: string;
+  factory?: string;
+  progress_min?: number;
+  progress_max?: number;
+  sort?: string;
+  order?: 'asc' | 'desc';
+  limit?: number;
+  cursor?: string;
+  fields?: string;
+}
+
 export interface ProjectSummary {
   total_projects: number;
   active_projects: number;
@@ -63,6 +109,14 @@ export interface DashboardMetrics {
   last_updated: string;
 }
 
+// ダッシュボード一括取得レスポンスの型（/dashboard）
+export interface DashboardResponse {
+  version: number;
+  metrics: DashboardMetrics;
+  projects: Project[];
+  recent_tasks?: Record<string, RecentTasks> | null;
+}
+
 export interface FilePath {
   path: string;
 }
@@ -0,0 +1,41 @@
+/**
+ * 列指向（columnar）形式のレスポンスのデコード
+ * format=columnar で取得した一覧を通常のオブジェクト配列に戻す
+ */
+
+import { ColumnarPayload } from '../types/models';
+
+// 1日のミリ秒数
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+/**
+ * 列指向形式のペイロードを行（オブジェクト）の配列に変換する
+ * 日付列は通常のJSONレスポンスと同じ ISO 8601 文字列（時刻は 00:00:00）に戻す
+ *
+ * @param payload - format=columnar のレスポンス
+ * @returns 行の配列
+ */
+export function decodeColumnar<T = Record<string, any>>(payload: ColumnarPayload): T[] {
+  const rows: Record<string, any>[] = Array.from({ length: payload.count }, () => ({}));
+  const origin = payload.date_origin ? Date.parse(`${payload.date_origin}T00:00:00Z`) : 0;
+
+  payload.header.forEach((column, columnIndex) => {
+    const values = payload.columns[columnIndex];
+    for (let i = 0; i < payload.count; i++) {
+      const value = values[i];
+      switch (column.type) {
+        case 'dict':
+          rows[i][column.name] = value === -1 ? null : column.dictionary![value];
+          break;
+        case 'date':
+          rows[i][column.name] =
+            value === null ? null : new Date(origin + value * DAY_MS).toISOString().slice(0, 19);
+          break;
+        default:
+          rows[i][column.name] = value;
+      }
+    }
+  });
+
+  return rows as T[];
+}